@@ -1,6 +1,6 @@
 """Flask application factory."""
 
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 from flask_socketio import SocketIO
@@ -77,18 +77,33 @@ def create_app(config_name: str = "development") -> Flask:
 
     @app.route("/api/status", methods=["GET"])
     def system_status() -> tuple[dict, int]:
-        """Get system status."""
+        """Get system status.
+
+        With ``?readiness=1`` the response is 503 until the system is ready
+        for traffic, for use as a load-balancer readiness probe.
+        """
         from app.services import get_agent_service
+        from app.services.rag_service import get_warmup_status
 
         agent_service = get_agent_service()
+        embeddings = get_warmup_status()
+        # A cold model (warm-up disabled) loads on first use; only an
+        # unfinished or failed warm-up holds traffic back
+        ready = agent_service.initialized and embeddings["state"] in ("cold", "ready")
+
+        status_code = 200
+        if request.args.get("readiness") and not ready:
+            status_code = 503
 
         return jsonify(
             {
                 "api": "running",
                 "agents_initialized": agent_service.initialized,
                 "database": "connected",
+                "embeddings": embeddings,
+                "ready": ready,
             }
-        ), 200
+        ), status_code
 
     socketio.init_app(
         app,
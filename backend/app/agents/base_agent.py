@@ -4,12 +4,19 @@ This module provides the base class for all agents, handling common functionalit
 like message logging, database integration, and communication with the AutoGen framework.
 """
 
-from typing import Any, Dict, Optional
+import threading
+from functools import partial
+from typing import Any, Callable, Dict, Optional
 from datetime import datetime
 from sqlalchemy.orm import Session
 from autogen_agentchat.agents import AssistantAgent
 from autogen_ext.models.openai import OpenAIChatCompletionClient
 
+# Session ``info`` key: while it holds a list, agents queue their writes on
+# it instead of touching the session, and the caller applies and commits
+# them after the turn, so no transaction stays open across the LLM call
+DEFERRED_WRITES = "deferred_agent_writes"
+
 
 class BaseVirtualAgent:
     """Base class for all virtual startup agents.
@@ -60,6 +67,14 @@ class BaseVirtualAgent:
         self.status = "idle"  # idle, busy, error
         self.db_id: Optional[int] = None
 
+        # Bumped whenever the AutoGen model context may have changed, so
+        # checkpoints only rewrite agents that did something
+        self.state_version = 0
+
+        # Held for a whole turn; checkpoints and hibernation only capture
+        # the AutoGen state while they can take it
+        self.turn_lock = threading.RLock()
+
     def set_db_session(self, session: Session) -> None:
         """Set the database session for this agent."""
         self.db_session = session
@@ -77,12 +92,15 @@ class BaseVirtualAgent:
         self.status = status
 
         if self.db_session and self.db_id:
-            from app.models.agent import Agent
+            self._write(self._store_status, status)
+
+    def _store_status(self, status: str) -> None:
+        """Set the status on the agent's database record."""
+        from app.models.agent import Agent
 
-            agent_record = self.db_session.query(Agent).filter_by(id=self.db_id).first()
-            if agent_record:
-                agent_record.status = status
-                self.db_session.commit()
+        agent_record = self.db_session.query(Agent).filter_by(id=self.db_id).first()
+        if agent_record:
+            agent_record.status = status
 
     def log_message(
         self, content: str, sender: str, meta: Optional[Dict[str, Any]] = None
@@ -106,8 +124,16 @@ class BaseVirtualAgent:
             timestamp=datetime.utcnow(),
             meta=meta or {},
         )
-        self.db_session.add(message)
-        self.db_session.commit()
+        self._write(self.db_session.add, message)
+
+    def _write(self, apply: Callable[..., Any], *args: Any) -> None:
+        """Apply a write and commit it, or queue it while writes are deferred."""
+        deferred = self.db_session.info.get(DEFERRED_WRITES)
+        if deferred is not None:
+            deferred.append(partial(apply, *args))
+        else:
+            apply(*args)
+            self.db_session.commit()
 
     async def send_message(
         self, content: str, recipient: Optional["BaseVirtualAgent"] = None
@@ -121,6 +147,13 @@ class BaseVirtualAgent:
         Returns:
             Response from the agent
         """
+        with self.turn_lock:
+            return await self._process_message(content, recipient)
+
+    async def _process_message(
+        self, content: str, recipient: Optional["BaseVirtualAgent"]
+    ) -> str:
+        """Run one turn; called by ``send_message`` under the turn lock."""
         self.update_status("busy")
 
         # Log the incoming message
@@ -139,6 +172,7 @@ class BaseVirtualAgent:
                 None,  # cancellation_token
             )
 
+            self.state_version += 1
             response_content = str(response.chat_message.content)
 
             # Log the response
@@ -150,6 +184,7 @@ class BaseVirtualAgent:
             return response_content
 
         except Exception as e:
+            self.state_version += 1
             self.update_status("error")
             error_msg = f"Error processing message: {str(e)}"
             self.log_message(
@@ -159,6 +194,21 @@ class BaseVirtualAgent:
             )
             return error_msg
 
+    async def handle_workflow_message(self, content: str, workflow_id: int) -> str:
+        """Process a message sent as part of a workflow.
+
+        Agents that keep per-workflow state override this; by default the
+        message is processed like any other.
+
+        Args:
+            content: Message content
+            workflow_id: Workflow the message belongs to
+
+        Returns:
+            Response from the agent
+        """
+        return await self.send_message(content)
+
     def get_conversation_history(self, limit: int = 50) -> list[Dict[str, Any]]:
         """Get recent conversation history from database.
 
@@ -4,7 +4,7 @@ The Creator agent handles research, ideation, and creative problem-solving
 using RAG, web search, and other tools.
 """
 
-import asyncio
+from collections import OrderedDict
 from typing import Any, Dict, Optional
 from sqlalchemy.orm import Session
 from autogen_ext.models.openai import OpenAIChatCompletionClient
@@ -12,6 +12,20 @@ from autogen_ext.models.openai import OpenAIChatCompletionClient
 from .base_agent import BaseVirtualAgent
 from .config import AGENT_CONFIGS, get_model_client
 
+# Token budget for knowledge base passages in a research prompt
+RESEARCH_CONTEXT_TOKENS = 1500
+RESEARCH_PASSAGES = 5
+
+# Workflows whose retrieved passages are kept for follow-up turns
+MAX_CACHED_WORKFLOWS = 64
+
+PASSAGE_SEPARATOR = "\n\n---\n\n"
+
+
+def normalize_query(query: str) -> str:
+    """Cache key form of a query: lowercase, whitespace collapsed."""
+    return " ".join(query.lower().split())
+
 
 class CreatorAgent(BaseVirtualAgent):
     """Creator Agent - Researcher and Idea Generator.
@@ -24,6 +38,7 @@ class CreatorAgent(BaseVirtualAgent):
         db_session: Optional[Session] = None,
         model_client: Optional[OpenAIChatCompletionClient] = None,
         rag_service: Optional[Any] = None,
+        context_tokens: int = RESEARCH_CONTEXT_TOKENS,
     ):
         """Initialize the Creator agent.
 
@@ -31,6 +46,7 @@ class CreatorAgent(BaseVirtualAgent):
             db_session: Database session for persistence
             model_client: Optional custom model client
             rag_service: Optional RAG service for knowledge base search
+            context_tokens: Token budget for passages injected into prompts
         """
         config = AGENT_CONFIGS["creator"]
 
@@ -50,18 +66,39 @@ class CreatorAgent(BaseVirtualAgent):
         # Optional RAG service for research
         self.rag_service = rag_service
 
-        # Research cache
-        self.research_cache: Dict[str, Any] = {}
+        self.context_tokens = context_tokens
+
+        # Research results keyed by (workflow_id, normalized topic)
+        self.research_cache: Dict[tuple[Optional[int], str], Any] = {}
+
+        # Passages retrieved per workflow, keyed by normalized query, least
+        # recently used workflow first
+        self.workflow_passages: OrderedDict[int, Dict[str, list]] = OrderedDict()
+
+        self.metrics: Dict[str, int] = {
+            "research_tasks": 0,
+            "llm_turns": 0,
+            "retrievals": 0,
+            "retrievals_reused": 0,
+        }
 
     async def research_topic(
-        self, topic: str, use_rag: bool = True, use_web: bool = False
+        self,
+        topic: str,
+        use_rag: bool = True,
+        use_web: bool = False,
+        workflow_id: Optional[int] = None,
     ) -> Dict[str, Any]:
         """Research a topic using available tools.
 
+        Retrieved passages are placed in the prompt itself, within the
+        ``context_tokens`` budget.
+
         Args:
             topic: Topic to research
             use_rag: Whether to use RAG/vector search
             use_web: Whether to use web search
+            workflow_id: Optional workflow whose cached passages to reuse
 
         Returns:
             Research results
@@ -69,40 +106,136 @@ class CreatorAgent(BaseVirtualAgent):
         results: Dict[str, Any] = {"topic": topic, "sources": [], "summary": ""}
 
         # Check cache first
-        if topic in self.research_cache:
-            return self.research_cache[topic]
+        cache_key = (workflow_id, normalize_query(topic))
+        if cache_key in self.research_cache:
+            return self.research_cache[cache_key]
 
-        # Use RAG if available
+        self.metrics["research_tasks"] += 1
+
+        passages: list[Dict[str, Any]] = []
         if use_rag and self.rag_service:
-            try:
-                rag_results = await asyncio.to_thread(
-                    self.rag_service.search, topic, 5
-                )
-                results["sources"].extend(
-                    [{"type": "rag", "content": r} for r in rag_results]
-                )
-            except Exception as e:
-                self.log_message(
-                    content=f"RAG search error: {str(e)}",
-                    sender=self.name,
-                    meta={"type": "error", "tool": "rag"},
-                )
+            passages = await self._retrieve(topic, workflow_id)
+            results["sources"].extend([{"type": "rag", "content": p} for p in passages])
 
         # Process with LLM for summary
-        context = (
+        summary = await self._ask(
             f"Research topic: {topic}\n\n"
-            f"Sources found: {len(results['sources'])}\n"
-            "Please provide a comprehensive summary of this topic."
+            "Please provide a comprehensive summary of this topic.",
+            passages,
         )
-
-        summary = await self.send_message(context)
         results["summary"] = summary
 
         # Cache the results
-        self.research_cache[topic] = results
+        self.research_cache[cache_key] = results
 
         return results
 
+    async def handle_workflow_message(self, content: str, workflow_id: int) -> str:
+        """Answer a workflow message with the workflow's retrieved context.
+
+        The first message of a workflow retrieves passages for its content;
+        follow-up turns reuse every passage already retrieved for the
+        workflow instead of searching again.
+
+        Args:
+            content: Message content
+            workflow_id: Workflow the message belongs to
+
+        Returns:
+            Response from the agent
+        """
+        if workflow_id in self.workflow_passages:
+            self.workflow_passages.move_to_end(workflow_id)
+            self.metrics["retrievals_reused"] += 1
+            passages = self._workflow_context(workflow_id)
+        else:
+            self.metrics["research_tasks"] += 1
+            passages = await self._retrieve(content, workflow_id)
+
+        return await self._ask(content, passages)
+
+    async def _retrieve(
+        self, query: str, workflow_id: Optional[int] = None
+    ) -> list[Dict[str, Any]]:
+        """Select passages for ``query``, reusing the workflow's cache.
+
+        A failed search is not cached, so the next turn searches again.
+        """
+        key = normalize_query(query)
+        cached = self.workflow_passages.get(workflow_id)
+        if cached is not None and key in cached:
+            self.workflow_passages.move_to_end(workflow_id)
+            self.metrics["retrievals_reused"] += 1
+            return cached[key]
+
+        passages: list[Dict[str, Any]] = []
+        if self.rag_service:
+            try:
+                passages = await self.rag_service.aselect_passages(
+                    query, self.context_tokens, k=RESEARCH_PASSAGES
+                )
+                self.metrics["retrievals"] += 1
+            except Exception as e:
+                self.log_message(
+                    content=f"RAG search error: {str(e)}",
+                    sender=self.name,
+                    meta={"type": "error", "tool": "rag"},
+                )
+                return passages
+
+        if workflow_id is not None:
+            self.workflow_passages.setdefault(workflow_id, {})[key] = passages
+            self.workflow_passages.move_to_end(workflow_id)
+            while len(self.workflow_passages) > MAX_CACHED_WORKFLOWS:
+                self.workflow_passages.popitem(last=False)
+
+        return passages
+
+    def _workflow_context(self, workflow_id: int) -> list[Dict[str, Any]]:
+        """Distinct passages retrieved for a workflow, within the budget."""
+        passages: list[Dict[str, Any]] = []
+        seen: set[str] = set()
+        used = 0
+        for query_passages in self.workflow_passages[workflow_id].values():
+            for passage in query_passages:
+                if passage["id"] in seen:
+                    continue
+                tokens = passage.get("tokens", 0)
+                if passages and used + tokens > self.context_tokens:
+                    continue
+                seen.add(passage["id"])
+                passages.append(passage)
+                used += tokens
+        return passages
+
+    async def _ask(self, instruction: str, passages: list[Dict[str, Any]]) -> str:
+        """Send one LLM turn with the passages placed in the prompt."""
+        if passages:
+            context = PASSAGE_SEPARATOR.join(
+                f"[{number}] {passage['document']}"
+                for number, passage in enumerate(passages, 1)
+            )
+            prompt = (
+                f"{instruction}\n\n"
+                f"Knowledge base passages:\n\n{context}\n\n"
+                "Answer from these passages, citing them by number, and say "
+                "which parts of the question they do not cover."
+            )
+        else:
+            prompt = instruction
+
+        self.metrics["llm_turns"] += 1
+        return await self.send_message(prompt)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get research metrics (LLM turns and retrievals per task)."""
+        tasks = self.metrics["research_tasks"]
+        return {
+            **self.metrics,
+            "llm_turns_per_task": self.metrics["llm_turns"] / tasks if tasks else 0.0,
+            "cached_workflows": len(self.workflow_passages),
+        }
+
     async def generate_ideas(
         self, context: str, constraints: Optional[Dict[str, Any]] = None
     ) -> list[str]:
@@ -167,8 +300,9 @@ class CreatorAgent(BaseVirtualAgent):
         return request
 
     def clear_cache(self) -> None:
-        """Clear the research cache."""
+        """Clear the research and retrieved passage caches."""
         self.research_cache.clear()
+        self.workflow_passages.clear()
         self.log_message(
             content="Research cache cleared", sender=self.name, meta={"type": "system"}
         )
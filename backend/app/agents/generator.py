@@ -105,6 +105,39 @@ class GeneratorAgent(BaseVirtualAgent):
 
         return spec
 
+    @staticmethod
+    def build_agent(
+        spec: Dict[str, Any], db_session: Optional[Session] = None
+    ) -> BaseVirtualAgent:
+        """Instantiate an agent from a specification.
+
+        Makes no LLM call and no database write, so it also rebuilds agents
+        from the spec stored in ``Agent.config``.
+
+        Args:
+            spec: Agent specification dictionary
+            db_session: Database session for the new agent
+
+        Returns:
+            New agent instance
+        """
+        # One client per agent rather than one shared per model: a client's
+        # httpx pool must not be used from several threads and event loops
+        # at once, and each request runs its own. The pools cost memory per
+        # agent, which AGENT_MAX_RESIDENT bounds.
+        model_client = get_model_client(spec.get("model", DEFAULT_MODEL))
+
+        return BaseVirtualAgent(
+            name=spec["name"],
+            role=spec["role"],
+            agent_type=spec["type"],
+            system_message=spec["system_message"],
+            description=spec["description"],
+            model_client=model_client,
+            db_session=db_session,
+            tools=spec.get("tools", []),
+        )
+
     async def create_agent(self, spec: Dict[str, Any]) -> Optional[BaseVirtualAgent]:
         """Create a new agent from a specification.
 
@@ -115,21 +148,8 @@ class GeneratorAgent(BaseVirtualAgent):
             New agent instance or None if creation fails
         """
         try:
-            # Get model client
-            model = spec.get("model", DEFAULT_MODEL)
-            model_client = get_model_client(model)
-
             # Create the agent
-            new_agent = BaseVirtualAgent(
-                name=spec["name"],
-                role=spec["role"],
-                agent_type=spec["type"],
-                system_message=spec["system_message"],
-                description=spec["description"],
-                model_client=model_client,
-                db_session=self.db_session,
-                tools=spec.get("tools", []),
-            )
+            new_agent = self.build_agent(spec, self.db_session)
 
             # Register in database if session available
             if self.db_session:
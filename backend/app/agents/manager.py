@@ -7,6 +7,9 @@ The Agent Manager is responsible for:
 - Tracking agent status
 """
 
+import asyncio
+import threading
+from collections import OrderedDict
 from typing import Any, Dict, Optional
 from sqlalchemy.orm import Session
 
@@ -14,6 +17,7 @@ from .driver import DriverAgent
 from .creator import CreatorAgent
 from .generator import GeneratorAgent
 from .base_agent import BaseVirtualAgent
+from app.utils.async_runner import run_async
 
 
 class AgentManager:
@@ -38,8 +42,36 @@ class AgentManager:
         self.creator: Optional[CreatorAgent] = None
         self.generator: Optional[GeneratorAgent] = None
 
-        # Dynamic agents created by Generator
-        self.dynamic_agents: Dict[str, BaseVirtualAgent] = {}
+        # Dynamic agents created by Generator, least recently used first
+        self.dynamic_agents: OrderedDict[str, BaseVirtualAgent] = OrderedDict()
+
+        # Cap on dynamic agents held in memory (None for no cap); idle ones
+        # beyond it are hibernated to the database
+        self.max_resident_agents: Optional[int] = None
+
+        # Agents whose saved state has not been loaded yet
+        self._pending_restore: set[int] = set()
+
+        # state_version of each agent at its last checkpoint, and a lock
+        # guarding it, _pending_restore and state writes from requests and
+        # the checkpointer thread
+        self._checkpointed: Dict[int, int] = {}
+        self._state_lock = threading.Lock()
+
+        # Lookup indexes over every registered agent, core and dynamic
+        self._agents_by_id: Dict[int, BaseVirtualAgent] = {}
+        self._agents_by_name: Dict[str, BaseVirtualAgent] = {}
+
+        # Dynamic agents rebuilt from their stored spec on first access,
+        # hibernation and checkpoint traffic
+        self.metrics: Dict[str, int] = {
+            "rehydrated": 0,
+            "evictions": 0,
+            "restores": 0,
+            "checkpoint_flushes": 0,
+            "checkpointed_agents": 0,
+            "checkpoint_bytes": 0,
+        }
 
         # Database session
         self.db_session: Optional[Session] = None
@@ -83,6 +115,9 @@ class AgentManager:
     ) -> Dict[str, str]:
         """Initialize the three core agents (Driver, Creator, Generator).
 
+        Conversation state checkpointed before a restart is loaded back, so
+        a warm restart needs no LLM calls.
+
         Args:
             db_session: Optional database session
 
@@ -98,6 +133,8 @@ class AgentManager:
             # Initialize Driver
             self.driver = DriverAgent(db_session=self.db_session)
             await self._sync_agent_with_db(self.driver, "driver")
+            self._register(self.driver)
+            await self._restore_state(self.driver)
             status["driver"] = "initialized"
 
             # Initialize Creator
@@ -105,11 +142,15 @@ class AgentManager:
                 db_session=self.db_session, rag_service=self.rag_service
             )
             await self._sync_agent_with_db(self.creator, "creator")
+            self._register(self.creator)
+            await self._restore_state(self.creator)
             status["creator"] = "initialized"
 
             # Initialize Generator
             self.generator = GeneratorAgent(db_session=self.db_session)
             await self._sync_agent_with_db(self.generator, "generator")
+            self._register(self.generator)
+            await self._restore_state(self.generator)
             status["generator"] = "initialized"
 
         except Exception as e:
@@ -160,49 +201,349 @@ class AgentManager:
 
         self.db_session.commit()
 
+    def _register(self, agent: BaseVirtualAgent) -> None:
+        """Add an agent to the lookup indexes.
+
+        Args:
+            agent: Agent instance (its database ID, if any, must be set)
+        """
+        self._agents_by_name[agent.name] = agent
+        if agent.db_id is not None:
+            self._agents_by_id[agent.db_id] = agent
+
+    def _unregister(self, agent: BaseVirtualAgent) -> None:
+        """Remove an agent from the lookup indexes.
+
+        Args:
+            agent: Agent instance
+        """
+        if self._agents_by_name.get(agent.name) is agent:
+            del self._agents_by_name[agent.name]
+        if agent.db_id is not None and self._agents_by_id.get(agent.db_id) is agent:
+            del self._agents_by_id[agent.db_id]
+
+    def has_agent(self, agent_id: int) -> bool:
+        """Check whether an agent is registered in memory.
+
+        Args:
+            agent_id: Database ID of the agent
+
+        Returns:
+            True if the agent is registered
+        """
+        return agent_id in self._agents_by_id
+
     def get_agent(self, agent_id: int) -> Optional[BaseVirtualAgent]:
         """Get an agent by database ID.
 
+        Dynamic agents not yet loaded (e.g. after a restart) are rebuilt
+        from their stored spec, hibernating others over the resident cap.
+
         Args:
             agent_id: Database ID of the agent
 
         Returns:
             Agent instance or None
         """
-        # Check core agents
-        if self.driver and self.driver.db_id == agent_id:
-            return self.driver
-        if self.creator and self.creator.db_id == agent_id:
-            return self.creator
-        if self.generator and self.generator.db_id == agent_id:
-            return self.generator
-
-        # Check dynamic agents
-        for agent in self.dynamic_agents.values():
-            if agent.db_id == agent_id:
-                return agent
-
-        return None
+        agent = self._agents_by_id.get(agent_id)
+        if agent is None:
+            agent = self._rehydrate(id=agent_id)
+        else:
+            self._touch(agent)
+        return agent
 
     def get_agent_by_name(self, name: str) -> Optional[BaseVirtualAgent]:
         """Get an agent by name.
 
+        Dynamic agents not yet loaded are rebuilt from their stored spec,
+        hibernating others over the resident cap.
+
         Args:
             name: Agent name
 
         Returns:
             Agent instance or None
         """
-        # Check core agents
-        if self.driver and self.driver.name == name:
-            return self.driver
-        if self.creator and self.creator.name == name:
-            return self.creator
-        if self.generator and self.generator.name == name:
-            return self.generator
+        agent = self._agents_by_name.get(name)
+        if agent is None:
+            agent = self._rehydrate(name=name)
+        else:
+            self._touch(agent)
+        return agent
+
+    def _touch(self, agent: BaseVirtualAgent) -> None:
+        """Mark a dynamic agent as most recently used."""
+        if self.dynamic_agents.get(agent.name) is agent:
+            self.dynamic_agents.move_to_end(agent.name)
+
+    async def load_agent(self, agent_id: int) -> Optional[BaseVirtualAgent]:
+        """Get an agent ready to process messages.
+
+        Like ``get_agent``, but a rebuilt agent also gets the conversation
+        state saved when it was hibernated, and idle agents over the
+        resident cap are hibernated.
+
+        Args:
+            agent_id: Database ID of the agent
+
+        Returns:
+            Agent instance or None
+        """
+        agent = self.get_agent(agent_id)
+        if agent is None:
+            return None
+
+        await self._restore_pending(agent)
+        await self.enforce_resident_limit()
+        return agent
+
+    async def _restore_pending(self, agent: BaseVirtualAgent) -> None:
+        """Restore a rebuilt agent's saved state once, before its first turn."""
+        with agent.turn_lock:
+            with self._state_lock:
+                pending = agent.db_id in self._pending_restore
+            if pending:
+                await self._restore_state(agent)
 
-        # Check dynamic agents
-        return self.dynamic_agents.get(name)
+    async def _restore_state(self, agent: BaseVirtualAgent) -> bool:
+        """Load an agent's saved AutoGen state, if there is one.
+
+        Args:
+            agent: Agent instance with its database ID set
+
+        Returns:
+            True if state was loaded
+        """
+        with agent.turn_lock:
+            with self._state_lock:
+                self._pending_restore.discard(agent.db_id)
+            if not self.db_session or agent.db_id is None:
+                return False
+
+            from app.models.agent_state import AgentState
+
+            saved = self.db_session.get(AgentState, agent.db_id)
+            if saved is None:
+                return False
+
+            await agent.agent.load_state(AgentState.decode(saved.state))
+            with self._state_lock:
+                self._checkpointed[agent.db_id] = agent.state_version
+            self.metrics["restores"] += 1
+            return True
+
+    def _unsaved(self, agent: BaseVirtualAgent) -> bool:
+        """Check whether an agent's state changed since it was last saved.
+
+        A rebuilt agent that never loaded its saved state has nothing newer
+        to save. Call with ``_state_lock`` held.
+        """
+        return agent.db_id not in self._pending_restore and (
+            agent.state_version != self._checkpointed.get(agent.db_id, 0)
+        )
+
+    def _put_state(self, agent_id: int, blob: bytes) -> None:
+        """Insert or replace an agent's saved state (not committed)."""
+        from app.models.agent_state import AgentState
+
+        saved = self.db_session.get(AgentState, agent_id)
+        if saved is None:
+            self.db_session.add(AgentState(agent_id=agent_id, state=blob))
+        else:
+            saved.state = blob
+
+    async def checkpoint(self) -> int:
+        """Save the state of every agent that changed since its last save.
+
+        Agents mid-turn (their turn lock is held) are skipped, so a
+        checkpoint never holds half a turn; they are picked up by a later
+        call. All changed agents are written in one transaction.
+
+        Returns:
+            Number of agents written
+        """
+        if not self.db_session:
+            return 0
+
+        from app.models.agent_state import AgentState
+
+        captured = []
+        for agent in list(self._agents_by_id.values()):
+            if not agent.turn_lock.acquire(blocking=False):
+                continue
+            try:
+                with self._state_lock:
+                    unsaved = self._unsaved(agent)
+                if unsaved and agent.status != "busy":
+                    state = await agent.agent.save_state()
+                    captured.append((agent, agent.state_version, state))
+            finally:
+                agent.turn_lock.release()
+        if not captured:
+            return 0
+
+        blobs = [AgentState.encode(state) for _, _, state in captured]
+
+        with self._state_lock:
+            # Agents hibernated or terminated since their capture already
+            # wrote (or dropped) newer state
+            kept = [
+                (agent, version, blob)
+                for (agent, version, _), blob in zip(captured, blobs)
+                if self._agents_by_id.get(agent.db_id) is agent
+            ]
+            for agent, _, blob in kept:
+                self._put_state(agent.db_id, blob)
+            self.db_session.commit()
+            for agent, version, _ in kept:
+                self._checkpointed[agent.db_id] = version
+
+        if not kept:
+            return 0
+        self.metrics["checkpoint_flushes"] += 1
+        self.metrics["checkpointed_agents"] += len(kept)
+        self.metrics["checkpoint_bytes"] += sum(len(blob) for _, _, blob in kept)
+        return len(kept)
+
+    async def hibernate_agent(self, agent: BaseVirtualAgent) -> bool:
+        """Save a dynamic agent's state to the database and drop it.
+
+        The agent is rebuilt and its state restored on next access.
+
+        Args:
+            agent: Resident dynamic agent
+
+        Returns:
+            True if the agent was hibernated
+        """
+        if (
+            not self.db_session
+            or agent.db_id is None
+            or self.dynamic_agents.get(agent.name) is not agent
+        ):
+            return False
+
+        from app.models.agent import Agent
+        from app.models.agent_state import AgentState
+
+        # Never hibernate mid-turn
+        if not agent.turn_lock.acquire(blocking=False):
+            return False
+        try:
+            # An agent already checkpointed has nothing newer to save
+            with self._state_lock:
+                unsaved = self._unsaved(agent)
+            blob = None
+            if unsaved:
+                blob = AgentState.encode(await agent.agent.save_state())
+
+            with self._state_lock:
+                if blob is not None:
+                    self._put_state(agent.db_id, blob)
+                record = self.db_session.get(Agent, agent.db_id)
+                if record is not None:
+                    record.status = "hibernated"
+                self.db_session.commit()
+
+                self._pending_restore.discard(agent.db_id)
+                self._checkpointed.pop(agent.db_id, None)
+                del self.dynamic_agents[agent.name]
+                self._unregister(agent)
+        finally:
+            agent.turn_lock.release()
+
+        self.metrics["evictions"] += 1
+        return True
+
+    async def enforce_resident_limit(self) -> int:
+        """Hibernate least recently used idle agents over the resident cap.
+
+        Busy agents are never evicted, so the cap can be exceeded while
+        they work.
+
+        Returns:
+            Number of agents hibernated
+        """
+        if self.max_resident_agents is None:
+            return 0
+
+        evicted = 0
+        excess = len(self.dynamic_agents) - self.max_resident_agents
+        for agent in list(self.dynamic_agents.values()):
+            if evicted >= excess:
+                break
+            if agent.status == "idle" and await self.hibernate_agent(agent):
+                evicted += 1
+        return evicted
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get residency and checkpoint metrics.
+
+        Returns:
+            Resident count, cap, and rebuild, eviction, restore and
+            checkpoint counts
+        """
+        return {
+            **self.metrics,
+            "resident": len(self.dynamic_agents),
+            "max_resident": self.max_resident_agents,
+        }
+
+    def _find_dormant(self, **filters: Any) -> Optional[Any]:
+        """Find the database record of a live dynamic agent.
+
+        Args:
+            **filters: Column filters (``id`` or ``name``)
+
+        Returns:
+            Agent record or None
+        """
+        if not self.db_session:
+            return None
+
+        from app.models.agent import Agent
+
+        return (
+            self.db_session.query(Agent)
+            .filter_by(type="dynamic", **filters)
+            .filter(Agent.status != "terminated")
+            .order_by(Agent.id.desc())
+            .first()
+        )
+
+    def _rehydrate(self, **filters: Any) -> Optional[BaseVirtualAgent]:
+        """Rebuild a dynamic agent from the spec stored in ``Agent.config``.
+
+        No LLM call is made; the stored system message is reused as is.
+
+        Args:
+            **filters: Column filters (``id`` or ``name``)
+
+        Returns:
+            Agent instance or None if there is no usable record
+        """
+        record = self._find_dormant(**filters)
+        if record is None or not record.config:
+            return None
+
+        try:
+            agent = GeneratorAgent.build_agent(record.config, self.db_session)
+        except Exception:
+            return None
+
+        agent.set_db_id(record.id)
+        with self._state_lock:
+            self._pending_restore.add(record.id)
+        self.add_dynamic_agent(agent)
+        self.metrics["rehydrated"] += 1
+
+        # Inside an event loop the caller (load_agent, route_message)
+        # awaits enforce_resident_limit itself
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            run_async(self.enforce_resident_limit)
+        return agent
 
     async def create_dynamic_agent(
         self, spec: Dict[str, Any]
@@ -221,10 +562,23 @@ class AgentManager:
         new_agent = await self.generator.create_agent(spec)
 
         if new_agent:
-            self.dynamic_agents[new_agent.name] = new_agent
+            self.add_dynamic_agent(new_agent)
+            await self.enforce_resident_limit()
 
         return new_agent
 
+    def add_dynamic_agent(self, agent: BaseVirtualAgent) -> None:
+        """Track a dynamic agent, replacing any previous one of the same name.
+
+        Args:
+            agent: Agent instance
+        """
+        previous = self.dynamic_agents.get(agent.name)
+        if previous:
+            self._unregister(previous)
+        self.dynamic_agents[agent.name] = agent
+        self._register(agent)
+
     def get_all_agents(self) -> list[Dict[str, Any]]:
         """Get information about all active agents.
 
@@ -243,6 +597,30 @@ class AgentManager:
         for agent in self.dynamic_agents.values():
             agents.append(agent.to_dict())
 
+        # Dynamic agents that have not been loaded since the last restart
+        if self.db_session:
+            from app.models.agent import Agent
+
+            records = (
+                self.db_session.query(Agent)
+                .filter(Agent.type == "dynamic", Agent.status != "terminated")
+                .order_by(Agent.id)
+                .all()
+            )
+            for record in records:
+                if record.id in self._agents_by_id:
+                    continue
+                agents.append(
+                    {
+                        "id": record.id,
+                        "name": record.name,
+                        "role": record.role,
+                        "type": record.type,
+                        "status": record.status,
+                        "description": (record.config or {}).get("description", ""),
+                    }
+                )
+
         return agents
 
     def terminate_agent(self, agent_id: int) -> bool:
@@ -254,37 +632,37 @@ class AgentManager:
         Returns:
             True if successful, False otherwise
         """
-        # Cannot terminate core agents
-        core_ids = []
-        if self.driver:
-            core_ids.append(self.driver.db_id)
-        if self.creator:
-            core_ids.append(self.creator.db_id)
-        if self.generator:
-            core_ids.append(self.generator.db_id)
-
-        if agent_id in core_ids:
+        agent = self._agents_by_id.get(agent_id)
+
+        # Only dynamic agents can be terminated; ones not loaded in memory
+        # are terminated in the database without rebuilding them
+        if agent is not None:
+            if self.dynamic_agents.get(agent.name) is not agent:
+                return False
+        elif self._find_dormant(id=agent_id) is None:
             return False
 
-        # Find and terminate dynamic agent
-        for name, agent in list(self.dynamic_agents.items()):
-            if agent.db_id == agent_id:
-                # Update database
-                if self.db_session:
-                    from app.models.agent import Agent
-
-                    db_agent = (
-                        self.db_session.query(Agent).filter_by(id=agent_id).first()
-                    )
-                    if db_agent:
-                        db_agent.status = "terminated"
-                        self.db_session.commit()
-
-                # Remove from tracking
-                del self.dynamic_agents[name]
-                return True
-
-        return False
+        with self._state_lock:
+            # Update database
+            if self.db_session:
+                from app.models.agent import Agent
+                from app.models.agent_state import AgentState
+
+                db_agent = self.db_session.query(Agent).filter_by(id=agent_id).first()
+                if db_agent:
+                    db_agent.status = "terminated"
+                    self.db_session.query(AgentState).filter_by(
+                        agent_id=agent_id
+                    ).delete()
+                    self.db_session.commit()
+
+            # Remove from tracking
+            self._pending_restore.discard(agent_id)
+            self._checkpointed.pop(agent_id, None)
+            if agent is not None:
+                del self.dynamic_agents[agent.name]
+                self._unregister(agent)
+        return True
 
     def get_agent_status(self, agent_id: int) -> Dict[str, Any]:
         """Get detailed status of an agent.
@@ -295,11 +673,22 @@ class AgentManager:
         Returns:
             Status information dictionary
         """
-        agent = self.get_agent(agent_id)
-
-        if not agent:
-            return {"error": "Agent not found"}
-
+        agent = self._agents_by_id.get(agent_id)
+        if agent is None:
+            # Report a dormant agent from its record instead of rebuilding it
+            record = self._find_dormant(id=agent_id)
+            if record is None:
+                return {"error": "Agent not found"}
+            return {
+                "id": record.id,
+                "name": record.name,
+                "role": record.role,
+                "type": record.type,
+                "status": record.status,
+                "description": (record.config or {}).get("description"),
+            }
+
+        self._touch(agent)
         return {
             "id": agent.db_id,
             "name": agent.name,
@@ -328,6 +717,9 @@ class AgentManager:
         if not sender or not recipient:
             return None
 
+        await self._restore_pending(recipient)
+        await self.enforce_resident_limit()
+
         # Send message through recipient
         response = await recipient.send_message(message, sender)
 
@@ -336,17 +728,19 @@ class AgentManager:
     def shutdown(self) -> None:
         """Shutdown all agents and cleanup resources."""
         # Update all agents to idle status
-        for agent in self.get_all_agents():
-            if agent["id"]:
-                agent_instance = self.get_agent(agent["id"])
-                if agent_instance:
-                    agent_instance.update_status("idle")
+        for agent in self._agents_by_id.values():
+            agent.update_status("idle")
 
         # Clear agent references
         self.driver = None
         self.creator = None
         self.generator = None
         self.dynamic_agents.clear()
+        with self._state_lock:
+            self._pending_restore.clear()
+            self._checkpointed.clear()
+        self._agents_by_id.clear()
+        self._agents_by_name.clear()
 
 
 # Global singleton instance
@@ -1,10 +1,11 @@
 """Database models."""
 
 from app.models.agent import Agent  # noqa: F401
+from app.models.agent_state import AgentState  # noqa: F401
 from app.models.message import Message  # noqa: F401
 from app.models.task import Task  # noqa: F401
 from app.models.workflow import Workflow  # noqa: F401
 
-__all__ = ["Agent", "Message", "Task", "Workflow"]
+__all__ = ["Agent", "AgentState", "Message", "Task", "Workflow"]
 
 
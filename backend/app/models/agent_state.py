@@ -0,0 +1,43 @@
+"""Agent state model."""
+
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from app import db
+
+
+class AgentState(db.Model):
+    """Serialized AutoGen state (model context) of an agent.
+
+    The state is stored as zlib-compressed JSON.
+    """
+
+    __tablename__ = "agent_states"
+
+    agent_id = db.Column(db.Integer, db.ForeignKey("agents.id"), primary_key=True)
+    state = db.Column(db.LargeBinary, nullable=False)
+    updated_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    @staticmethod
+    def encode(state: Dict[str, Any]) -> bytes:
+        """Compress a state mapping for storage."""
+        return zlib.compress(json.dumps(state, separators=(",", ":")).encode("utf-8"))
+
+    @staticmethod
+    def decode(blob: bytes) -> Dict[str, Any]:
+        """Restore a state mapping written by ``encode``."""
+        return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+    def to_dict(self) -> dict:
+        """Convert agent state to dictionary."""
+        return {
+            "agent_id": self.agent_id,
+            "size": len(self.state) if self.state else 0,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
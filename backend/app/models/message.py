@@ -9,6 +9,10 @@ class Message(db.Model):
     """Message model for agent communications."""
 
     __tablename__ = "messages"
+    __table_args__ = (
+        # Covers keyset pagination of an agent's history by (timestamp, id)
+        db.Index("ix_messages_agent_timestamp_id", "agent_id", "timestamp", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     agent_id = db.Column(db.Integer, db.ForeignKey("agents.id"), nullable=False)
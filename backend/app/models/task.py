@@ -37,3 +37,25 @@ class Task(db.Model):
                 self.completed_at.isoformat() if self.completed_at else None
             ),
         }
+
+    def to_status_dict(self) -> dict:
+        """Convert task to a compact dictionary with the assigned agent's name.
+
+        Expects ``assigned_agent`` to be eager-loaded (see
+        ``Workflow.get_with_tasks``); otherwise each call costs a query.
+        """
+        return {
+            "id": self.id,
+            "workflow_id": self.workflow_id,
+            "assigned_to": self.assigned_to,
+            "assigned_agent_name": (
+                self.assigned_agent.name if self.assigned_agent else None
+            ),
+            "status": self.status,
+            "description": self.description,
+            "result": self.result,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "completed_at": (
+                self.completed_at.isoformat() if self.completed_at else None
+            ),
+        }
@@ -1,6 +1,9 @@
 """Workflow model."""
 
 from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy.orm import selectinload
 
 from app import db
 
@@ -14,14 +17,35 @@ class Workflow(db.Model):
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=True)
     status = db.Column(
-        db.String(50), default="active"
+        db.String(50), default="active", index=True
     )  # 'active', 'completed', 'failed'
     started_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     completed_at = db.Column(db.DateTime, nullable=True)
     meta = db.Column(db.JSON, nullable=True)
 
     # Relationships
-    tasks = db.relationship("Task", backref="workflow", lazy=True)
+    tasks = db.relationship("Task", backref="workflow", lazy=True, order_by="Task.id")
+
+    @classmethod
+    def get_with_tasks(cls, workflow_id: int) -> Optional["Workflow"]:
+        """Load a workflow with its tasks and their assigned agents.
+
+        Uses two queries regardless of task count: one for the workflow and
+        one for its tasks joined to their agents.
+
+        Args:
+            workflow_id: Workflow ID
+
+        Returns:
+            Workflow instance or None
+        """
+        from app.models.task import Task
+
+        return (
+            cls.query.options(selectinload(cls.tasks).joinedload(Task.assigned_agent))
+            .filter_by(id=workflow_id)
+            .first()
+        )
 
     def to_dict(self) -> dict:
         """Convert workflow to dictionary."""
@@ -36,3 +60,10 @@ class Workflow(db.Model):
             ),
             "meta": self.meta,
         }
+
+    def to_status_dict(self) -> dict:
+        """Convert workflow and its tasks to a status dictionary."""
+        return {
+            "workflow": self.to_dict(),
+            "tasks": [task.to_status_dict() for task in self.tasks],
+        }
@@ -1,10 +1,12 @@
 """Agent API routes."""
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 
-from app.models import Agent
+from app import db
+from app.models import Agent, Workflow
 from app.services import get_agent_service
 from app.utils.async_runner import run_async
+from app.utils.pagination import MAX_PAGE_SIZE, clamp_page_size, set_cursor_headers
 
 bp = Blueprint("agents", __name__, url_prefix="/api/agents")
 
@@ -38,31 +40,66 @@ def get_agent_status(agent_id: int) -> tuple[dict, int]:
 
 @bp.route("/<int:agent_id>/messages", methods=["GET"])
 def get_agent_messages(agent_id: int) -> tuple[dict, int]:
-    """Get all messages for an agent."""
-    agent = Agent.query.get_or_404(agent_id)
+    """Get a page of messages for an agent.
 
-    limit = request.args.get("limit", 50, type=int)
+    Query params: ``limit`` (capped), ``before``/``after`` cursors and an
+    optional ``sender`` filter. Cursors for neighbouring pages are returned
+    in the ``X-Next-Cursor`` (older) and ``X-Prev-Cursor`` (newer) headers.
+    """
     agent_service = get_agent_service()
+    if not agent_service.has_agent(agent_id):
+        Agent.query.get_or_404(agent_id)
+
+    limit = clamp_page_size(
+        request.args.get("limit", type=int),
+        maximum=current_app.config.get("API_MAX_PAGE_SIZE", MAX_PAGE_SIZE),
+    )
+
+    try:
+        page = agent_service.get_agent_conversation_page(
+            agent_id,
+            limit=limit,
+            before=request.args.get("before"),
+            after=request.args.get("after"),
+            sender=request.args.get("sender"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    messages = agent_service.get_agent_conversation_history(agent.id, limit=limit)
-    return jsonify(messages), 200
+    response = jsonify(page["messages"])
+    set_cursor_headers(response, page["next_cursor"], page["prev_cursor"])
+    return response, 200
 
 
 @bp.route("/<int:agent_id>/message", methods=["POST"])
 def send_message_to_agent(agent_id: int) -> tuple[dict, int]:
     """Send message to an agent and get response."""
-    agent = Agent.query.get_or_404(agent_id)
+    agent_service = get_agent_service()
+
+    # Agents loaded in memory exist; only unknown ids need the database
+    if not agent_service.has_agent(agent_id):
+        Agent.query.get_or_404(agent_id)
+
     data = request.get_json()
 
     if not data or "message" not in data:
         return jsonify({"error": "Message content required"}), 400
 
-    # Get agent service
-    agent_service = get_agent_service()
+    # The workflow id keys the agent's context cache; only accept real ones
+    workflow_id = data.get("workflow_id")
+    if workflow_id is not None and (
+        not isinstance(workflow_id, int)
+        or isinstance(workflow_id, bool)
+        or db.session.get(Workflow, workflow_id) is None
+    ):
+        return jsonify({"error": "Unknown workflow_id"}), 400
 
     try:
         result = run_async(
-            agent_service.send_message_to_agent, agent.id, data["message"]
+            agent_service.send_message_to_agent,
+            agent_id,
+            data["message"],
+            workflow_id=workflow_id,
         )
 
         if result.get("success"):
@@ -71,7 +108,7 @@ def send_message_to_agent(agent_id: int) -> tuple[dict, int]:
                     {
                         "message": data["message"],
                         "response": result.get("response"),
-                        "agent_id": agent.id,
+                        "agent_id": agent_id,
                         "agent_name": result.get("agent_name"),
                         "status": result.get("status"),
                     }
@@ -2,7 +2,7 @@
 
 from flask import Blueprint, jsonify
 
-from app.models import Agent, Workflow
+from app.services import get_agent_service, get_rag_service, get_stats_service
 
 bp = Blueprint("stats", __name__, url_prefix="/api/stats")
 
@@ -10,41 +10,42 @@ bp = Blueprint("stats", __name__, url_prefix="/api/stats")
 @bp.route("/agents", methods=["GET"])
 def get_agent_stats() -> tuple[dict, int]:
     """Get agent statistics."""
-    total = Agent.query.count()
-    active = Agent.query.filter_by(status="working").count()
-    idle = Agent.query.filter_by(status="idle").count()
-
-    return jsonify({"total": total, "active": active, "idle": idle}), 200
+    return jsonify(get_stats_service().agent_stats()), 200
 
 
 @bp.route("/workflows", methods=["GET"])
 def get_workflow_stats() -> tuple[dict, int]:
     """Get workflow statistics."""
-    total = Workflow.query.count()
-    active = Workflow.query.filter_by(status="active").count()
-    completed = Workflow.query.filter_by(status="completed").count()
-    failed = Workflow.query.filter_by(status="failed").count()
+    return jsonify(get_stats_service().workflow_stats()), 200
 
-    return jsonify(
-        {"total": total, "active": active, "completed": completed, "failed": failed}
-    ), 200
 
+@bp.route("/rag", methods=["GET"])
+def get_rag_stats() -> tuple[dict, int]:
+    """Get RAG cache statistics (hit ratios, saved latency)."""
+    return jsonify(get_rag_service().get_metrics()), 200
 
-@bp.route("/overview", methods=["GET"])
-def get_overview() -> tuple[dict, int]:
-    """Get system overview."""
-    agents = {
-        "total": Agent.query.count(),
-        "active": Agent.query.filter_by(status="working").count(),
-        "idle": Agent.query.filter_by(status="idle").count(),
-    }
 
-    workflows = {
-        "total": Workflow.query.count(),
-        "active": Workflow.query.filter_by(status="active").count(),
-        "completed": Workflow.query.filter_by(status="completed").count(),
-    }
+@bp.route("/residency", methods=["GET"])
+def get_residency_stats() -> tuple[dict, int]:
+    """Get agent residency and checkpoint statistics."""
+    return jsonify(get_agent_service().get_residency_metrics()), 200
+
 
-    return jsonify({"agents": agents, "workflows": workflows, "status": "online"}), 200
+@bp.route("/research", methods=["GET"])
+def get_research_stats() -> tuple[dict, int]:
+    """Get Creator research statistics (LLM turns and retrievals per task)."""
+    return jsonify(get_agent_service().get_research_metrics()), 200
 
 
+@bp.route("/overview", methods=["GET"])
+def get_overview() -> tuple[dict, int]:
+    """Get system overview."""
+    stats_service = get_stats_service()
+
+    return jsonify(
+        {
+            "agents": stats_service.agent_stats(),
+            "workflows": stats_service.workflow_stats(),
+            "status": "online",
+        }
+    ), 200
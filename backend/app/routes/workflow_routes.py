@@ -1,19 +1,80 @@
 """Workflow API routes."""
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, abort, current_app, jsonify, request
 
 from app import db
 from app.models import Workflow, Task
 from app.services import get_workflow_orchestrator
+from app.utils.pagination import (
+    MAX_PAGE_SIZE,
+    clamp_page_size,
+    decode_cursor,
+    encode_cursor,
+    set_cursor_headers,
+)
 
 bp = Blueprint("workflows", __name__, url_prefix="/api/workflows")
 
 
 @bp.route("", methods=["GET"])
 def get_workflows() -> tuple[dict, int]:
-    """Get all workflows."""
-    workflows = Workflow.query.all()
-    return jsonify([wf.to_dict() for wf in workflows]), 200
+    """Get a page of workflows ordered by ID.
+
+    Query params: ``limit`` (capped), ``after``/``before`` cursors and an
+    optional ``status`` filter (comma-separated). Cursors for neighbouring
+    pages are returned in the ``X-Next-Cursor`` and ``X-Prev-Cursor`` headers.
+    """
+    limit = clamp_page_size(
+        request.args.get("limit", type=int),
+        maximum=current_app.config.get("API_MAX_PAGE_SIZE", MAX_PAGE_SIZE),
+    )
+    after = request.args.get("after")
+    before = request.args.get("before")
+    if after and before:
+        return jsonify({"error": "Use either 'before' or 'after', not both"}), 400
+
+    query = Workflow.query
+    status = request.args.get("status")
+    if status:
+        query = query.filter(Workflow.status.in_(status.split(",")))
+
+    try:
+        if before:
+            (cursor_id,) = decode_cursor(before, (int,))
+            rows = (
+                query.filter(Workflow.id < cursor_id)
+                .order_by(Workflow.id.desc())
+                .limit(limit + 1)
+                .all()
+            )
+            has_prev = len(rows) > limit
+            rows = list(reversed(rows[:limit]))
+            has_next = bool(rows)
+        else:
+            if after:
+                (cursor_id,) = decode_cursor(after, (int,))
+                query = query.filter(Workflow.id > cursor_id)
+            rows = query.order_by(Workflow.id).limit(limit + 1).all()
+            has_next = len(rows) > limit
+            rows = rows[:limit]
+            has_prev = bool(after and rows)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    response = jsonify([wf.to_dict() for wf in rows])
+    set_cursor_headers(
+        response,
+        encode_cursor((rows[-1].id,)) if has_next else None,
+        encode_cursor((rows[0].id,)) if has_prev else None,
+    )
+    return response, 200
+
+
+@bp.route("/metrics", methods=["GET"])
+def get_workflow_metrics() -> tuple[dict, int]:
+    """Get orchestrator metrics (database commits per workflow run)."""
+    orchestrator = get_workflow_orchestrator()
+    return jsonify(orchestrator.get_metrics()), 200
 
 
 @bp.route("/<int:workflow_id>", methods=["GET"])
@@ -44,11 +105,12 @@ def create_workflow() -> tuple[dict, int]:
 
 @bp.route("/<int:workflow_id>/status", methods=["GET"])
 def get_workflow_status(workflow_id: int) -> tuple[dict, int]:
-    """Get workflow status with tasks."""
-    workflow = Workflow.query.get_or_404(workflow_id)
-    tasks = [task.to_dict() for task in workflow.tasks]
+    """Get workflow status with tasks and their assigned agent names."""
+    workflow = Workflow.get_with_tasks(workflow_id)
+    if workflow is None:
+        abort(404)
 
-    return jsonify({"workflow": workflow.to_dict(), "tasks": tasks}), 200
+    return jsonify(workflow.to_status_dict()), 200
 
 
 @bp.route("/execute", methods=["POST"])
@@ -4,17 +4,35 @@ This package contains business logic services.
 """
 
 from .rag_service import RAGService, get_rag_service
+from .vector_store import ChromaVectorStore, InMemoryVectorStore, VectorStore
+from .chunking import TokenChunker
+from .ingestion import IngestionPipeline, iter_source
+from .message_archive import MessageArchive, get_message_archive
 from .agent_service import AgentService, get_agent_service
+from .agent_checkpointer import AgentCheckpointer, get_agent_checkpointer
 from .task_processor import TaskProcessor, get_task_processor
 from .workflow_orchestrator import WorkflowOrchestrator, get_workflow_orchestrator
+from .stats_service import StatsService, get_stats_service
 
 __all__ = [
     "RAGService",
     "get_rag_service",
+    "VectorStore",
+    "ChromaVectorStore",
+    "InMemoryVectorStore",
+    "TokenChunker",
+    "IngestionPipeline",
+    "iter_source",
+    "MessageArchive",
+    "get_message_archive",
     "AgentService",
     "get_agent_service",
+    "AgentCheckpointer",
+    "get_agent_checkpointer",
     "TaskProcessor",
     "get_task_processor",
     "WorkflowOrchestrator",
     "get_workflow_orchestrator",
+    "StatsService",
+    "get_stats_service",
 ]
@@ -0,0 +1,124 @@
+"""Background flusher for agent conversation checkpoints.
+
+Every ``AGENT_CHECKPOINT_INTERVAL`` seconds the flusher asks the agent
+manager to save the AutoGen state of agents that changed since their last
+checkpoint. States are stored compressed in the ``agent_states`` table and
+loaded back when agents are created after a restart, so conversations
+survive restarts without being replayed through the LLM.
+"""
+
+import atexit
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from flask import Flask, current_app, has_app_context
+
+from app import db
+from app.agents import agent_manager
+from app.utils.async_runner import run_async
+
+
+class AgentCheckpointer:
+    """Daemon thread that periodically checkpoints changed agents."""
+
+    def __init__(self, app: Flask, interval: float):
+        """Initialize the checkpointer.
+
+        Args:
+            app: Flask app whose database holds the checkpoints
+            interval: Seconds between flushes
+        """
+        self.app = app
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_flush_seconds = 0.0
+        self.last_error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        """Start the flusher thread.
+
+        Returns:
+            True if a thread was started, False if one is already running
+        """
+        if self.running:
+            return False
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="agent-checkpointer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.stop)
+        return True
+
+    def stop(self) -> None:
+        """Stop the flusher thread after a final flush."""
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join(timeout=self.interval + 5)
+        self.flush()
+
+    def flush(self) -> int:
+        """Checkpoint every changed agent now.
+
+        Returns:
+            Number of agents written
+        """
+        started = time.perf_counter()
+        with self.app.app_context():
+            try:
+                written = run_async(agent_manager.checkpoint)
+                self.last_error = None
+            except Exception as e:
+                db.session.rollback()
+                self.last_error = str(e)
+                written = 0
+        self.last_flush_seconds = time.perf_counter() - started
+        return written
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get flusher status."""
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "last_flush_seconds": self.last_flush_seconds,
+            "last_error": self.last_error,
+        }
+
+
+_agent_checkpointer: Optional[AgentCheckpointer] = None
+
+
+def get_agent_checkpointer() -> Optional[AgentCheckpointer]:
+    """Get the agent checkpointer configured for the current app.
+
+    Returns:
+        AgentCheckpointer instance, or None if checkpointing is disabled
+    """
+    global _agent_checkpointer
+
+    interval = (
+        current_app.config.get("AGENT_CHECKPOINT_INTERVAL")
+        if has_app_context()
+        else None
+    )
+    if not interval:
+        return None
+
+    if _agent_checkpointer is None:
+        _agent_checkpointer = AgentCheckpointer(
+            current_app._get_current_object(), interval
+        )
+
+    return _agent_checkpointer
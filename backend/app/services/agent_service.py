@@ -5,12 +5,18 @@ and the agent system (AutoGen agents managed by AgentManager).
 """
 
 import asyncio
+from datetime import datetime
 from typing import Any, Dict, Optional
 
+from flask import current_app
+
 from app import db
 from app.models import Agent, Message
 from app.agents import agent_manager
 from app.services import get_rag_service
+from app.services.agent_checkpointer import get_agent_checkpointer
+from app.services.message_archive import NULL_TIMESTAMP, get_message_archive
+from app.utils.pagination import decode_cursor, encode_cursor, keyset_filter
 
 
 class AgentService:
@@ -31,10 +37,12 @@ class AgentService:
             return {"status": "already_initialized"}
 
         try:
-            # Initialize RAG service
+            # Initialize RAG service (starts the embedding warm-up; seeding
+            # below waits for it rather than loading the model twice)
             rag_service = get_rag_service()
 
-            # Initialize with sample data if empty
+            # Initialize with sample data if empty (content-hash ids make a
+            # concurrent seed a no-op rather than a duplicate)
             if rag_service.count_documents() == 0:
                 rag_service.initialize_sample_data()
 
@@ -43,10 +51,17 @@ class AgentService:
 
             # Set database session
             agent_manager.set_db_session(db.session)
+            agent_manager.max_resident_agents = (
+                current_app.config.get("AGENT_MAX_RESIDENT") or None
+            )
 
-            # Initialize core agents
+            # Initialize core agents (restoring checkpointed conversations)
             status = await agent_manager.initialize_core_agents(db.session)
 
+            checkpointer = get_agent_checkpointer()
+            if checkpointer:
+                checkpointer.start()
+
             self.initialized = True
             return status
 
@@ -63,13 +78,15 @@ class AgentService:
             raise RuntimeError("Agent system not initialized. Call initialize() first.")
 
     async def send_message_to_agent(
-        self, agent_id: int, message_content: str
+        self, agent_id: int, message_content: str, workflow_id: Optional[int] = None
     ) -> Dict[str, Any]:
         """Send a message to an agent and get response.
 
         Args:
             agent_id: Database ID of the agent
             message_content: Message to send
+            workflow_id: Optional workflow the message belongs to, so the
+                agent can reuse context gathered earlier in it
 
         Returns:
             Dictionary with response and metadata
@@ -77,14 +94,19 @@ class AgentService:
         self.ensure_initialized()
 
         # Get agent instance from manager
-        agent_instance = agent_manager.get_agent(agent_id)
+        agent_instance = await agent_manager.load_agent(agent_id)
 
         if not agent_instance:
             return {"error": "Agent not found", "agent_id": agent_id}
 
         try:
             # Send message and get response
-            response = await agent_instance.send_message(message_content)
+            if workflow_id is not None:
+                response = await agent_instance.handle_workflow_message(
+                    message_content, workflow_id
+                )
+            else:
+                response = await agent_instance.send_message(message_content)
 
             return {
                 "success": True,
@@ -101,6 +123,17 @@ class AgentService:
                 "agent_id": agent_id,
             }
 
+    def has_agent(self, agent_id: int) -> bool:
+        """Check whether an agent is loaded in memory.
+
+        Args:
+            agent_id: Database ID of the agent
+
+        Returns:
+            True if the agent manager holds the agent
+        """
+        return self.initialized and agent_manager.has_agent(agent_id)
+
     def get_agent_status(self, agent_id: int) -> Dict[str, Any]:
         """Get current status of an agent.
 
@@ -139,15 +172,118 @@ class AgentService:
         Returns:
             List of message dictionaries
         """
-        # Get from database
-        messages = (
-            Message.query.filter_by(agent_id=agent_id)
-            .order_by(Message.timestamp.desc())
-            .limit(limit)
-            .all()
-        )
+        return self.get_agent_conversation_page(agent_id, limit=limit)["messages"]
+
+    def get_agent_conversation_page(
+        self,
+        agent_id: int,
+        limit: int = 50,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        sender: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Get one keyset-paginated page of an agent's conversation.
+
+        Pages are ordered by ``(timestamp, id)``. Without a cursor the most
+        recent page is returned. ``before`` walks back in time and ``after``
+        walks forward; messages within a page are always chronological.
+
+        Args:
+            agent_id: Database ID of the agent
+            limit: Maximum number of messages to return
+            before: Cursor; return messages older than it
+            after: Cursor; return messages newer than it
+            sender: Optional sender filter
+
+        Returns:
+            Dictionary with ``messages``, ``next_cursor`` (older page, pass as
+            ``before``) and ``prev_cursor`` (newer page, pass as ``after``)
+
+        Raises:
+            ValueError: If a cursor is malformed or both cursors are given
+        """
+        if before and after:
+            raise ValueError("Use either 'before' or 'after', not both")
+
+        newest = not after
+        lower = decode_cursor(after, (datetime, int)) if after else None
+        upper = decode_cursor(before, (datetime, int)) if before else None
+
+        keys = (Message.timestamp, Message.id)
+        query = Message.query.filter(Message.agent_id == agent_id)
+        if sender:
+            query = query.filter(Message.sender == sender)
+        if lower:
+            query = query.filter(keyset_filter(keys, lower, "gt"))
+        if upper:
+            query = query.filter(keyset_filter(keys, upper, "lt"))
+
+        order = (Message.timestamp.desc(), Message.id.desc()) if newest else keys
+        rows = query.order_by(*order).limit(limit + 1).all()
+        page = [
+            ((msg.timestamp or NULL_TIMESTAMP, msg.id), msg.to_dict()) for msg in rows
+        ]
+
+        # Continue into cold storage when the page reaches past the hot table
+        archive = get_message_archive()
+        if archive and archive.has_messages(agent_id):
+            archive_lower, archive_upper = lower, upper
+            if len(page) > limit:
+                if newest:
+                    archive_lower = page[-1][0]
+                else:
+                    archive_upper = page[-1][0]
+            # Rows archived but not yet deleted (or left behind by a crash
+            # before the delete) are in both stores; keep the hot copy
+            hot_ids = {message["id"] for _, message in page}
+            page += [
+                item
+                for item in archive.read(
+                    agent_id,
+                    limit + 1,
+                    lower=archive_lower,
+                    upper=archive_upper,
+                    newest=newest,
+                    sender=sender,
+                )
+                if item[1]["id"] not in hot_ids
+            ]
+            page.sort(key=lambda item: item[0], reverse=newest)
+
+        has_more = len(page) > limit
+        page = sorted(page[:limit], key=lambda item: item[0])
+        if newest:
+            has_older, has_newer = has_more, bool(before and page)
+        else:
+            has_older, has_newer = bool(page), has_more
+
+        return {
+            "messages": [message for _, message in page],
+            "next_cursor": encode_cursor(page[0][0]) if has_older else None,
+            "prev_cursor": encode_cursor(page[-1][0]) if has_newer else None,
+        }
+
+    def get_residency_metrics(self) -> Dict[str, Any]:
+        """Get agent residency and checkpoint metrics.
+
+        Returns:
+            Metrics dictionary
+        """
+        checkpointer = get_agent_checkpointer()
+        return {
+            **agent_manager.get_metrics(),
+            "checkpointer": checkpointer.get_metrics() if checkpointer else None,
+        }
 
-        return [msg.to_dict() for msg in reversed(messages)]
+    def get_research_metrics(self) -> Dict[str, Any]:
+        """Get the Creator's research metrics (LLM turns per task).
+
+        Returns:
+            Metrics dictionary, empty when the Creator is not running
+        """
+        if not agent_manager.creator:
+            return {}
+        return agent_manager.creator.get_metrics()
 
     async def process_operator_task(
         self, task: str, workflow_id: Optional[int] = None
@@ -205,7 +341,7 @@ class AgentService:
             )
 
             if new_agent:
-                agent_manager.dynamic_agents[new_agent.name] = new_agent
+                agent_manager.add_dynamic_agent(new_agent)
                 return {
                     "success": True,
                     "agent": new_agent.to_dict(),
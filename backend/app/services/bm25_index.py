@@ -0,0 +1,334 @@
+"""In-process BM25 inverted index for lexical retrieval.
+
+Vector search is weak on exact identifiers and library names; BM25 over the
+same documents catches them. The index maps each term to a postings dict of
+``{doc: term frequency}`` and scores only the postings of the query terms.
+
+Persistence is a gzip-compressed snapshot (a vocabulary plus per-document
+``term_id, tf`` pairs) and an append-only journal of adds and deletes since
+the snapshot. Writes cost one journal line per document; the snapshot is
+rewritten only once the journal outgrows the index.
+
+The ingestion script and the server share these files. Writers hold an
+exclusive file lock; ``refresh`` replays journal lines appended by other
+processes since the last read, and reloads everything after a compaction.
+"""
+
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+
+from app.utils.file_lock import file_lock
+
+SNAPSHOT_FILE = "bm25.json.gz"
+JOURNAL_FILE = "bm25.journal"
+LOCK_FILE = "bm25.lock"
+
+# Words, numbers and dotted/dashed identifiers such as "flask-sqlalchemy"
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[._\-][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase index terms.
+
+    Compound identifiers are indexed both whole and by their parts, so
+    ``asyncio.to_thread`` matches queries for either form.
+    """
+    terms: list[str] = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(part for part in re.split(r"[._\-]", token) if part)
+    return terms
+
+
+class BM25Index:
+    """Okapi BM25 over an incrementally maintained inverted index."""
+
+    def __init__(
+        self,
+        directory: Optional[str | os.PathLike] = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        """Initialize the index.
+
+        Args:
+            directory: Optional directory for the snapshot and journal
+                (in-memory only when None)
+            k1: Term-frequency saturation
+            b: Document-length normalisation
+        """
+        self.directory = Path(directory) if directory else None
+        self.k1 = k1
+        self.b = b
+
+        self._lock = threading.RLock()
+        self._write_depth = 0
+        self._reset()
+
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.refresh()
+
+    def _reset(self) -> None:
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+        self._journal_entries = 0
+        # Journal bytes replayed so far, and the snapshot they apply to
+        self._journal_offset = 0
+        self._snapshot_file: Optional[tuple[int, int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_terms
+
+    def _insert(self, doc_id: str, terms: Dict[str, int]) -> None:
+        self._remove(doc_id)
+        self._doc_terms[doc_id] = terms
+        length = sum(terms.values())
+        self._lengths[doc_id] = length
+        self._total_length += length
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+    def _remove(self, doc_id: str) -> None:
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._lengths.pop(doc_id)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+    def add(self, ids: Sequence[str], documents: Sequence[str]) -> None:
+        """Index documents, replacing any previous version of the same id.
+
+        Args:
+            ids: Document IDs
+            documents: Document texts
+        """
+        entries = [
+            (doc_id, dict(Counter(tokenize(document))))
+            for doc_id, document in zip(ids, documents)
+        ]
+        with self._writing():
+            for doc_id, terms in entries:
+                self._insert(doc_id, terms)
+            self._append_journal(
+                {"op": "add", "id": doc_id, "terms": terms} for doc_id, terms in entries
+            )
+
+    def delete(self, ids: Iterable[str]) -> None:
+        """Remove documents from the index.
+
+        Args:
+            ids: Document IDs (unknown ids are ignored)
+        """
+        with self._writing():
+            removed = [doc_id for doc_id in ids if doc_id in self._doc_terms]
+            for doc_id in removed:
+                self._remove(doc_id)
+            if removed:
+                self._append_journal([{"op": "delete", "ids": removed}])
+
+    def clear(self) -> None:
+        """Remove every document and reset the persisted state."""
+        with self._writing():
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._lengths.clear()
+            self._total_length = 0
+            if self.directory:
+                self.compact()
+
+    def search(self, query: str, k: int = 10) -> list[tuple[str, float]]:
+        """Rank documents for a query.
+
+        Args:
+            query: Free-text query
+            k: Number of results to return
+
+        Returns:
+            ``(id, score)`` pairs, best first
+        """
+        with self._lock:
+            count = len(self._doc_terms)
+            if not count:
+                return []
+            avg_length = self._total_length / count
+
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (
+                        1 - self.b + self.b * self._lengths[doc_id] / avg_length
+                    )
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * (
+                        tf * (self.k1 + 1) / (tf + norm)
+                    )
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def _append_journal(self, entries: Iterable[Dict]) -> None:
+        if not self.directory:
+            return
+
+        lines = [json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries]
+        if not lines:
+            return
+        # Called under the file lock, so everything before the appended
+        # lines has been replayed
+        with open(self.directory / JOURNAL_FILE, "ab") as f:
+            f.write("".join(lines).encode("utf-8"))
+            f.flush()
+            self._journal_offset = f.tell()
+        self._journal_entries += len(lines)
+
+        # Fold the journal into a snapshot once replaying it would cost more
+        # than loading the snapshot itself.
+        if self._journal_entries > max(1000, len(self._doc_terms)):
+            self.compact()
+
+    def compact(self) -> None:
+        """Write a fresh snapshot and truncate the journal."""
+        if not self.directory:
+            return
+
+        with self._writing():
+            vocab = {term: i for i, term in enumerate(self._postings)}
+            snapshot = {
+                "vocab": list(vocab),
+                "docs": {
+                    doc_id: [x for term, tf in terms.items() for x in (vocab[term], tf)]
+                    for doc_id, terms in self._doc_terms.items()
+                },
+            }
+            path = self.directory / SNAPSHOT_FILE
+            tmp = path.with_suffix(".tmp")
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                json.dump(snapshot, f, separators=(",", ":"))
+            os.replace(tmp, path)
+
+            (self.directory / JOURNAL_FILE).unlink(missing_ok=True)
+            self._journal_entries = 0
+            self._journal_offset = 0
+            self._snapshot_file = self._identity(path)
+
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        """Hold the thread lock and, when persisted, the exclusive file lock.
+
+        The outermost block first replays other processes' writes and cuts
+        a torn journal line, so appends continue from a clean end.
+        """
+        with self._lock:
+            if not self.directory or self._write_depth:
+                self._write_depth += 1
+                try:
+                    yield
+                finally:
+                    self._write_depth -= 1
+                return
+
+            with file_lock(self.directory / LOCK_FILE):
+                self._write_depth = 1
+                try:
+                    self._refresh()
+                    journal_path = self.directory / JOURNAL_FILE
+                    if (
+                        journal_path.exists()
+                        and journal_path.stat().st_size > self._journal_offset
+                    ):
+                        os.truncate(journal_path, self._journal_offset)
+                    yield
+                finally:
+                    self._write_depth = 0
+
+    @staticmethod
+    def _identity(path: Path) -> Optional[tuple[int, int, int]]:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+
+    def refresh(self) -> None:
+        """Catch up with writes persisted by other processes.
+
+        Replays journal lines past the last one read; after a compaction
+        elsewhere the snapshot and journal are reloaded from scratch.
+        """
+        if not self.directory:
+            return
+
+        with self._lock:
+            if self._write_depth:
+                self._refresh()
+                return
+            with file_lock(self.directory / LOCK_FILE, shared=True):
+                self._refresh()
+
+    def _refresh(self) -> None:
+        snapshot_path = self.directory / SNAPSHOT_FILE
+        journal_path = self.directory / JOURNAL_FILE
+        snapshot = self._identity(snapshot_path)
+        size = journal_path.stat().st_size if journal_path.exists() else 0
+
+        if snapshot != self._snapshot_file or size < self._journal_offset:
+            self._reset()
+            self._snapshot_file = snapshot
+            if snapshot is not None:
+                with gzip.open(snapshot_path, "rt", encoding="utf-8") as f:
+                    data = json.load(f)
+                vocab = data["vocab"]
+                for doc_id, pairs in data["docs"].items():
+                    self._insert(
+                        doc_id,
+                        {
+                            vocab[pairs[i]]: pairs[i + 1]
+                            for i in range(0, len(pairs), 2)
+                        },
+                    )
+
+        if size <= self._journal_offset:
+            return
+
+        with open(journal_path, "rb") as f:
+            f.seek(self._journal_offset)
+            data = f.read()
+
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                # Torn final line from an interrupted (or ongoing) write
+                break
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if entry["op"] == "add":
+                self._insert(entry["id"], entry["terms"])
+            else:
+                for doc_id in entry["ids"]:
+                    self._remove(doc_id)
+            self._journal_entries += 1
+            self._journal_offset += len(line)
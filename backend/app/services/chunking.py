@@ -0,0 +1,206 @@
+"""Token-aware document chunking for RAG ingestion.
+
+Long documents are split into windows of at most ``chunk_tokens`` tokens that
+overlap by ``overlap`` tokens, so each vector covers a focused passage. Every
+chunk keeps its parent document's metadata plus the parent id, its index,
+the total number of chunks and its character offset in the parent. Those
+fields let neighbouring chunks be fetched by id and stitched back together
+at query time.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Optional, Protocol, Sequence
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+class Tokenizer(Protocol):
+    """Minimal encode/decode interface implemented by tiktoken encodings."""
+
+    def encode(self, text: str) -> list[int]: ...
+
+    def decode(self, tokens: list[int]) -> str: ...
+
+    def decode_single_token_bytes(self, token: int) -> bytes: ...
+
+
+@lru_cache(maxsize=4)
+def get_tokenizer(encoding: str = DEFAULT_ENCODING) -> Tokenizer:
+    """Load a tiktoken encoding, once per process.
+
+    Args:
+        encoding: tiktoken encoding name
+
+    Returns:
+        Tokenizer for the encoding
+    """
+    import tiktoken
+
+    return tiktoken.get_encoding(encoding)
+
+
+def chunk_id(parent_id: str, index: int) -> str:
+    """Build the id of the ``index``-th chunk of a document."""
+    return f"{parent_id}#{index}"
+
+
+@dataclass
+class Chunk:
+    """One window of a tokenized document."""
+
+    text: str
+    index: int
+    # Character offset of the chunk within the parent document
+    start: int
+    tokens: int
+
+
+class TokenChunker:
+    """Split documents into overlapping, token-bounded chunks."""
+
+    def __init__(
+        self,
+        chunk_tokens: int = 256,
+        overlap: int = 32,
+        tokenizer: Optional[Tokenizer] = None,
+        encoding: str = DEFAULT_ENCODING,
+    ):
+        """Initialize the chunker.
+
+        Args:
+            chunk_tokens: Maximum tokens per chunk
+            overlap: Tokens shared by consecutive chunks
+            tokenizer: Tokenizer to use (defaults to the tiktoken ``encoding``)
+            encoding: tiktoken encoding name, used when no tokenizer is given
+        """
+        if chunk_tokens <= 0:
+            raise ValueError("chunk_tokens must be positive")
+        if not 0 <= overlap < chunk_tokens:
+            raise ValueError("overlap must be in [0, chunk_tokens)")
+
+        self.chunk_tokens = chunk_tokens
+        self.overlap = overlap
+        self.encoding = encoding
+        self._tokenizer = tokenizer
+
+    @property
+    def tokenizer(self) -> Tokenizer:
+        if self._tokenizer is None:
+            self._tokenizer = get_tokenizer(self.encoding)
+        return self._tokenizer
+
+    def split(self, text: str) -> list[Chunk]:
+        """Split one document into chunks.
+
+        Args:
+            text: Document text
+
+        Returns:
+            Chunks in document order (a single chunk for short documents)
+        """
+        tokens = self.tokenizer.encode(text)
+        if len(tokens) <= self.chunk_tokens:
+            return [Chunk(text=text, index=0, start=0, tokens=len(tokens))]
+
+        # Token boundaries as byte offsets into the UTF-8 text. A token may
+        # hold part of a multibyte character, so window edges are widened
+        # to character boundaries before slicing.
+        data = text.encode("utf-8")
+        ends = [0]
+        for token in tokens:
+            ends.append(ends[-1] + len(self.tokenizer.decode_single_token_bytes(token)))
+
+        stride = self.chunk_tokens - self.overlap
+        chunks: list[Chunk] = []
+        position = 0
+        previous = 0
+        for index, start in enumerate(range(0, len(tokens), stride)):
+            end = min(start + self.chunk_tokens, len(tokens))
+            first = _char_boundary(data, ends[start], -1)
+            last = _char_boundary(data, ends[end], 1)
+
+            # Character offsets advance by the decoded stride, so the whole
+            # document is decoded once in total rather than once per chunk.
+            position += len(data[previous:first].decode("utf-8"))
+            previous = first
+
+            chunks.append(
+                Chunk(
+                    text=data[first:last].decode("utf-8"),
+                    index=index,
+                    start=position,
+                    tokens=end - start,
+                )
+            )
+            if end >= len(tokens):
+                break
+
+        return chunks
+
+    def chunk_documents(
+        self,
+        documents: Sequence[str],
+        metadatas: Sequence[Dict[str, Any]],
+        ids: Sequence[str],
+    ) -> tuple[list[str], list[Dict[str, Any]], list[str]]:
+        """Chunk a batch of documents for ``RAGService.add_documents``.
+
+        Args:
+            documents: Document texts
+            metadatas: Metadata for each document
+            ids: Parent document ids
+
+        Returns:
+            Tuple of (chunk texts, chunk metadatas, chunk ids)
+        """
+        texts: list[str] = []
+        chunk_metadatas: list[Dict[str, Any]] = []
+        chunk_ids: list[str] = []
+
+        for document, metadata, parent_id in zip(documents, metadatas, ids):
+            chunks = self.split(document)
+            for chunk in chunks:
+                texts.append(chunk.text)
+                chunk_metadatas.append(
+                    {
+                        **metadata,
+                        "parent_id": parent_id,
+                        "chunk_index": chunk.index,
+                        "chunk_count": len(chunks),
+                        "chunk_start": chunk.start,
+                    }
+                )
+                chunk_ids.append(chunk_id(parent_id, chunk.index))
+
+        return texts, chunk_metadatas, chunk_ids
+
+
+def _char_boundary(data: bytes, offset: int, step: int) -> int:
+    """Move ``offset`` by ``step`` until it no longer splits a character."""
+    while 0 < offset < len(data) and data[offset] & 0xC0 == 0x80:
+        offset += step
+    return offset
+
+
+def merge_chunks(chunks: Sequence[tuple[int, str]]) -> str:
+    """Stitch consecutive chunks of one document back together.
+
+    Args:
+        chunks: ``(chunk_start, text)`` pairs, in any order
+
+    Returns:
+        Reassembled text with overlapping spans included once
+    """
+    merged = ""
+    end = 0
+    for start, text in sorted(chunks):
+        if not merged:
+            merged, end = text, start + len(text)
+            continue
+        overlap = end - start
+        if overlap < len(text):
+            merged += text[max(overlap, 0) :]
+            end = start + len(text)
+
+    return merged
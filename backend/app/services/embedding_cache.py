@@ -0,0 +1,273 @@
+"""Content-addressed, memory-mapped embedding cache.
+
+Embeddings are keyed by a hash of the embedding model name and the text, so
+re-ingesting an unchanged corpus never reaches the model. Only document
+text is cached here; query embeddings stay in RAGService's in-memory LRU,
+so the search path takes no file locks or disk syncs. Vectors live in an append-only float32 file that is memory-mapped
+for zero-copy reads; a compact index file stores one ``(16-byte key, row)``
+entry per vector and is loaded into a ``key -> row`` dict at startup.
+
+Several processes may append to the same cache. Appends hold an exclusive
+file lock, take their row numbers from the size of the vector file and
+write index entries only once the vectors are on disk, so an index entry
+never points at a row that belongs to another text.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+from app.utils.file_lock import file_lock
+
+KEY_SIZE = 16
+VECTORS_FILE = "vectors.f32"
+# Entries carry their row number; caches written with the older
+# position-only "index.bin" are simply re-embedded
+INDEX_FILE = "rows.idx"
+META_FILE = "meta.json"
+LOCK_FILE = ".lock"
+
+_ENTRY = struct.Struct("<16sQ")
+
+
+class EmbeddingCache:
+    """Append-only on-disk cache from text hash to embedding vector."""
+
+    def __init__(self, directory: str | os.PathLike, model: str):
+        """Open (or create) an embedding cache.
+
+        Args:
+            directory: Directory holding the cache files
+            model: Embedding model name; part of every cache key
+        """
+        self.directory = Path(directory)
+        self.model = model
+        self.dim: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._rows: Dict[bytes, int] = {}
+        self._vectors: Optional[np.memmap] = None
+        # Bytes of the index file already read, and rows of the vector file
+        # known to be complete
+        self._index_offset = 0
+        self._file_rows = 0
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.directory / LOCK_FILE):
+            self._load()
+
+    @property
+    def _row_bytes(self) -> int:
+        return 4 * (self.dim or 0)
+
+    def _load(self) -> None:
+        """Read the metadata and index (under the exclusive file lock)."""
+        meta_path = self.directory / META_FILE
+        if not meta_path.exists():
+            return
+
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("model") != self.model:
+            raise ValueError(
+                f"Embedding cache at {self.directory} belongs to model "
+                f"{meta.get('model')!r}, not {self.model!r}"
+            )
+        self.dim = int(meta["dim"])
+
+        # A torn append can leave a partial trailing row; nothing indexes
+        # it, so it is cut off before the next append lands after it
+        vectors_path = self.directory / VECTORS_FILE
+        if vectors_path.exists():
+            size = vectors_path.stat().st_size
+            if size % self._row_bytes:
+                os.truncate(vectors_path, size - size % self._row_bytes)
+        self._refresh()
+
+    def _refresh(self) -> None:
+        """Pick up index entries appended since the last read.
+
+        Entries pointing past the complete rows of the vector file are
+        ignored (and re-read later), so a torn write is never served.
+        """
+        if self.dim is None:
+            meta_path = self.directory / META_FILE
+            if not meta_path.exists():
+                return
+            with open(meta_path, encoding="utf-8") as f:
+                self.dim = int(json.load(f)["dim"])
+
+        index_path = self.directory / INDEX_FILE
+        vectors_path = self.directory / VECTORS_FILE
+        if not index_path.exists() or not vectors_path.exists():
+            return
+        if index_path.stat().st_size - self._index_offset < _ENTRY.size:
+            return
+
+        self._file_rows = vectors_path.stat().st_size // self._row_bytes
+        with open(index_path, "rb") as f:
+            f.seek(self._index_offset)
+            data = f.read()
+        usable = len(data) - len(data) % _ENTRY.size
+        consumed = 0
+        for key, row in _ENTRY.iter_unpack(data[:usable]):
+            if row >= self._file_rows:
+                break
+            self._rows.setdefault(key, row)
+            consumed += _ENTRY.size
+        self._index_offset += consumed
+
+    def key(self, text: str) -> bytes:
+        """Content hash of ``text`` under this cache's model."""
+        digest = hashlib.blake2b(digest_size=KEY_SIZE)
+        digest.update(self.model.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+        return digest.digest()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _mapped(self) -> np.memmap:
+        """Memory-map the vector file, remapping after it has grown."""
+        rows = self._file_rows
+        if self._vectors is None or self._vectors.shape[0] < rows:
+            self._vectors = np.memmap(
+                self.directory / VECTORS_FILE,
+                dtype=np.float32,
+                mode="r",
+                shape=(rows, self.dim),
+            )
+        return self._vectors
+
+    def get_many(
+        self, texts: Sequence[str]
+    ) -> tuple[list[Optional[np.ndarray]], list[int]]:
+        """Look up cached embeddings.
+
+        Args:
+            texts: Texts to look up
+
+        Returns:
+            Tuple of (vectors aligned with ``texts``, None where missing;
+            positions of the missing texts). Returned vectors are read-only
+            views into the memory-mapped file.
+        """
+        with self._lock:
+            self._refresh()
+            found: list[Optional[np.ndarray]] = [None] * len(texts)
+            missing: list[int] = []
+            vectors = self._mapped() if self._rows else None
+
+            for i, text in enumerate(texts):
+                row = self._rows.get(self.key(text))
+                if row is None or vectors is None:
+                    missing.append(i)
+                else:
+                    found[i] = vectors[row]
+
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+            return found, missing
+
+    def put_many(self, texts: Sequence[str], vectors: Any) -> None:
+        """Append embeddings for texts that are not cached yet.
+
+        Args:
+            texts: Embedded texts
+            vectors: Matching embeddings, shape ``(len(texts), dim)``
+        """
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != len(texts):
+            raise ValueError("Expected one embedding per text")
+
+        with self._lock, file_lock(self.directory / LOCK_FILE):
+            self._refresh()
+            if self.dim is None:
+                self.dim = int(matrix.shape[1])
+                with open(self.directory / META_FILE, "w", encoding="utf-8") as f:
+                    json.dump({"model": self.model, "dim": self.dim}, f)
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(
+                    f"Embedding dimension {matrix.shape[1]} != cache dimension "
+                    f"{self.dim}"
+                )
+
+            new_keys: list[bytes] = []
+            new_rows: list[int] = []
+            seen: set[bytes] = set()
+            for i, text in enumerate(texts):
+                key = self.key(text)
+                if key not in self._rows and key not in seen:
+                    seen.add(key)
+                    new_keys.append(key)
+                    new_rows.append(i)
+            if not new_keys:
+                return
+
+            with open(self.directory / VECTORS_FILE, "ab") as f:
+                # Rows are numbered by where they land in the file, which
+                # other processes may have grown since this one last looked
+                size = os.fstat(f.fileno()).st_size
+                if size % self._row_bytes:
+                    os.ftruncate(f.fileno(), size - size % self._row_bytes)
+                start = size // self._row_bytes
+                f.write(np.ascontiguousarray(matrix[new_rows]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self.directory / INDEX_FILE, "ab") as f:
+                f.write(
+                    b"".join(
+                        _ENTRY.pack(key, start + offset)
+                        for offset, key in enumerate(new_keys)
+                    )
+                )
+                f.flush()
+
+            self._file_rows = start + len(new_keys)
+            for offset, key in enumerate(new_keys):
+                self._rows[key] = start + offset
+
+    def get_or_compute(
+        self, texts: Sequence[str], compute: Callable[[list[str]], Any]
+    ) -> np.ndarray:
+        """Return embeddings for ``texts``, computing only the misses.
+
+        Args:
+            texts: Texts to embed
+            compute: Embeds a list of texts in one batch
+
+        Returns:
+            Float32 matrix of shape ``(len(texts), dim)``
+        """
+        found, missing = self.get_many(texts)
+        if missing:
+            # Embed each distinct missing text once
+            unique = list(dict.fromkeys(texts[i] for i in missing))
+            computed = np.asarray(compute(unique), dtype=np.float32)
+            self.put_many(unique, computed)
+            by_text = dict(zip(unique, computed))
+            for i in missing:
+                found[i] = by_text[texts[i]]
+
+        if not texts:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.stack(found)  # type: ignore[arg-type]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get cache size and hit/miss counters."""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._rows),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
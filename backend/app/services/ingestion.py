@@ -0,0 +1,298 @@
+"""Streaming, resumable bulk ingestion into the RAG knowledge base.
+
+Sources are read lazily, one record at a time, from a directory tree, a
+JSONL file or plain text files. Records are embedded and inserted in batches
+bounded by both document count and total characters, so memory use does not
+grow with corpus size. After each batch is stored, the pipeline checkpoints
+the file and byte offset it has reached, and an interrupted run resumes from
+there instead of starting over. A run that reaches the end of its source
+clears the checkpoint, so the next run rescans everything and picks up
+edited files.
+"""
+
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from .chunking import TokenChunker
+from .rag_service import content_hash
+
+TEXT_SUFFIXES = {".txt", ".md", ".rst"}
+JSONL_SUFFIXES = {".jsonl", ".ndjson"}
+
+
+@dataclass
+class SourceRecord:
+    """One document read from a source file."""
+
+    text: str
+    metadata: Dict[str, Any]
+    id: str
+    path: str
+    # Byte offset just past this record, used for checkpoints
+    offset: int
+
+
+@dataclass
+class IngestionStats:
+    """Counters for one ingestion run."""
+
+    documents: int = 0
+    chunks: int = 0
+    skipped: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    resumed_from: Optional[Dict[str, Any]] = None
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.documents / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "documents": self.documents,
+            "chunks": self.chunks,
+            "skipped": self.skipped,
+            "batches": self.batches,
+            "seconds": round(self.seconds, 3),
+            "docs_per_second": round(self.docs_per_second, 1),
+            "resumed_from": self.resumed_from,
+        }
+
+
+def _order_key(relpath: str) -> tuple[str, ...]:
+    """Sort key of a relative POSIX path, component by component.
+
+    Files are listed and resumed in this order, so ``a/b.txt`` sorts before
+    ``a-c.txt`` in both places although ``"/" > "-"`` as strings.
+    """
+    return tuple(relpath.split("/"))
+
+
+def _source_files(source: Path) -> list[Path]:
+    """List ingestible files under ``source`` in a stable order."""
+    if source.is_file():
+        return [source]
+
+    suffixes = TEXT_SUFFIXES | JSONL_SUFFIXES
+    return sorted(
+        (
+            path
+            for path in source.rglob("*")
+            if path.is_file() and path.suffix.lower() in suffixes
+        ),
+        key=lambda path: _order_key(path.relative_to(source).as_posix()),
+    )
+
+
+def _iter_jsonl(path: Path, relpath: str, start: int) -> Iterator[SourceRecord]:
+    """Yield records from a JSONL file, one JSON object per line.
+
+    Each object needs a ``text`` (or ``document``) field and may carry
+    ``metadata`` and ``id``. Rows without an id are keyed by a hash of their
+    text, so re-ingesting them is idempotent.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        for raw in f:
+            offset += len(raw)
+            line = raw.strip()
+            if not line:
+                continue
+
+            row = json.loads(line)
+            text = row.get("text") or row.get("document")
+            if not text:
+                continue
+
+            metadata = dict(row.get("metadata") or {})
+            metadata.setdefault("source", relpath)
+            yield SourceRecord(
+                text=text,
+                metadata=metadata,
+                id=str(row.get("id") or content_hash(text)),
+                path=relpath,
+                offset=offset,
+            )
+
+
+def _iter_text(path: Path, relpath: str) -> Iterator[SourceRecord]:
+    """Yield a whole text file as a single record."""
+    text = path.read_text(encoding="utf-8").strip()
+    if text:
+        yield SourceRecord(
+            text=text,
+            metadata={"source": relpath},
+            id=relpath,
+            path=relpath,
+            offset=path.stat().st_size,
+        )
+
+
+def iter_source(
+    source: str | os.PathLike, resume: Optional[Dict[str, Any]] = None
+) -> Iterator[SourceRecord]:
+    """Lazily read documents from a file or directory.
+
+    Args:
+        source: Directory, JSONL file or text file
+        resume: Checkpoint (``{"path", "offset"}``) to continue after
+
+    Yields:
+        SourceRecord for each document, in a stable order
+    """
+    root = Path(source)
+    base = root if root.is_dir() else root.parent
+
+    for path in _source_files(root):
+        relpath = path.relative_to(base).as_posix()
+        start = 0
+        if resume:
+            if _order_key(relpath) < _order_key(resume["path"]):
+                continue
+            if relpath == resume["path"]:
+                start = resume["offset"]
+
+        if path.suffix.lower() in JSONL_SUFFIXES:
+            yield from _iter_jsonl(path, relpath, start)
+        elif start == 0:
+            yield from _iter_text(path, relpath)
+
+
+class IngestionPipeline:
+    """Batching, checkpointing loader for a RAGService."""
+
+    def __init__(
+        self,
+        rag_service: Any,
+        batch_size: int = 64,
+        max_batch_chars: int = 200_000,
+        checkpoint_path: Optional[str | os.PathLike] = None,
+        chunker: Optional[TokenChunker] = None,
+    ):
+        """Initialize the pipeline.
+
+        Args:
+            rag_service: RAGService to ingest into
+            batch_size: Maximum texts (documents or chunks) per embed/insert
+                batch
+            max_batch_chars: Maximum total characters per batch
+            checkpoint_path: Optional JSON file recording progress
+            chunker: Optional chunker splitting documents before embedding
+        """
+        self.rag_service = rag_service
+        self.chunker = chunker
+        self.batch_size = batch_size
+        self.max_batch_chars = max_batch_chars
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+
+    def load_checkpoint(self, source: str | os.PathLike) -> Optional[Dict[str, Any]]:
+        """Load the checkpoint for ``source``, if one exists."""
+        if not self.checkpoint_path or not self.checkpoint_path.exists():
+            return None
+
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("source") != str(Path(source).resolve()):
+            return None
+        return checkpoint
+
+    def _save_checkpoint(
+        self, source: str | os.PathLike, record: SourceRecord, documents: int
+    ) -> None:
+        if not self.checkpoint_path:
+            return
+
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.checkpoint_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "source": str(Path(source).resolve()),
+                    "path": record.path,
+                    "offset": record.offset,
+                    "documents": documents,
+                },
+                f,
+            )
+        os.replace(tmp, self.checkpoint_path)
+
+    def clear_checkpoint(self) -> None:
+        """Forget saved progress so the next run starts from the beginning."""
+        if self.checkpoint_path and self.checkpoint_path.exists():
+            self.checkpoint_path.unlink()
+
+    def run(
+        self,
+        source: str | os.PathLike,
+        progress: Optional[Any] = None,
+    ) -> IngestionStats:
+        """Ingest every document under ``source``.
+
+        Args:
+            source: Directory, JSONL file or text file
+            progress: Optional callback receiving IngestionStats per batch
+
+        Returns:
+            IngestionStats for this run
+        """
+        stats = IngestionStats()
+        checkpoint = self.load_checkpoint(source)
+        stats.resumed_from = checkpoint
+        done_before = checkpoint["documents"] if checkpoint else 0
+
+        started = time.perf_counter()
+        texts: list[str] = []
+        metadatas: list[Dict[str, Any]] = []
+        ids: list[str] = []
+        batch_chars = 0
+        last: Optional[SourceRecord] = None
+
+        def flush() -> None:
+            nonlocal texts, metadatas, ids, batch_chars
+            counts = self.rag_service.add_documents(
+                documents=texts, metadatas=metadatas, ids=ids
+            )
+            stats.skipped += counts["skipped"]
+            stats.chunks += len(texts)
+            stats.batches += 1
+            stats.seconds = time.perf_counter() - started
+            self._save_checkpoint(source, last, done_before + stats.documents)
+            if progress:
+                progress(stats)
+            texts, metadatas, ids = [], [], []
+            batch_chars = 0
+
+        for record in iter_source(source, resume=checkpoint):
+            # Batches end on record boundaries so checkpoints stay exact
+            if texts and (
+                len(texts) >= self.batch_size
+                or batch_chars + len(record.text) > self.max_batch_chars
+            ):
+                flush()
+
+            if self.chunker:
+                chunked = self.chunker.chunk_documents(
+                    [record.text], [record.metadata], [record.id]
+                )
+            else:
+                chunked = ([record.text], [record.metadata], [record.id])
+            texts.extend(chunked[0])
+            metadatas.extend(chunked[1])
+            ids.extend(chunked[2])
+            batch_chars += len(record.text)
+            stats.documents += 1
+            last = record
+
+        if texts:
+            flush()
+
+        # The source is exhausted; the next run starts over
+        self.clear_checkpoint()
+
+        stats.seconds = time.perf_counter() - started
+        return stats
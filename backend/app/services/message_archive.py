@@ -0,0 +1,324 @@
+"""Cold-storage archive for old agent messages.
+
+Messages older than a cutoff are moved out of the ``messages`` table into
+append-only segment files. Each archive run writes one new segment made of
+concatenated gzip members, one member ("block") per agent, holding that
+agent's messages as JSON lines in ``(timestamp, id)`` order.
+
+A small JSON index maps each agent to its blocks (segment, byte offset,
+length and key range). Reads memory-map the segment and decompress only the
+blocks whose key range overlaps the requested page, so paging deep into the
+archive never scans unrelated agents or unrelated months.
+
+The archive script runs in its own process, so archive runs hold a file
+lock and readers reload the index whenever the file has been replaced.
+"""
+
+import gzip
+import json
+import mmap
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from flask import current_app, has_app_context
+
+from app import db
+from app.models import Message
+from app.utils.file_lock import file_lock
+
+INDEX_FILE = "index.json"
+LOCK_FILE = ".lock"
+
+# Key timestamp of messages without one; SQLite orders NULL first as well
+NULL_TIMESTAMP = datetime.min
+
+MessageKey = tuple[datetime, int]
+
+
+def message_key(message: Dict[str, Any]) -> MessageKey:
+    """Get the ``(timestamp, id)`` sort key of a serialized message.
+
+    Args:
+        message: Message dictionary as produced by ``Message.to_dict``
+
+    Returns:
+        Sort key tuple
+    """
+    timestamp = message.get("timestamp")
+    if timestamp is None:
+        return (NULL_TIMESTAMP, message["id"])
+    return (datetime.fromisoformat(timestamp), message["id"])
+
+
+def _encode_key(key: MessageKey) -> list:
+    return [key[0].isoformat(), key[1]]
+
+
+def _decode_key(value: list) -> MessageKey:
+    return (datetime.fromisoformat(value[0]), value[1])
+
+
+class MessageArchive:
+    """Append-only, compressed segment store for archived messages."""
+
+    def __init__(self, directory: str | os.PathLike):
+        """Initialize the archive.
+
+        Args:
+            directory: Directory holding segment files and the index
+        """
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._maps: Dict[str, mmap.mmap] = {}
+        self._index: Dict[str, Any] = {}
+        self._index_version: Optional[tuple[int, int, int]] = None
+        self._refresh_index()
+
+    def _refresh_index(self) -> Dict[str, Any]:
+        """Reload the index if another process replaced it since last read."""
+        path = self.directory / INDEX_FILE
+        try:
+            stat = path.stat()
+            version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            version = None
+
+        if not self._index or version != self._index_version:
+            if version is None:
+                self._index = {"next_segment": 1, "agents": {}, "pending_delete": []}
+            else:
+                with open(path, encoding="utf-8") as f:
+                    self._index = json.load(f)
+            self._index_version = version
+        return self._index
+
+    def _save_index(self) -> None:
+        path = self.directory / INDEX_FILE
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+        stat = path.stat()
+        self._index_version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def has_messages(self, agent_id: int) -> bool:
+        """Check whether any messages of an agent are archived."""
+        return str(agent_id) in self._refresh_index()["agents"]
+
+    def archive_messages(
+        self, cutoff: datetime, batch_size: int = 5000
+    ) -> Dict[str, int]:
+        """Move messages older than ``cutoff`` into the archive.
+
+        Each batch is written and fsynced as a new segment, recorded in the
+        index together with the ids it covers, and only then deleted from
+        the database. An interrupted run is finished by the next one.
+
+        Args:
+            cutoff: Messages with an earlier timestamp are archived
+            batch_size: Maximum messages per segment
+
+        Returns:
+            Dictionary with archived message and segment counts
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._lock, file_lock(self.directory / LOCK_FILE):
+            self._refresh_index()
+            self._finish_pending_delete()
+
+            # Never archive the newest row: SQLite reuses rowids after the
+            # current maximum is deleted, which would make ids ambiguous.
+            max_id = db.session.query(db.func.max(Message.id)).scalar()
+            if max_id is None:
+                return {"archived": 0, "segments": 0}
+
+            archived = 0
+            segments = 0
+            while True:
+                rows = (
+                    Message.query.filter(
+                        Message.timestamp < cutoff, Message.id < max_id
+                    )
+                    .order_by(Message.agent_id, Message.timestamp, Message.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not rows:
+                    break
+
+                self._write_segment(rows)
+                self._finish_pending_delete()
+                archived += len(rows)
+                segments += 1
+
+            return {"archived": archived, "segments": segments}
+
+    def _write_segment(self, rows: list[Message]) -> None:
+        """Write one segment of per-agent blocks and register it."""
+        name = f"segment-{self._index['next_segment']:06d}.jsonl.gz"
+        blocks: list[tuple[int, Dict[str, Any]]] = []
+
+        with open(self.directory / name, "wb") as f:
+            start = 0
+            while start < len(rows):
+                agent_id = rows[start].agent_id
+                end = start
+                while end < len(rows) and rows[end].agent_id == agent_id:
+                    end += 1
+                chunk = rows[start:end]
+
+                payload = "".join(
+                    json.dumps(msg.to_dict(), separators=(",", ":")) + "\n"
+                    for msg in chunk
+                ).encode("utf-8")
+                data = gzip.compress(payload)
+                blocks.append(
+                    (
+                        agent_id,
+                        {
+                            "segment": name,
+                            "offset": f.tell(),
+                            "length": len(data),
+                            "count": len(chunk),
+                            "first": _encode_key((chunk[0].timestamp, chunk[0].id)),
+                            "last": _encode_key((chunk[-1].timestamp, chunk[-1].id)),
+                        },
+                    )
+                )
+                f.write(data)
+                start = end
+
+            f.flush()
+            os.fsync(f.fileno())
+
+        for agent_id, block in blocks:
+            self._index["agents"].setdefault(str(agent_id), []).append(block)
+        self._index["next_segment"] += 1
+        self._index["pending_delete"] = [msg.id for msg in rows]
+        self._save_index()
+
+    def _finish_pending_delete(self) -> None:
+        """Delete rows that are safely archived but still in the database."""
+        pending = self._index.get("pending_delete") or []
+        if not pending:
+            return
+
+        for start in range(0, len(pending), 500):
+            Message.query.filter(Message.id.in_(pending[start : start + 500])).delete(
+                synchronize_session=False
+            )
+        db.session.commit()
+
+        self._index["pending_delete"] = []
+        self._save_index()
+
+    def _read_block(self, block: Dict[str, Any]) -> list[Dict[str, Any]]:
+        """Decompress one block straight from the memory-mapped segment."""
+        segment = block["segment"]
+        mapped = self._maps.get(segment)
+        if mapped is None:
+            with open(self.directory / segment, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = mapped
+
+        view = memoryview(mapped)[block["offset"] : block["offset"] + block["length"]]
+        try:
+            payload = gzip.decompress(view)
+        finally:
+            view.release()
+
+        return [json.loads(line) for line in payload.splitlines()]
+
+    def read(
+        self,
+        agent_id: int,
+        limit: int,
+        lower: Optional[MessageKey] = None,
+        upper: Optional[MessageKey] = None,
+        newest: bool = True,
+        sender: Optional[str] = None,
+    ) -> list[tuple[MessageKey, Dict[str, Any]]]:
+        """Read archived messages of an agent within an exclusive key range.
+
+        Args:
+            agent_id: Database ID of the agent
+            limit: Maximum number of messages to return
+            lower: Only messages with a key greater than this
+            upper: Only messages with a key less than this
+            newest: Take the newest ``limit`` matches (else the oldest)
+            sender: Optional sender filter
+
+        Returns:
+            ``(key, message)`` pairs in ascending key order
+        """
+        blocks = []
+        for block in self._refresh_index()["agents"].get(str(agent_id), []):
+            first, last = _decode_key(block["first"]), _decode_key(block["last"])
+            if (lower is None or last > lower) and (upper is None or first < upper):
+                blocks.append((first, last, block))
+
+        # Visit blocks nearest the requested end first and stop once the
+        # remaining blocks cannot improve on what has been collected.
+        if newest:
+            blocks.sort(key=lambda b: b[1], reverse=True)
+        else:
+            blocks.sort(key=lambda b: b[0])
+
+        found: list[tuple[MessageKey, Dict[str, Any]]] = []
+        for first, last, block in blocks:
+            if len(found) >= limit:
+                found.sort(key=lambda item: item[0], reverse=newest)
+                bound = found[limit - 1][0]
+                if (newest and last < bound) or (not newest and first > bound):
+                    break
+
+            for message in self._read_block(block):
+                key = message_key(message)
+                if lower is not None and key <= lower:
+                    continue
+                if upper is not None and key >= upper:
+                    continue
+                if sender and message.get("sender") != sender:
+                    continue
+                found.append((key, message))
+
+        found.sort(key=lambda item: item[0], reverse=newest)
+        return sorted(found[:limit], key=lambda item: item[0])
+
+    def close(self) -> None:
+        """Release memory-mapped segments."""
+        for mapped in self._maps.values():
+            mapped.close()
+        self._maps.clear()
+
+
+# Global message archive instance
+_message_archive: Optional[MessageArchive] = None
+
+
+def get_message_archive() -> Optional[MessageArchive]:
+    """Get the message archive configured for the current app.
+
+    Returns:
+        MessageArchive instance, or None if archiving is disabled
+    """
+    global _message_archive
+
+    directory = (
+        current_app.config.get("MESSAGE_ARCHIVE_DIR") if has_app_context() else None
+    )
+    if not directory:
+        return None
+
+    if _message_archive is None or _message_archive.directory != Path(directory):
+        if _message_archive is not None:
+            _message_archive.close()
+        _message_archive = MessageArchive(directory)
+
+    return _message_archive
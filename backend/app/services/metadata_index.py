@@ -0,0 +1,141 @@
+"""In-process inverted index from metadata values to document ids.
+
+Lets RAGService bound a ``where`` filter to a candidate id set before any
+vector work. Scalar values are indexed under ``(key, value)``. Equality,
+``$eq``, ``$in``, ``$and`` and ``$or`` are answered from the postings.
+Other operators are not indexed. Inside an ``$and`` (or alongside sibling
+keys) such clauses are skipped, which leaves a superset that the store's
+own filter narrows down.
+"""
+
+import threading
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+# Unique per document, so indexing it would cost a posting per id for
+# filters nobody runs
+UNINDEXED_KEYS = frozenset({"content_hash"})
+
+_SCALARS = (str, int, float, bool)
+
+
+def _value_key(value: Any) -> tuple:
+    # Keep True and 1 apart, as Chroma does
+    return (isinstance(value, bool), value)
+
+
+class MetadataIndex:
+    """Postings from metadata ``(key, value)`` pairs to document ids."""
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self._lock = threading.RLock()
+        self._postings: Dict[tuple, set[str]] = {}
+        self._doc_keys: Dict[str, list[tuple]] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_keys)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_keys
+
+    def _remove(self, doc_id: str) -> None:
+        for posting_key in self._doc_keys.pop(doc_id, ()):
+            ids = self._postings[posting_key]
+            ids.discard(doc_id)
+            if not ids:
+                del self._postings[posting_key]
+
+    def add(
+        self, ids: Sequence[str], metadatas: Sequence[Optional[Dict[str, Any]]]
+    ) -> None:
+        """Index documents, replacing any previous metadata of the same id.
+
+        Args:
+            ids: Document IDs
+            metadatas: Metadata for each document
+        """
+        with self._lock:
+            for doc_id, metadata in zip(ids, metadatas):
+                self._remove(doc_id)
+                keys = [
+                    (key, _value_key(value))
+                    for key, value in (metadata or {}).items()
+                    if key not in UNINDEXED_KEYS and isinstance(value, _SCALARS)
+                ]
+                self._doc_keys[doc_id] = keys
+                for posting_key in keys:
+                    self._postings.setdefault(posting_key, set()).add(doc_id)
+
+    def update(
+        self, ids: Sequence[str], metadatas: Sequence[Optional[Dict[str, Any]]]
+    ) -> None:
+        """Re-index documents already in the index; unknown ids are ignored."""
+        with self._lock:
+            known = [(i, m) for i, m in zip(ids, metadatas) if i in self._doc_keys]
+            self.add([i for i, _ in known], [m for _, m in known])
+
+    def delete(self, ids: Iterable[str]) -> None:
+        """Remove documents from the index.
+
+        Args:
+            ids: Document IDs (unknown ids are ignored)
+        """
+        with self._lock:
+            for doc_id in ids:
+                self._remove(doc_id)
+
+    def clear(self) -> None:
+        """Remove every document."""
+        with self._lock:
+            self._postings.clear()
+            self._doc_keys.clear()
+
+    def _lookup(self, key: str, value: Any) -> set[str]:
+        if not isinstance(value, _SCALARS):
+            return set()
+        return self._postings.get((key, _value_key(value)), set())
+
+    def _field(self, key: str, condition: Any) -> Optional[set[str]]:
+        if not isinstance(condition, dict):
+            return set(self._lookup(key, condition))
+
+        result: Optional[set[str]] = None
+        for op, operand in condition.items():
+            if op == "$eq":
+                part = set(self._lookup(key, operand))
+            elif op == "$in":
+                part = set().union(*(self._lookup(key, v) for v in operand))
+            else:
+                continue
+            result = part if result is None else result & part
+        return result
+
+    def candidates(self, where: Dict[str, Any]) -> Optional[set[str]]:
+        """Ids that may match a Chroma-style ``where`` filter.
+
+        Args:
+            where: Metadata filter
+
+        Returns:
+            A superset of the matching ids, or None when no clause of the
+            filter can be answered from the index
+        """
+        with self._lock:
+            return self._candidates(where)
+
+    def _candidates(self, where: Dict[str, Any]) -> Optional[set[str]]:
+        result: Optional[set[str]] = None
+        for key, condition in where.items():
+            if key == "$and":
+                parts = [self._candidates(clause) for clause in condition]
+                known = [part for part in parts if part is not None]
+                part = set.intersection(*known) if known else None
+            elif key == "$or":
+                parts = [self._candidates(clause) for clause in condition]
+                # One unbounded branch leaves the union unbounded
+                part = None if None in parts else set().union(*parts)
+            else:
+                part = self._field(key, condition)
+            if part is not None:
+                result = part if result is None else result & part
+        return result
@@ -0,0 +1,693 @@
+"""Int8-quantized, memory-mapped brute-force vector store.
+
+For collections up to roughly a million vectors a vectorized scan beats an
+HNSW graph on latency and needs no index build. Vectors are normalized and
+quantized per row to int8 codes plus one float32 scale, a quarter of the
+float32 footprint, and scanned in fixed-size blocks. The best
+``n_results * rescore_factor`` candidates can then be re-scored exactly
+against the float32 originals, which stay on disk behind a memory map and
+are only touched for those rows.
+
+Every file is append-only. An add writes new rows to the code, scale and
+vector files and a line to a JSONL record log (id, document, metadata). An
+update of text or embedding appends a fresh row and retires the old one.
+Deletes are logged as tombstones. Once dead rows outnumber live ones, the
+files are rewritten.
+
+Several processes may share a collection. Writes hold an exclusive file
+lock, number new rows by the size of the row files and append the record
+log only after the rows are on disk. Each instance replays log lines
+written by others before reading.
+
+The class implements the ``vector_store.VectorStore`` protocol. Distances
+are cosine distances (``1 - cosine similarity``).
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterator, Optional, Sequence
+
+import numpy as np
+
+from app.utils.file_lock import file_lock
+
+from .vector_store import match_where, normalize
+
+CODES_FILE = "codes.i8"
+SCALES_FILE = "scales.f32"
+VECTORS_FILE = "vectors.f32"
+RECORDS_FILE = "records.jsonl"
+META_FILE = "meta.json"
+LOCK_FILE = ".lock"
+
+# Rows dequantized at a time during a scan; bounds temporary memory
+SCAN_BLOCK_ROWS = 16384
+
+# Compaction is skipped while fewer rows than this are dead
+MIN_COMPACT_ROWS = 1024
+
+
+def quantize(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization.
+
+    Args:
+        vectors: Float matrix, one vector per row
+
+    Returns:
+        Tuple of (int8 codes, float32 scale per row)
+    """
+    peak = np.abs(vectors).max(axis=1)
+    scales = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+class QuantizedCollection:
+    """``VectorStore`` backed by int8 codes in memory maps."""
+
+    space = "cosine"
+
+    def __init__(
+        self,
+        directory: str | os.PathLike,
+        rescore: bool = True,
+        rescore_factor: int = 4,
+    ):
+        """Open (or create) a quantized collection.
+
+        Args:
+            directory: Directory holding the collection files
+            rescore: Keep float32 vectors and re-score top candidates exactly
+            rescore_factor: Candidates re-scored per requested result
+        """
+        self.directory = Path(directory)
+        self.rescore = rescore
+        self.rescore_factor = rescore_factor
+        self.dim: Optional[int] = None
+
+        self._lock = threading.RLock()
+        self._write_depth = 0
+        # Bumped whenever rows are renumbered, so a scan started before a
+        # compaction is not mapped onto the new rows
+        self._generation = 0
+        self._reset_state()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._writing():
+            pass
+
+    def _reset_state(self) -> None:
+        self._ids: list[Optional[str]] = []
+        self._documents: list[Optional[str]] = []
+        self._metadatas: list[Optional[Dict[str, Any]]] = []
+        self._row_of: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._codes: Optional[np.memmap] = None
+        self._scales: Optional[np.memmap] = None
+        self._vectors: Optional[np.memmap] = None
+        self._mapped_rows = 0
+        # Bytes of the record log replayed so far, and which file they
+        # came from (a compaction elsewhere replaces it)
+        self._records_offset = 0
+        self._records_file: Optional[tuple[int, int]] = None
+
+    # -- persistence -------------------------------------------------------
+
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        """Hold the thread lock and the exclusive file lock.
+
+        The outermost block replays other processes' writes and trims torn
+        trailing data, so appends land right after the last complete row.
+        """
+        with self._lock:
+            if self._write_depth:
+                self._write_depth += 1
+                try:
+                    yield
+                finally:
+                    self._write_depth -= 1
+                return
+
+            with file_lock(self.directory / LOCK_FILE):
+                self._write_depth = 1
+                try:
+                    self._refresh()
+                    self._trim()
+                    yield
+                finally:
+                    self._write_depth = 0
+
+    @contextmanager
+    def _reading(self) -> Iterator[None]:
+        """Hold the thread lock with other processes' writes replayed.
+
+        A shared file lock keeps a compaction elsewhere from swapping the
+        files midway through the replay.
+        """
+        with self._lock:
+            if self._write_depth:
+                yield
+                return
+            with file_lock(self.directory / LOCK_FILE, shared=True):
+                self._refresh()
+            yield
+
+    def _row_files(self) -> Dict[str, int]:
+        """Row files of this collection and their row sizes in bytes."""
+        files = {CODES_FILE: self.dim, SCALES_FILE: 4}
+        if self.rescore:
+            files[VECTORS_FILE] = 4 * self.dim
+        return files
+
+    def _complete_rows(self) -> int:
+        """Rows present in every row file (torn-write safety)."""
+        rows = []
+        for name, row_bytes in self._row_files().items():
+            path = self.directory / name
+            rows.append(path.stat().st_size // row_bytes if path.exists() else 0)
+        return min(rows)
+
+    def _trim(self) -> None:
+        """Cut partial rows and a partial log line left by a torn write.
+
+        Only called under the exclusive file lock, when no writer is
+        midway through an append.
+        """
+        if self.dim is None:
+            return
+        rows = self._complete_rows()
+        for name, row_bytes in self._row_files().items():
+            path = self.directory / name
+            if path.exists() and path.stat().st_size > rows * row_bytes:
+                os.truncate(path, rows * row_bytes)
+        records_path = self.directory / RECORDS_FILE
+        if records_path.exists() and records_path.stat().st_size > self._records_offset:
+            os.truncate(records_path, self._records_offset)
+
+    def _grow(self, rows: int) -> None:
+        extra = rows - len(self._ids)
+        if extra > 0:
+            self._ids.extend([None] * extra)
+            self._documents.extend([None] * extra)
+            self._metadatas.extend([None] * extra)
+            self._alive = np.concatenate([self._alive, np.zeros(extra, dtype=bool)])
+
+    def _refresh(self) -> None:
+        """Replay record log lines not seen yet, including other processes'."""
+        meta_path = self.directory / META_FILE
+        records_path = self.directory / RECORDS_FILE
+        try:
+            stat = records_path.stat()
+        except FileNotFoundError:
+            stat = None
+        identity = (stat.st_dev, stat.st_ino) if stat else None
+
+        if self._records_file is not None and identity != self._records_file:
+            # Compacted or cleared by another process; start over
+            self._reset_state()
+            self._generation += 1
+            if not meta_path.exists():
+                self.dim = None
+
+        if self.dim is None:
+            if not meta_path.exists():
+                return
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            self.dim = int(meta["dim"])
+            # Re-scoring needs the float vectors, which only exist if the
+            # collection was created with them.
+            self.rescore = self.rescore and meta.get("float_vectors", False)
+
+        if stat is None or stat.st_size == self._records_offset:
+            return
+
+        rows = self._complete_rows()
+        self._grow(rows)
+        with open(records_path, "rb") as f:
+            f.seek(self._records_offset)
+            data = f.read()
+
+        consumed = 0
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if "delete" in entry:
+                for doc_id in entry["delete"]:
+                    self._retire(doc_id)
+            elif entry["row"] < rows:
+                self._place(
+                    entry["id"], entry["row"], entry["document"], entry["metadata"]
+                )
+            else:
+                # Rows are written before their records, so this is a torn
+                # write; stop here
+                break
+            consumed += len(line)
+        self._records_offset += consumed
+        self._records_file = identity
+
+    def _mapped(self) -> tuple[np.memmap, np.memmap, Optional[np.memmap]]:
+        """Memory-map the row files, remapping after they have grown."""
+        rows = len(self._ids)
+        if self._codes is None or self._mapped_rows != rows:
+            self._codes = np.memmap(
+                self.directory / CODES_FILE, np.int8, "r", shape=(rows, self.dim)
+            )
+            self._scales = np.memmap(
+                self.directory / SCALES_FILE, np.float32, "r", shape=(rows,)
+            )
+            self._vectors = None
+            if self.rescore:
+                self._vectors = np.memmap(
+                    self.directory / VECTORS_FILE,
+                    np.float32,
+                    "r",
+                    shape=(rows, self.dim),
+                )
+            self._mapped_rows = rows
+        return self._codes, self._scales, self._vectors  # type: ignore[return-value]
+
+    def _place(
+        self,
+        doc_id: str,
+        row: int,
+        document: Optional[str],
+        metadata: Optional[Dict[str, Any]],
+    ) -> None:
+        old = self._row_of.get(doc_id)
+        if old is not None and old != row:
+            self._alive[old] = False
+            self._documents[old] = self._metadatas[old] = None
+        self._row_of[doc_id] = row
+        self._ids[row] = doc_id
+        self._documents[row] = document
+        self._metadatas[row] = metadata or {}
+        self._alive[row] = True
+
+    def _retire(self, doc_id: str) -> bool:
+        row = self._row_of.pop(doc_id, None)
+        if row is None:
+            return False
+        self._alive[row] = False
+        self._documents[row] = self._metadatas[row] = None
+        return True
+
+    def _log(self, entries: list[Dict[str, Any]]) -> None:
+        """Append record log lines (under the file lock)."""
+        with open(self.directory / RECORDS_FILE, "ab") as f:
+            f.write(
+                "".join(
+                    json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries
+                ).encode("utf-8")
+            )
+            f.flush()
+            stat = os.fstat(f.fileno())
+        # Everything before these lines was replayed under the same lock
+        self._records_offset = stat.st_size
+        self._records_file = (stat.st_dev, stat.st_ino)
+
+    def _append(
+        self,
+        ids: Sequence[str],
+        embeddings: Any,
+        documents: Sequence[Optional[str]],
+        metadatas: Sequence[Optional[Dict[str, Any]]],
+    ) -> None:
+        """Append rows for ``ids``, retiring any older rows they replace."""
+        if not ids:
+            return
+
+        vectors = normalize(np.asarray(embeddings, dtype=np.float32))
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            with open(self.directory / META_FILE, "w", encoding="utf-8") as f:
+                json.dump({"dim": self.dim, "float_vectors": self.rescore}, f)
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Embedding dimension {vectors.shape[1]} != collection dimension "
+                f"{self.dim}"
+            )
+
+        codes, scales = quantize(vectors)
+        # Rows are numbered by where they land in the files, which other
+        # processes may have grown; the log line is written once the rows
+        # are on disk
+        start = self._complete_rows()
+        payload = {CODES_FILE: codes, SCALES_FILE: scales}
+        if self.rescore:
+            payload[VECTORS_FILE] = vectors
+        for name, data in payload.items():
+            with open(self.directory / name, "ab") as f:
+                f.write(data.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        self._grow(start + len(ids))
+
+        entries = []
+        for offset, (doc_id, document, metadata) in enumerate(
+            zip(ids, documents, metadatas)
+        ):
+            self._place(doc_id, start + offset, document, metadata)
+            entries.append(
+                {
+                    "id": doc_id,
+                    "row": start + offset,
+                    "document": document,
+                    "metadata": metadata or {},
+                }
+            )
+        self._log(entries)
+
+    def _maybe_compact(self) -> None:
+        dead = len(self._ids) - len(self._row_of)
+        if dead >= MIN_COMPACT_ROWS and dead > len(self._row_of):
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the files with live rows only."""
+        with self._writing():
+            rows = np.flatnonzero(self._alive)
+            if self.dim is None or not self._ids:
+                return
+            if not len(rows):
+                self.clear()
+                return
+            codes, scales, vectors = self._mapped()
+            live = [
+                (self._ids[r], self._documents[r], self._metadatas[r]) for r in rows
+            ]
+            payload = {
+                CODES_FILE: np.ascontiguousarray(codes[rows]).tobytes(),
+                SCALES_FILE: np.ascontiguousarray(scales[rows]).tobytes(),
+            }
+            if vectors is not None:
+                payload[VECTORS_FILE] = np.ascontiguousarray(vectors[rows]).tobytes()
+
+            self._codes = self._scales = self._vectors = None
+            for name, data in payload.items():
+                tmp = self.directory / (name + ".tmp")
+                tmp.write_bytes(data)
+                os.replace(tmp, self.directory / name)
+
+            records = self.directory / RECORDS_FILE
+            tmp = records.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                for row, (doc_id, document, metadata) in enumerate(live):
+                    entry = {
+                        "id": doc_id,
+                        "row": row,
+                        "document": document,
+                        "metadata": metadata,
+                    }
+                    f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            os.replace(tmp, records)
+
+            self._reset_state()
+            self._generation += 1
+            self._refresh()
+
+    # -- collection API ----------------------------------------------------
+
+    def count(self) -> int:
+        with self._reading():
+            return len(self._row_of)
+
+    def version(self) -> Optional[Hashable]:
+        """Generation and record log position, after replaying other writers.
+
+        Every write appends to the record log; compaction and ``clear``
+        replace it and bump the generation.
+        """
+        with self._reading():
+            return (self._generation, self._records_file, self._records_offset)
+
+    def add(
+        self,
+        ids: Sequence[str],
+        embeddings: Any,
+        documents: Optional[Sequence[str]] = None,
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> None:
+        """Add new records; ids that already exist are ignored, as in Chroma."""
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+        with self._writing():
+            keep: list[int] = []
+            seen: set[str] = set()
+            for i, doc_id in enumerate(ids):
+                if doc_id not in seen and doc_id not in self._row_of:
+                    seen.add(doc_id)
+                    keep.append(i)
+            self._append(
+                [ids[i] for i in keep],
+                np.asarray(embeddings, dtype=np.float32)[keep],
+                [documents[i] for i in keep],
+                [metadatas[i] for i in keep],
+            )
+
+    def upsert(
+        self,
+        ids: Sequence[str],
+        embeddings: Any,
+        documents: Optional[Sequence[str]] = None,
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> None:
+        """Insert or replace records."""
+        with self._writing():
+            self._append(
+                list(ids),
+                embeddings,
+                documents or [None] * len(ids),
+                metadatas or [None] * len(ids),
+            )
+            self._maybe_compact()
+
+    def update(
+        self,
+        ids: Sequence[str],
+        embeddings: Any = None,
+        documents: Optional[Sequence[str]] = None,
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> None:
+        """Update existing records; unknown ids are ignored."""
+        with self._writing():
+            rows = [(i, self._row_of.get(doc_id)) for i, doc_id in enumerate(ids)]
+            rows = [(i, row) for i, row in rows if row is not None]
+            if not rows:
+                return
+
+            def merged(i: int, row: int) -> tuple[Optional[str], Dict[str, Any]]:
+                document = documents[i] if documents is not None else None
+                metadata = metadatas[i] if metadatas is not None else None
+                return (
+                    document if document is not None else self._documents[row],
+                    metadata if metadata is not None else self._metadatas[row] or {},
+                )
+
+            if embeddings is not None:
+                values = [merged(i, row) for i, row in rows]
+                self._append(
+                    [ids[i] for i, _ in rows],
+                    np.asarray(embeddings, dtype=np.float32)[[i for i, _ in rows]],
+                    [document for document, _ in values],
+                    [metadata for _, metadata in values],
+                )
+                self._maybe_compact()
+                return
+
+            entries = []
+            for i, row in rows:
+                document, metadata = merged(i, row)
+                self._place(ids[i], row, document, metadata)
+                entries.append(
+                    {
+                        "id": ids[i],
+                        "row": row,
+                        "document": document,
+                        "metadata": metadata,
+                    }
+                )
+            self._log(entries)
+
+    def delete(self, ids: Sequence[str]) -> None:
+        """Delete records by id."""
+        with self._writing():
+            removed = [doc_id for doc_id in ids if self._retire(doc_id)]
+            if removed:
+                self._log([{"delete": removed}])
+                self._maybe_compact()
+
+    def clear(self) -> None:
+        """Delete every record and the backing files."""
+        with self._writing():
+            self._reset_state()
+            self._generation += 1
+            self.dim = None
+            for name in (
+                CODES_FILE,
+                SCALES_FILE,
+                VECTORS_FILE,
+                RECORDS_FILE,
+                META_FILE,
+            ):
+                (self.directory / name).unlink(missing_ok=True)
+
+    def _allowed_rows(self, where: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Boolean row mask of live rows matching ``where``."""
+        if not where:
+            return self._alive.copy()
+        mask = np.zeros(len(self._ids), dtype=bool)
+        for row in np.flatnonzero(self._alive):
+            mask[row] = match_where(self._metadatas[row], where)
+        return mask
+
+    def _row_vectors(self, rows: np.ndarray) -> np.ndarray:
+        codes, scales, vectors = self._mapped()
+        if vectors is not None:
+            return np.asarray(vectors[rows])
+        return codes[rows].astype(np.float32) * scales[rows, None]
+
+    def get(
+        self,
+        ids: Optional[Sequence[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        include: Optional[Sequence[str]] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        """Fetch records by id and/or metadata filter."""
+        include = include if include is not None else ["documents", "metadatas"]
+        with self._reading():
+            if ids is not None:
+                rows = [self._row_of[i] for i in ids if i in self._row_of]
+                rows = [r for r in rows if match_where(self._metadatas[r], where)]
+            else:
+                rows = list(np.flatnonzero(self._allowed_rows(where)))
+            rows = rows[offset : offset + limit if limit else None]
+
+            result: Dict[str, Any] = {"ids": [self._ids[r] for r in rows]}
+            if "documents" in include:
+                result["documents"] = [self._documents[r] for r in rows]
+            if "metadatas" in include:
+                result["metadatas"] = [self._metadatas[r] for r in rows]
+            if "embeddings" in include:
+                result["embeddings"] = (
+                    self._row_vectors(np.asarray(rows, dtype=np.int64))
+                    if rows
+                    else np.empty((0, self.dim or 0), dtype=np.float32)
+                )
+            return result
+
+    def query(
+        self,
+        query_embeddings: Any,
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None,
+        include: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Any]:
+        """Return the nearest records for each query embedding."""
+        include = (
+            include if include is not None else ["documents", "metadatas", "distances"]
+        )
+        queries = normalize(np.atleast_2d(np.asarray(query_embeddings, np.float32)))
+
+        result: Dict[str, Any] = {"ids": []}
+        for key in ("documents", "metadatas", "distances", "embeddings"):
+            if key in include:
+                result[key] = []
+
+        while True:
+            # Snapshot under the lock, scan without it so searches run in
+            # parallel, then map rows back if no compaction renumbered them
+            with self._reading():
+                allowed = self._allowed_rows(where)
+                if self.dim is None or not allowed.any():
+                    for values in result.values():
+                        values.extend([] for _ in queries)
+                    return result
+                codes, scales, vectors = self._mapped()
+                generation = self._generation
+
+            picks = self._scan(queries, n_results, allowed, codes, scales, vectors)
+
+            with self._lock:
+                if generation != self._generation:
+                    continue
+                for chosen, sims in picks:
+                    # Drop rows deleted while the scan ran
+                    keep = self._alive[chosen]
+                    chosen, sims = chosen[keep], sims[keep]
+                    result["ids"].append([self._ids[r] for r in chosen])
+                    if "documents" in result:
+                        result["documents"].append([self._documents[r] for r in chosen])
+                    if "metadatas" in result:
+                        result["metadatas"].append([self._metadatas[r] for r in chosen])
+                    if "distances" in result:
+                        result["distances"].append((1.0 - sims).tolist())
+                    if "embeddings" in result:
+                        result["embeddings"].append(self._row_vectors(chosen))
+                return result
+
+    def _scan(
+        self,
+        queries: np.ndarray,
+        n_results: int,
+        allowed: np.ndarray,
+        codes: np.ndarray,
+        scales: np.ndarray,
+        vectors: Optional[np.ndarray],
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Score every allowed row; returns (rows, similarities) per query."""
+        rows = len(allowed)
+        scores = np.empty((len(queries), rows), dtype=np.float32)
+        for start in range(0, rows, SCAN_BLOCK_ROWS):
+            end = min(start + SCAN_BLOCK_ROWS, rows)
+            block = codes[start:end].astype(np.float32)
+            scores[:, start:end] = (queries @ block.T) * scales[start:end]
+        scores[:, ~allowed] = -np.inf
+
+        live = int(allowed.sum())
+        wanted = min(n_results, live)
+        depth = min(
+            wanted * self.rescore_factor if vectors is not None else wanted, live
+        )
+
+        picks = []
+        for q, query in enumerate(queries):
+            row_scores = scores[q]
+            if depth < rows:
+                top = np.argpartition(-row_scores, depth - 1)[:depth]
+            else:
+                top = np.arange(rows)
+            top = top[np.isfinite(row_scores[top])]
+
+            if vectors is not None:
+                sims = np.asarray(vectors[top]) @ query
+            else:
+                sims = row_scores[top]
+            order = np.argsort(-sims, kind="stable")[:wanted]
+            picks.append((top[order], sims[order]))
+        return picks
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get row counts and the in-memory scan footprint."""
+        with self._reading():
+            rows = len(self._ids)
+        return {
+            "count": self.count(),
+            "rows": rows,
+            "dead_rows": rows - self.count(),
+            "dim": self.dim,
+            "rescore": self.rescore,
+            "scan_bytes": rows * ((self.dim or 0) + 4),
+        }
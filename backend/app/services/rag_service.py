@@ -4,11 +4,107 @@ This service provides semantic search capabilities for the Creator agent
 using vector embeddings and ChromaDB as the vector database.
 """
 
-from typing import Any, Dict, Optional
-import chromadb
-from chromadb.config import Settings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from typing import Any, Callable, Dict, Hashable, Optional
+import numpy as np
 from chromadb.utils import embedding_functions
+import asyncio
+import hashlib
+import json
 import os
+import threading
+import time
+
+from flask import current_app, has_app_context
+
+from .bm25_index import BM25Index
+from .chunking import Tokenizer, chunk_id, get_tokenizer, merge_chunks
+from .embedding_cache import EmbeddingCache
+from .metadata_index import MetadataIndex
+from .quantized_store import QuantizedCollection
+from .snapshot import Snapshot, export_snapshot
+from .vector_store import (
+    ChromaVectorStore,
+    HNSWParams,
+    InMemoryVectorStore,
+    VectorStore,
+    distances,
+    normalize,
+)
+
+# Identifies the model behind DefaultEmbeddingFunction in embedding cache keys
+DEFAULT_EMBEDDING_MODEL = "onnx/all-MiniLM-L6-v2"
+
+SEARCH_MODES = ("vector", "hybrid")
+
+VECTOR_BACKENDS = ("chroma", "quantized", "memory")
+
+# Reciprocal rank fusion damping constant (Cormack et al.)
+RRF_K = 60
+
+# Documents fetched per page when rebuilding the BM25 or metadata index
+LEXICAL_REBUILD_PAGE = 1000
+
+# Filtered searches whose metadata filter narrows the collection to at most
+# this many documents are scored exactly instead of through the ANN index
+PREFILTER_MAX_CANDIDATES = 2048
+
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+# Context packing: MMR trade-off, candidates retrieved per wanted passage, and
+# the cosine similarity above which a passage counts as a duplicate
+DEFAULT_MMR_LAMBDA = 0.7
+MMR_CANDIDATE_FACTOR = 4
+NEAR_DUPLICATE_SIMILARITY = 0.95
+
+# Dummy batch embedded at warm-up: loads the model and lets the runtime size
+# its buffers before the first real request
+WARMUP_TEXTS = (
+    "warm-up",
+    "Embedding model warm-up batch for the virtual startup knowledge base.",
+) * 4
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[str]], k: int, constant: int = RRF_K
+) -> list[tuple[str, float]]:
+    """Merge ranked id lists by summing ``1 / (constant + rank)``.
+
+    Args:
+        rankings: Ranked id lists, best first
+        k: Number of fused results to return
+        constant: Damping constant
+
+    Returns:
+        ``(id, score)`` pairs, best first
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (constant + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def content_hash(document: str) -> str:
+    """Hash of a document's text.
+
+    Used as the default document id and stored in each document's metadata
+    so unchanged text can be recognised without fetching it.
+    """
+    return hashlib.blake2b(document.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _stale_chunk_ids(old: Dict[str, Any], new: Dict[str, Any]) -> list[str]:
+    """Ids of trailing chunks left over when a chunked document shrinks."""
+    parent_id = new.get("parent_id")
+    if parent_id is None or old.get("parent_id") != parent_id:
+        return []
+    return [
+        chunk_id(parent_id, i)
+        for i in range(new.get("chunk_count", 0), old.get("chunk_count", 0))
+    ]
 
 
 class RAGService:
@@ -18,120 +114,911 @@ class RAGService:
         self,
         persist_directory: str = "./data/chromadb",
         collection_name: str = "knowledge_base",
+        embedding_cache_dir: Optional[str] = None,
+        query_cache_size: int = 256,
+        query_embedding_cache_size: int = 1024,
+        max_search_workers: int = 2,
+        lexical_index_dir: Optional[str] = None,
+        hybrid_candidates: int = 20,
+        tokenizer: Optional[Tokenizer] = None,
+        backend: str = "chroma",
+        vector_store: Optional[VectorStore] = None,
+        hnsw: Optional[HNSWParams] = None,
+        prefilter_max_candidates: int = PREFILTER_MAX_CANDIDATES,
     ):
         """Initialize the RAG service with ChromaDB.
 
         Args:
             persist_directory: Directory to persist the vector database
             collection_name: Name of the ChromaDB collection
+            embedding_cache_dir: Optional directory for the persistent
+                embedding cache of document text (disabled when None)
+            query_cache_size: Maximum cached search results (0 disables)
+            query_embedding_cache_size: Maximum query embeddings kept in
+                memory (0 disables)
+            max_search_workers: Threads in the dedicated executor used by
+                ``asearch``/``asearch_many``
+            lexical_index_dir: Optional directory persisting the BM25 index
+                (kept in memory only when None)
+            hybrid_candidates: Results taken from each ranking before fusion
+                in hybrid search
+            tokenizer: Tokenizer for token budgets (tiktoken by default)
+            backend: ``"chroma"`` (HNSW), ``"quantized"`` for the int8
+                brute-force store in ``quantized_store``, or ``"memory"``
+                for the exact, non-persistent NumPy store
+            vector_store: Optional ``VectorStore`` to use instead of the
+                one ``backend`` names
+            hnsw: HNSW index settings for the Chroma backend (Chroma's
+                defaults when None)
+            prefilter_max_candidates: Largest candidate set, as bounded by
+                the metadata index, that a filtered search scores exactly
+                rather than through the ANN index (0 disables)
         """
         self.persist_directory = persist_directory
         self.collection_name = collection_name
 
+        # Collection version, bumped on every write. Cached search results
+        # remember the version they were computed at and are ignored once
+        # it moves on.
+        self.version = 0
+        self.query_cache_size = query_cache_size
+        self._query_cache: OrderedDict[tuple, tuple[int, list, float]] = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        self.query_cache_hits = 0
+        self.query_cache_misses = 0
+        self.query_cache_saved_seconds = 0.0
+
+        # Query text is open-ended, so its embeddings are kept in a bounded
+        # in-memory LRU rather than the persistent embedding cache
+        self.query_embedding_cache_size = query_embedding_cache_size
+        self._query_embeddings: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._query_embeddings_lock = threading.Lock()
+        self.query_embedding_hits = 0
+        self.query_embedding_misses = 0
+
+        # Dedicated executor for async retrieval, so embedding bursts neither
+        # compete with asyncio.to_thread users nor run unbounded.
+        self.max_search_workers = max_search_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self.executor_queued = 0
+        self.executor_running = 0
+        self.executor_max_queued = 0
+        self.executor_completed = 0
+
+        # BM25 index kept in step with the collection for hybrid search
+        self.lexical_index = BM25Index(lexical_index_dir)
+        self.hybrid_candidates = hybrid_candidates
+        self._lexical_synced = False
+        self._lexical_sync_lock = threading.Lock()
+
+        # Metadata postings for planning filtered searches
+        self.metadata_index = MetadataIndex()
+        # Store version the index was last rebuilt from
+        self._metadata_version: Optional[Hashable] = None
+        self.prefilter_max_candidates = prefilter_max_candidates
+        self._metadata_sync_lock = threading.Lock()
+        self._prefilter_lock = threading.Lock()
+        self.prefilter_exact = 0
+        self.prefilter_ann = 0
+        self.prefilter_candidates_scored = 0
+
+        self.tokenizer = tokenizer
+
+        # Embedding warm-up: "cold" (model loads on first use), "warming",
+        # "ready" or "failed"
+        self.warmup_state = "cold"
+        self.warmup_seconds: Optional[float] = None
+        self.warmup_error: Optional[str] = None
+        self._warmup_thread: Optional[threading.Thread] = None
+        self._warmup_lock = threading.Lock()
+        self._warmup_done = threading.Event()
+
+        if backend not in VECTOR_BACKENDS:
+            raise ValueError(f"Unknown vector backend: {backend}")
+        self.backend = backend
+
         # Create directory if it doesn't exist
         os.makedirs(persist_directory, exist_ok=True)
 
-        # Initialize ChromaDB client
-        self.client = chromadb.PersistentClient(
-            path=persist_directory,
-            settings=Settings(
-                anonymized_telemetry=False,
-            ),
-        )
-
         # Use default embedding function (sentence transformers)
         # For production, you might want to use OpenAI embeddings
         self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
 
-        # Get or create collection
-        try:
-            self.collection = self.client.get_collection(
-                name=collection_name, embedding_function=self.embedding_function
+        # Content-addressed cache so unchanged text is never re-embedded
+        self.embedding_cache: Optional[EmbeddingCache] = None
+        if embedding_cache_dir:
+            self.embedding_cache = EmbeddingCache(
+                embedding_cache_dir, model=DEFAULT_EMBEDDING_MODEL
             )
-        except Exception:
-            self.collection = self.client.create_collection(
-                name=collection_name,
-                embedding_function=self.embedding_function,
-                metadata={"description": "Knowledge base for virtual startup agents"},
+
+        # Embeddings are computed here, so the store only holds vectors
+        if vector_store is not None:
+            self.collection = vector_store
+        elif backend == "quantized":
+            self.collection = QuantizedCollection(
+                os.path.join(persist_directory, f"{collection_name}.q8")
+            )
+        elif backend == "memory":
+            self.collection = InMemoryVectorStore()
+        else:
+            self.collection = ChromaVectorStore(
+                persist_directory, collection_name, self.embedding_function, hnsw=hnsw
+            )
+
+    def _compute_embeddings(self, texts: list[str]) -> Any:
+        """Run the embedding model, waiting for a warm-up in progress."""
+        if self.warmup_state == "warming":
+            # Let the warm-up finish loading the model instead of loading a
+            # second copy concurrently
+            self._warmup_done.wait()
+        return self.embedding_function(texts)
+
+    def _embed(self, texts: list[str]) -> Any:
+        """Embed document texts, serving repeats from the embedding cache.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One embedding per text
+        """
+        if self.embedding_cache is None:
+            return self._compute_embeddings(texts)
+        return self.embedding_cache.get_or_compute(texts, self._compute_embeddings)
+
+    def _embed_queries(self, queries: list[str]) -> np.ndarray:
+        """Embed search queries, serving repeats from the in-memory LRU.
+
+        Args:
+            queries: Query texts
+
+        Returns:
+            Float32 matrix with one embedding per query
+        """
+        with self._query_embeddings_lock:
+            found = [self._query_embeddings.get(query) for query in queries]
+            for query, vector in zip(queries, found):
+                if vector is not None:
+                    self._query_embeddings.move_to_end(query)
+            missing = list(
+                dict.fromkeys(q for q, v in zip(queries, found) if v is None)
             )
+            self.query_embedding_hits += len(queries) - len(missing)
+            self.query_embedding_misses += len(missing)
+
+        if missing:
+            computed = np.asarray(self._compute_embeddings(missing), dtype=np.float32)
+            by_text = dict(zip(missing, computed))
+            found = [by_text.get(q) if v is None else v for q, v in zip(queries, found)]
+            if self.query_embedding_cache_size > 0:
+                with self._query_embeddings_lock:
+                    self._query_embeddings.update(by_text)
+                    while len(self._query_embeddings) > self.query_embedding_cache_size:
+                        self._query_embeddings.popitem(last=False)
+
+        return np.stack(found)
+
+    def warm_up(self) -> bool:
+        """Load the embedding model and embed a dummy batch.
+
+        Bypasses the embedding cache, which would otherwise serve the dummy
+        batch without touching the model.
+
+        Returns:
+            True if the model is ready
+        """
+        with self._warmup_lock:
+            if self.warmup_state == "ready":
+                return True
+            self.warmup_state = "warming"
+
+        started = time.perf_counter()
+        try:
+            self.embedding_function(list(WARMUP_TEXTS))
+        except Exception as e:
+            self.warmup_error = str(e)
+            self.warmup_state = "failed"
+        else:
+            self.warmup_error = None
+            self.warmup_state = "ready"
+        finally:
+            self.warmup_seconds = round(time.perf_counter() - started, 3)
+            self._warmup_done.set()
+        return self.warmup_state == "ready"
+
+    def start_warm_up(self) -> bool:
+        """Run ``warm_up`` on a background thread.
+
+        Returns:
+            False if the model is already warm or warming
+        """
+        with self._warmup_lock:
+            if self.warmup_state in ("warming", "ready"):
+                return False
+            self.warmup_state = "warming"
+            self._warmup_done.clear()
+            self._warmup_thread = threading.Thread(
+                target=self.warm_up, name="rag-warm-up", daemon=True
+            )
+        self._warmup_thread.start()
+        return True
+
+    def get_warmup_status(self) -> Dict[str, Any]:
+        """Get the embedding warm-up state.
+
+        Returns:
+            Dictionary with state, seconds taken and any error
+        """
+        return {
+            "state": self.warmup_state,
+            "seconds": self.warmup_seconds,
+            "error": self.warmup_error,
+        }
+
+    def _bump_version(self) -> None:
+        """Invalidate cached search results after a write."""
+        with self._query_cache_lock:
+            self.version += 1
+            self._query_cache.clear()
 
     def add_documents(
         self,
         documents: list[str],
         metadatas: Optional[list[Dict[str, Any]]] = None,
         ids: Optional[list[str]] = None,
-    ) -> None:
-        """Add documents to the knowledge base.
+    ) -> Dict[str, int]:
+        """Add or update documents in the knowledge base.
+
+        Writes are idempotent upserts. Each stored document carries a
+        ``content_hash`` of its text: documents whose text and metadata are
+        unchanged are skipped, and metadata-only changes are applied without
+        re-embedding.
 
         Args:
             documents: List of text documents to add
             metadatas: Optional metadata for each document
-            ids: Optional IDs for documents (auto-generated if not provided)
+            ids: Optional IDs for documents (derived from the text if not
+                provided)
+
+        Returns:
+            Dictionary with added, updated and skipped counts
         """
+        counts = {"added": 0, "updated": 0, "skipped": 0}
         if not documents:
-            return
+            return counts
 
-        # Generate IDs if not provided
+        metadatas = metadatas or [{} for _ in documents]
         if ids is None:
-            import uuid
+            ids = [content_hash(document) for document in documents]
+
+        # Repeated ids within one batch collapse to the last occurrence
+        entries: Dict[str, tuple[str, Dict[str, Any]]] = {}
+        for id, document, metadata in zip(ids, documents, metadatas):
+            entries[id] = (
+                document,
+                {**metadata, "content_hash": content_hash(document)},
+            )
+
+        stored = self._stored_records(list(entries), include=["metadatas"])
+        new_ids: list[str] = []
+        changed_ids: list[str] = []
+        relabelled_ids: list[str] = []
+        stale_ids: list[str] = []
+        for id, (_, metadata) in entries.items():
+            old = stored[id][1] if id in stored else None
+            if old is None:
+                new_ids.append(id)
+            elif old.get("content_hash") != metadata["content_hash"]:
+                changed_ids.append(id)
+            elif old != metadata:
+                relabelled_ids.append(id)
+            else:
+                continue
+            if old is not None:
+                stale_ids.extend(_stale_chunk_ids(old, metadata))
+
+        written = len(new_ids) + len(changed_ids) + len(relabelled_ids)
+        counts["skipped"] = len(documents) - written
 
-            ids = [str(uuid.uuid4()) for _ in documents]
+        if new_ids:
+            self._write_entries(self.collection.add, new_ids, entries)
+            counts["added"] = len(new_ids)
+        if changed_ids:
+            self._write_entries(self.collection.upsert, changed_ids, entries)
+        if new_ids or changed_ids:
+            self.lexical_index.add(
+                new_ids + changed_ids,
+                [entries[id][0] for id in new_ids + changed_ids],
+            )
+        if relabelled_ids:
+            # Same text, new metadata: no embedding needed
+            self.collection.update(
+                ids=relabelled_ids,
+                metadatas=[entries[id][1] for id in relabelled_ids],
+            )
+        written_ids = new_ids + changed_ids + relabelled_ids
+        self.metadata_index.add(written_ids, [entries[id][1] for id in written_ids])
+        counts["updated"] = len(changed_ids) + len(relabelled_ids)
+        if stale_ids:
+            self.collection.delete(ids=stale_ids)
+            self.lexical_index.delete(stale_ids)
+            self.metadata_index.delete(stale_ids)
 
-        # Add documents to collection
-        self.collection.add(
-            documents=documents, metadatas=metadatas or [{}] * len(documents), ids=ids
+        if written:
+            self._bump_version()
+        return counts
+
+    def _write_entries(
+        self,
+        write: Callable[..., Any],
+        ids: list[str],
+        entries: Dict[str, tuple[str, Dict[str, Any]]],
+    ) -> None:
+        """Embed and write a subset of prepared entries."""
+        documents = [entries[id][0] for id in ids]
+        write(
+            documents=documents,
+            embeddings=self._embed(documents),
+            metadatas=[entries[id][1] for id in ids],
+            ids=ids,
         )
 
+    def _stored_records(
+        self, ids: list[str], include: list[str]
+    ) -> Dict[str, tuple[Optional[str], Dict[str, Any]]]:
+        """Fetch stored documents and metadata by id.
+
+        Returns:
+            ``{id: (document, metadata)}`` for the ids that exist
+        """
+        fetched = self.collection.get(ids=ids, include=include)
+        found_ids = fetched["ids"] or []
+        found_docs = fetched.get("documents") or [None] * len(found_ids)
+        found_metas = fetched.get("metadatas") or [None] * len(found_ids)
+        return {
+            id: (document, metadata or {})
+            for id, document, metadata in zip(found_ids, found_docs, found_metas)
+        }
+
     def search(
-        self, query: str, k: int = 5, filter_metadata: Optional[Dict[str, Any]] = None
+        self,
+        query: str,
+        k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        mode: str = "vector",
     ) -> list[Dict[str, Any]]:
-        """Search for relevant documents using semantic similarity.
+        """Search for relevant documents.
 
         Args:
             query: Search query
             k: Number of results to return
             filter_metadata: Optional metadata filters
+            mode: ``"vector"`` for semantic similarity, or ``"hybrid"`` to
+                fuse it with BM25 keyword ranking
 
         Returns:
             List of result dictionaries with document, metadata, and distance
         """
-        # Query the collection
-        results = self.collection.query(
-            query_texts=[query], n_results=k, where=filter_metadata
+        return self.search_many(
+            [query], k=k, filter_metadata=filter_metadata, mode=mode
+        )[0]
+
+    def search_many(
+        self,
+        queries: list[str],
+        k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        mode: str = "vector",
+    ) -> list[list[Dict[str, Any]]]:
+        """Search for several queries at once.
+
+        Queries not served by the result cache are embedded in one batch and
+        sent to the collection in a single query call.
+
+        Args:
+            queries: Search queries
+            k: Number of results to return per query
+            filter_metadata: Optional metadata filters applied to every query
+            mode: ``"vector"`` or ``"hybrid"`` (see ``search``)
+
+        Returns:
+            One result list per query, each in the same format as ``search``
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+
+        output: list[list[Dict[str, Any]]] = [[] for _ in queries]
+        pending: Dict[str, list[int]] = {}
+        for i, query in enumerate(queries):
+            cached = self._get_cached_results(
+                self._cache_key(query, k, filter_metadata, mode)
+            )
+            if cached is not None:
+                output[i] = cached
+            else:
+                pending.setdefault(query, []).append(i)
+
+        if pending:
+            texts = list(pending)
+            version = self.version
+            started = time.perf_counter()
+            if mode == "hybrid":
+                batches = self._hybrid_query(texts, k, filter_metadata)
+            else:
+                batches = self._query_collection(texts, k, filter_metadata)
+            elapsed = (time.perf_counter() - started) / len(texts)
+
+            for text, results in zip(texts, batches):
+                self._put_cached_results(
+                    self._cache_key(text, k, filter_metadata, mode),
+                    version,
+                    results,
+                    elapsed,
+                )
+                for i in pending[text]:
+                    output[i] = [dict(r) for r in results]
+
+        return output
+
+    async def asearch(
+        self,
+        query: str,
+        k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        mode: str = "vector",
+    ) -> list[Dict[str, Any]]:
+        """Async ``search`` that runs on the dedicated retrieval executor.
+
+        Cached results are returned without a thread hop.
+        """
+        results = await self.asearch_many(
+            [query], k=k, filter_metadata=filter_metadata, mode=mode
+        )
+        return results[0]
+
+    async def asearch_many(
+        self,
+        queries: list[str],
+        k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        mode: str = "vector",
+    ) -> list[list[Dict[str, Any]]]:
+        """Async ``search_many`` that runs on the dedicated retrieval executor.
+
+        Cached results are returned without a thread hop.
+        """
+        if all(
+            self._get_cached_results(
+                self._cache_key(query, k, filter_metadata, mode), record=False
+            )
+            is not None
+            for query in queries
+        ):
+            return self.search_many(
+                queries, k=k, filter_metadata=filter_metadata, mode=mode
+            )
+
+        return await self._run_in_executor(
+            self.search_many, queries, k, filter_metadata, mode
+        )
+
+    @staticmethod
+    def _cache_key(
+        query: str, k: int, filter_metadata: Optional[Dict[str, Any]], mode: str
+    ) -> tuple:
+        filter_key = (
+            json.dumps(filter_metadata, sort_keys=True) if filter_metadata else None
+        )
+        return (query, k, filter_key, mode)
+
+    async def _run_in_executor(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run ``func`` on the retrieval executor, tracking queue depth."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_search_workers,
+                    thread_name_prefix="rag-search",
+                )
+            self.executor_queued += 1
+            self.executor_max_queued = max(
+                self.executor_max_queued, self.executor_queued
+            )
+
+        def run() -> Any:
+            with self._executor_lock:
+                self.executor_queued -= 1
+                self.executor_running += 1
+            try:
+                return func(*args)
+            finally:
+                with self._executor_lock:
+                    self.executor_running -= 1
+                    self.executor_completed += 1
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, run)
+
+    def shutdown(self) -> None:
+        """Stop the retrieval executor, waiting for running searches."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _get_cached_results(
+        self, key: tuple, record: bool = True
+    ) -> Optional[list[Dict[str, Any]]]:
+        """Return a copy of cached results for ``key`` if still current.
+
+        With ``record=False`` this is a side-effect-free peek.
+        """
+        with self._query_cache_lock:
+            entry = self._query_cache.get(key)
+            if entry is None or entry[0] != self.version:
+                if record:
+                    self.query_cache_misses += 1
+                return None
+            if not record:
+                return entry[1]
+
+            self._query_cache.move_to_end(key)
+            self.query_cache_hits += 1
+            self.query_cache_saved_seconds += entry[2]
+            return [dict(r) for r in entry[1]]
+
+    def _put_cached_results(
+        self, key: tuple, version: int, results: list, elapsed: float
+    ) -> None:
+        """Cache results computed at ``version``, evicting the LRU entry."""
+        if self.query_cache_size <= 0:
+            return
+
+        with self._query_cache_lock:
+            # A write raced with this query; its results may be stale.
+            if version != self.version:
+                return
+            self._query_cache[key] = (version, results, elapsed)
+            self._query_cache.move_to_end(key)
+            while len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+
+    def _query_collection(
+        self, queries: list[str], k: int, filter_metadata: Optional[Dict[str, Any]]
+    ) -> list[list[Dict[str, Any]]]:
+        """Query the collection for a batch of queries, bypassing the cache."""
+        results = self._query_store(self._embed_queries(queries), k, filter_metadata)
+        return [self._format_results(results, i) for i in range(len(queries))]
+
+    def _query_store(
+        self,
+        query_embeddings: Any,
+        n_results: int,
+        where: Optional[Dict[str, Any]],
+        include: Optional[list[str]] = None,
+    ) -> Dict[str, Any]:
+        """Run a vector query, planning filtered ones with the metadata index.
+
+        A filter that the index narrows to at most
+        ``prefilter_max_candidates`` documents is answered by exact scoring
+        over those candidates. Broader or unindexable filters go to the
+        store's ANN search with the ``where`` clause pushed down.
+        """
+        if where and self.prefilter_max_candidates:
+            candidates = None
+            if self._ensure_metadata_index():
+                candidates = self.metadata_index.candidates(where)
+            if (
+                candidates is not None
+                and len(candidates) <= self.prefilter_max_candidates
+            ):
+                with self._prefilter_lock:
+                    self.prefilter_exact += 1
+                    self.prefilter_candidates_scored += len(candidates)
+                return self._exact_query(
+                    query_embeddings, n_results, where, candidates, include
+                )
+            with self._prefilter_lock:
+                self.prefilter_ann += 1
+
+        kwargs: Dict[str, Any] = {"include": include} if include else {}
+        return self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where=where,
+            **kwargs,
+        )
+
+    def _exact_query(
+        self,
+        query_embeddings: Any,
+        n_results: int,
+        where: Dict[str, Any],
+        candidates: set[str],
+        include: Optional[list[str]],
+    ) -> Dict[str, Any]:
+        """Brute-force a query over candidate ids, in Chroma's query shape."""
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        keys = ["ids", "documents", "metadatas", "distances"]
+        if include and "embeddings" in include:
+            keys.append("embeddings")
+        response: Dict[str, Any] = {key: [] for key in keys}
+
+        got = self.collection.get(
+            ids=sorted(candidates),
+            where=where,
+            include=["documents", "metadatas", "embeddings"],
+        )
+        if not len(got["ids"]):
+            for key in keys:
+                response[key] = [[] for _ in queries]
+            return response
+
+        vectors = np.asarray(got["embeddings"], dtype=np.float32)
+        scores = distances(queries, vectors, self.collection.space)
+        for row in scores:
+            top = np.argsort(row, kind="stable")[:n_results]
+            response["ids"].append([got["ids"][i] for i in top])
+            response["documents"].append([got["documents"][i] for i in top])
+            response["metadatas"].append([got["metadatas"][i] for i in top])
+            response["distances"].append(row[top].tolist())
+            if "embeddings" in response:
+                response["embeddings"].append(vectors[top])
+        return response
+
+    def _hybrid_query(
+        self, queries: list[str], k: int, filter_metadata: Optional[Dict[str, Any]]
+    ) -> list[list[Dict[str, Any]]]:
+        """Fuse vector and BM25 rankings with reciprocal rank fusion."""
+        depth = max(k, self.hybrid_candidates)
+        vector_batches = self._query_collection(queries, depth, filter_metadata)
+
+        self._ensure_lexical_index()
+        lexical_batches = [
+            [doc_id for doc_id, _ in self.lexical_index.search(query, depth)]
+            for query in queries
+        ]
+
+        # Keyword-only hits still need their text and metadata; fetching them
+        # with the same ``where`` filter also drops those that do not match.
+        known = {r["id"] for results in vector_batches for r in results}
+        missing = list(
+            dict.fromkeys(
+                doc_id
+                for ranking in lexical_batches
+                for doc_id in ranking
+                if doc_id not in known
+            )
         )
+        fetched: Dict[str, tuple[Optional[str], Dict[str, Any]]] = {}
+        if missing:
+            got = self.collection.get(
+                ids=missing, where=filter_metadata, include=["documents", "metadatas"]
+            )
+            fetched = {
+                doc_id: (document, metadata or {})
+                for doc_id, document, metadata in zip(
+                    got["ids"], got["documents"], got["metadatas"]
+                )
+            }
+
+        output = []
+        for vector_results, ranking in zip(vector_batches, lexical_batches):
+            by_id = {r["id"]: r for r in vector_results}
+            ranking = [i for i in ranking if i in by_id or i in fetched]
+            fused = reciprocal_rank_fusion([list(by_id), ranking], k)
+
+            results = []
+            for doc_id, score in fused:
+                if doc_id in by_id:
+                    result = dict(by_id[doc_id])
+                else:
+                    document, metadata = fetched[doc_id]
+                    result = {
+                        "document": document,
+                        "metadata": metadata,
+                        "distance": None,
+                        "id": doc_id,
+                    }
+                result["score"] = score
+                results.append(result)
+            output.append(results)
+
+        return output
+
+    def _ensure_lexical_index(self) -> None:
+        """Bring the BM25 index in step with the collection.
+
+        Journal lines written by other processes (the ingestion script) are
+        replayed before every query. A full rebuild, for collections
+        populated before the lexical index existed, runs once per process.
+        """
+        self.lexical_index.refresh()
+        if self._lexical_synced:
+            return
+
+        with self._lexical_sync_lock:
+            if self._lexical_synced:
+                return
+            if len(self.lexical_index) != self.collection.count():
+                self.lexical_index.clear()
+                for page in self._iter_collection(["documents"]):
+                    self.lexical_index.add(page["ids"], page["documents"])
+                self.lexical_index.compact()
+            self._lexical_synced = True
+
+    def _ensure_metadata_index(self) -> bool:
+        """Rebuild the metadata index if the store has changed since.
 
-        # Format results
+        The store can also be written by other processes (the ingestion
+        script), so its version is compared before every planned query and
+        any write, ours included, triggers a rebuild. The rebuilt index is
+        swapped in whole; queries arriving while another thread rebuilds
+        it, or against a store that reports no version, take the ANN path.
+
+        Returns:
+            True if the index matches the store and can plan the query
+        """
+        version = self.collection.version()
+        if version is None:
+            return False
+        if version == self._metadata_version:
+            return True
+        if not self._metadata_sync_lock.acquire(blocking=False):
+            return False
+
+        try:
+            index = MetadataIndex()
+            for page in self._iter_collection(["metadatas"]):
+                index.add(page["ids"], page["metadatas"])
+            self.metadata_index = index
+            self._metadata_version = version
+            # A write during the rebuild leaves the index behind; the next
+            # query rebuilds again
+            return self.collection.version() == version
+        finally:
+            self._metadata_sync_lock.release()
+
+    def _iter_collection(self, include: list[str]):
+        """Page through every record of the collection."""
+        offset = 0
+        while True:
+            page = self.collection.get(
+                include=include, limit=LEXICAL_REBUILD_PAGE, offset=offset
+            )
+            if not page["ids"]:
+                break
+            yield page
+            offset += len(page["ids"])
+            if len(page["ids"]) < LEXICAL_REBUILD_PAGE:
+                break
+
+    @staticmethod
+    def _format_results(results: Dict[str, Any], index: int) -> list[Dict[str, Any]]:
+        """Format the ``index``-th query of a Chroma query response."""
         formatted_results = []
 
-        if results["documents"] and results["documents"][0]:
-            for i, doc in enumerate(results["documents"][0]):
+        documents = results["documents"]
+        if documents and len(documents) > index and documents[index]:
+            for i, doc in enumerate(documents[index]):
                 result: Dict[str, Any] = {
                     "document": doc,
-                    "metadata": results["metadatas"][0][i]
+                    "metadata": results["metadatas"][index][i]
                     if results["metadatas"]
                     else {},  # type: ignore
-                    "distance": results["distances"][0][i]
+                    "distance": results["distances"][index][i]
                     if results["distances"]
                     else 0.0,  # type: ignore
-                    "id": results["ids"][0][i] if results["ids"] else None,  # type: ignore
+                    "id": results["ids"][index][i] if results["ids"] else None,  # type: ignore
                 }
                 formatted_results.append(result)
 
         return formatted_results
 
+    def expand_chunks(
+        self, results: list[Dict[str, Any]], window: int = 1
+    ) -> list[Dict[str, Any]]:
+        """Widen chunk hits with their neighbouring chunks.
+
+        Each result that is a chunk (see ``chunking.TokenChunker``) has its
+        document replaced by the reassembled text of chunks ``index - window``
+        through ``index + window``. Neighbours for all results are fetched in
+        one ``get`` call; a hit already covered by a better-ranked hit from
+        the same parent is dropped.
+
+        Args:
+            results: Results from ``search``
+            window: Neighbouring chunks to include on each side
+
+        Returns:
+            Expanded results, in the original order
+        """
+        spans: list[Optional[tuple[str, int, int]]] = []
+        wanted: list[str] = []
+        for result in results:
+            metadata = result.get("metadata") or {}
+            if "parent_id" not in metadata:
+                spans.append(None)
+                continue
+            index = metadata["chunk_index"]
+            low = max(0, index - window)
+            high = min(metadata.get("chunk_count", index + 1) - 1, index + window)
+            spans.append((metadata["parent_id"], low, high))
+            wanted.extend(
+                chunk_id(metadata["parent_id"], i) for i in range(low, high + 1)
+            )
+
+        if not wanted:
+            return results
+
+        fetched = self.collection.get(
+            ids=list(dict.fromkeys(wanted)), include=["documents", "metadatas"]
+        )
+        by_id = {
+            id: (metadata.get("chunk_start", 0), document)
+            for id, document, metadata in zip(
+                fetched["ids"], fetched["documents"], fetched["metadatas"]
+            )
+        }
+
+        expanded: list[Dict[str, Any]] = []
+        covered: Dict[str, list[tuple[int, int]]] = {}
+        for result, span in zip(results, spans):
+            if span is None:
+                expanded.append(result)
+                continue
+
+            parent_id, low, high = span
+            index = result["metadata"]["chunk_index"]
+            if any(lo <= index <= hi for lo, hi in covered.get(parent_id, [])):
+                continue
+            covered.setdefault(parent_id, []).append((low, high))
+
+            pieces = [
+                by_id[chunk_id(parent_id, i)]
+                for i in range(low, high + 1)
+                if chunk_id(parent_id, i) in by_id
+            ]
+            expanded.append(
+                {
+                    **result,
+                    "document": merge_chunks(pieces) if pieces else result["document"],
+                    "chunk_range": [low, high],
+                }
+            )
+
+        return expanded
+
     def get_relevant_context(
-        self, query: str, k: int = 5, max_chars: int = 2000
+        self,
+        query: str,
+        k: int = 5,
+        max_chars: int = 2000,
+        max_tokens: Optional[int] = None,
+        mmr_lambda: float = DEFAULT_MMR_LAMBDA,
     ) -> str:
         """Get relevant context as a single string.
 
+        With ``max_tokens`` the context is packed by ``select_passages``:
+        counted in real tokens, de-duplicated and diversified with MMR.
+        Otherwise documents are concatenated up to ``max_chars``.
+
         Args:
             query: Search query
             k: Number of results to retrieve
             max_chars: Maximum characters to return
+            max_tokens: Optional token budget (enables packing mode)
+            mmr_lambda: Relevance/diversity trade-off in packing mode
 
         Returns:
             Concatenated relevant documents
         """
+        if max_tokens is not None:
+            passages = self.select_passages(
+                query, max_tokens, k=k, mmr_lambda=mmr_lambda
+            )
+            return CONTEXT_SEPARATOR.join(p["document"] for p in passages)
+
         results = self.search(query, k=k)
 
         # Concatenate documents
@@ -150,7 +1037,112 @@ class RAGService:
             context_parts.append(doc)
             total_chars += len(doc)
 
-        return "\n\n---\n\n".join(context_parts)
+        return CONTEXT_SEPARATOR.join(context_parts)
+
+    def select_passages(
+        self,
+        query: str,
+        max_tokens: int,
+        k: int = 5,
+        mmr_lambda: float = DEFAULT_MMR_LAMBDA,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+    ) -> list[Dict[str, Any]]:
+        """Pick passages for a prompt within a token budget.
+
+        Candidates are retrieved together with their stored embeddings and
+        chosen by maximal marginal relevance, so a passage nearly identical to
+        one already chosen is skipped. Passages are taken in that order while
+        they fit the budget; if even the first does not fit, it is truncated.
+
+        Args:
+            query: Search query
+            max_tokens: Token budget for the joined passages
+            k: Maximum number of passages
+            mmr_lambda: 1.0 ranks purely by relevance, lower values favour
+                diversity
+            filter_metadata: Optional metadata filters
+
+        Returns:
+            Result dictionaries in selection order, each with a ``tokens``
+            count
+        """
+        tokenizer = self._get_tokenizer()
+        query_vector = self._embed_queries([query])
+        response = self._query_store(
+            query_vector,
+            max(k * MMR_CANDIDATE_FACTOR, k),
+            filter_metadata,
+            include=["documents", "metadatas", "distances", "embeddings"],
+        )
+        candidates = self._format_results(response, 0)
+        if not candidates:
+            return []
+
+        embeddings = response.get("embeddings")
+        if embeddings is None or len(embeddings) == 0 or embeddings[0] is None:
+            # No vectors to compare: plain relevance order, no de-duplication
+            relevance = -np.arange(len(candidates), dtype=np.float32)
+            similarity = np.zeros((len(candidates), len(candidates)), np.float32)
+        else:
+            vectors = normalize(np.asarray(embeddings[0], dtype=np.float32))
+            relevance = vectors @ normalize(query_vector)[0]
+            similarity = vectors @ vectors.T
+
+        separator_tokens = len(tokenizer.encode(CONTEXT_SEPARATOR))
+        budget = max_tokens
+        selected: list[Dict[str, Any]] = []
+        closest = np.full(len(candidates), -np.inf, dtype=np.float32)
+        remaining = list(range(len(candidates)))
+
+        while remaining and len(selected) < k and budget > 0:
+            if selected:
+                scores = (
+                    mmr_lambda * relevance[remaining]
+                    - (1 - mmr_lambda) * (closest[remaining])
+                )
+            else:
+                scores = relevance[remaining]
+            best = remaining.pop(int(np.argmax(scores)))
+
+            if closest[best] >= NEAR_DUPLICATE_SIMILARITY:
+                continue
+
+            result = candidates[best]
+            tokens = tokenizer.encode(result["document"])
+            cost = len(tokens) + (separator_tokens if selected else 0)
+            if cost > budget:
+                if selected:
+                    continue
+                result = {
+                    **result,
+                    "document": tokenizer.decode(tokens[:budget]),
+                }
+                tokens = tokens[:budget]
+                cost = budget
+
+            selected.append({**result, "tokens": len(tokens)})
+            budget -= cost
+            closest = np.maximum(closest, similarity[best])
+
+        return selected
+
+    async def aselect_passages(
+        self,
+        query: str,
+        max_tokens: int,
+        k: int = 5,
+        mmr_lambda: float = DEFAULT_MMR_LAMBDA,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+    ) -> list[Dict[str, Any]]:
+        """Async ``select_passages`` that runs on the retrieval executor."""
+        return await self._run_in_executor(
+            self.select_passages, query, max_tokens, k, mmr_lambda, filter_metadata
+        )
+
+    def _get_tokenizer(self) -> Tokenizer:
+        if self.tokenizer is None:
+            self.tokenizer = get_tokenizer()
+        return self.tokenizer
 
     def delete_documents(self, ids: list[str]) -> None:
         """Delete documents from the knowledge base.
@@ -160,6 +1152,9 @@ class RAGService:
         """
         if ids:
             self.collection.delete(ids=ids)
+            self.lexical_index.delete(ids)
+            self.metadata_index.delete(ids)
+            self._bump_version()
 
     def update_document(
         self,
@@ -174,15 +1169,91 @@ class RAGService:
             document: New document text (optional)
             metadata: New metadata (optional)
         """
-        update_data: Dict[str, Any] = {"ids": [id]}
+        if document is None and metadata is None:
+            return
 
+        # Keep the stored content hash in step with the text
+        text_hash = content_hash(document) if document is not None else None
+        if text_hash is None or metadata is None:
+            stored = self._stored_records([id], include=["metadatas"])
+            stored_metadata = stored[id][1] if id in stored else {}
+            if text_hash is None:
+                text_hash = stored_metadata.get("content_hash")
+            if metadata is None:
+                metadata = stored_metadata
+        if text_hash is not None:
+            metadata = {**metadata, "content_hash": text_hash}
+
+        update_data: Dict[str, Any] = {"ids": [id], "metadatas": [metadata]}
         if document is not None:
             update_data["documents"] = [document]
-        if metadata is not None:
-            update_data["metadatas"] = [metadata]
+            update_data["embeddings"] = self._embed([document])
+
+        self.collection.update(**update_data)
+        if document is not None:
+            self.lexical_index.add([id], [document])
+        self.metadata_index.update([id], [metadata])
+        self._bump_version()
 
-        if len(update_data) > 1:  # More than just ids
-            self.collection.update(**update_data)
+    def export_snapshot(self, path: str) -> int:
+        """Write the knowledge base, embeddings included, to a snapshot file.
+
+        Args:
+            path: Destination file
+
+        Returns:
+            Number of documents written
+        """
+        return export_snapshot(
+            self.collection,
+            path,
+            info={"model": DEFAULT_EMBEDDING_MODEL, "collection": self.collection_name},
+        )
+
+    def import_snapshot(
+        self, path: str, batch_size: int = 1000, replace: bool = False
+    ) -> Dict[str, Any]:
+        """Load a snapshot written by ``export_snapshot`` without re-embedding.
+
+        Records are upserted, so importing into a populated knowledge base
+        overwrites matching ids and keeps the rest.
+
+        Args:
+            path: Snapshot file
+            batch_size: Records written per store call
+            replace: Clear the knowledge base first
+
+        Returns:
+            Dictionary with the number of documents and seconds taken
+
+        Raises:
+            ValueError: If the snapshot was embedded with a different model
+        """
+        snapshot = Snapshot(path)
+        model = snapshot.info.get("model")
+        if model != DEFAULT_EMBEDDING_MODEL:
+            raise ValueError(
+                f"Snapshot embedded with {model}, expected {DEFAULT_EMBEDDING_MODEL}"
+            )
+
+        started = time.perf_counter()
+        if replace:
+            self.clear()
+        for batch in snapshot.batches(batch_size):
+            self.collection.upsert(
+                ids=batch["ids"],
+                embeddings=batch["embeddings"],
+                documents=batch["documents"],
+                metadatas=batch["metadatas"],
+            )
+            self.lexical_index.add(batch["ids"], batch["documents"])
+            self.metadata_index.add(batch["ids"], batch["metadatas"])
+        self._bump_version()
+
+        return {
+            "documents": len(snapshot),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
 
     def count_documents(self) -> int:
         """Get the total number of documents in the knowledge base.
@@ -194,13 +1265,58 @@ class RAGService:
 
     def clear(self) -> None:
         """Clear all documents from the knowledge base."""
-        # Delete the collection and recreate it
-        self.client.delete_collection(self.collection_name)
-        self.collection = self.client.create_collection(
-            name=self.collection_name,
-            embedding_function=self.embedding_function,
-            metadata={"description": "Knowledge base for virtual startup agents"},
-        )
+        self.collection.clear()
+        self.lexical_index.clear()
+        self.metadata_index.clear()
+        self._bump_version()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get cache metrics for the RAG service.
+
+        Returns:
+            Dictionary with query-cache and embedding-cache statistics
+        """
+        lookups = self.query_cache_hits + self.query_cache_misses
+        return {
+            "version": self.version,
+            "backend": self.backend,
+            "hnsw": (
+                asdict(self.collection.hnsw)
+                if isinstance(self.collection, ChromaVectorStore)
+                else None
+            ),
+            "warmup": self.get_warmup_status(),
+            "query_cache": {
+                "entries": len(self._query_cache),
+                "hits": self.query_cache_hits,
+                "misses": self.query_cache_misses,
+                "hit_ratio": self.query_cache_hits / lookups if lookups else 0.0,
+                "saved_seconds": round(self.query_cache_saved_seconds, 6),
+            },
+            "embedding_cache": (
+                self.embedding_cache.get_metrics() if self.embedding_cache else None
+            ),
+            "query_embeddings": {
+                "entries": len(self._query_embeddings),
+                "hits": self.query_embedding_hits,
+                "misses": self.query_embedding_misses,
+            },
+            "lexical_index": {"documents": len(self.lexical_index)},
+            "prefilter": {
+                "max_candidates": self.prefilter_max_candidates,
+                "indexed_documents": len(self.metadata_index),
+                "exact": self.prefilter_exact,
+                "ann": self.prefilter_ann,
+                "candidates_scored": self.prefilter_candidates_scored,
+            },
+            "executor": {
+                "max_workers": self.max_search_workers,
+                "queued": self.executor_queued,
+                "running": self.executor_running,
+                "max_queued": self.executor_max_queued,
+                "completed": self.executor_completed,
+            },
+        }
 
     def initialize_sample_data(self) -> None:
         """Initialize with sample knowledge for testing."""
@@ -244,6 +1360,14 @@ def get_rag_service(
 ) -> RAGService:
     """Get or create the global RAG service instance.
 
+    The embedding cache directory, retrieval executor size, BM25 index
+    directory and vector backend are taken from the app's
+    ``EMBEDDING_CACHE_DIR``, ``RAG_SEARCH_WORKERS``, ``RAG_LEXICAL_INDEX_DIR``
+    and ``RAG_VECTOR_BACKEND`` settings, and the HNSW index settings from
+    the ``RAG_HNSW_*`` settings, when an app context is active. With
+    ``RAG_WARMUP`` set, a new instance starts warming its embedding model in
+    the background.
+
     Args:
         persist_directory: Directory to persist the vector database
         collection_name: Name of the ChromaDB collection
@@ -254,10 +1378,36 @@ def get_rag_service(
     global _rag_service
 
     if _rag_service is None:
+        config = current_app.config if has_app_context() else {}
         _rag_service = RAGService(
-            persist_directory=persist_directory, collection_name=collection_name
+            persist_directory=persist_directory,
+            collection_name=collection_name,
+            embedding_cache_dir=config.get("EMBEDDING_CACHE_DIR"),
+            max_search_workers=config.get("RAG_SEARCH_WORKERS", 2),
+            lexical_index_dir=config.get("RAG_LEXICAL_INDEX_DIR"),
+            prefilter_max_candidates=config.get(
+                "RAG_PREFILTER_MAX_CANDIDATES", PREFILTER_MAX_CANDIDATES
+            ),
+            backend=config.get("RAG_VECTOR_BACKEND", "chroma"),
+            hnsw=HNSWParams(
+                space=config.get("RAG_HNSW_SPACE", "l2"),
+                m=config.get("RAG_HNSW_M", 16),
+                ef_construction=config.get("RAG_HNSW_EF_CONSTRUCTION", 100),
+                ef_search=config.get("RAG_HNSW_EF_SEARCH", 100),
+            ),
         )
+        if config.get("RAG_WARMUP", False):
+            _rag_service.start_warm_up()
 
     return _rag_service
 
 
+def get_warmup_status() -> Dict[str, Any]:
+    """Get the embedding warm-up state without creating the RAG service.
+
+    Returns:
+        Warm-up status dictionary (``"cold"`` if no service exists yet)
+    """
+    if _rag_service is None:
+        return {"state": "cold", "seconds": None, "error": None}
+    return _rag_service.get_warmup_status()
@@ -0,0 +1,237 @@
+"""Single-file snapshots of a vector store for fast restore.
+
+A snapshot holds every id, document, metadata dict and raw embedding, so a
+new node can load a knowledge base without calling the embedding model.
+
+File layout (little-endian)::
+
+    header   HEADER_SIZE bytes: magic, version, dim, count and the offset
+             and length of each section below
+    info     JSON: embedding model, source collection, creation time
+    vectors  count x dim float32, 64-byte aligned, row order
+    records  one JSON array ``[id, document, metadata]`` per row
+    index    count + 1 uint64 offsets of each record within ``records``
+
+Vectors are memory-mapped on import and records are decoded one batch at a
+time, so restoring never holds more than a batch in Python objects.
+"""
+
+import json
+import os
+import struct
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+
+from .vector_store import VectorStore
+
+MAGIC = b"RAGSNAP\x00"
+VERSION = 1
+
+# magic, version, dim, count, then (offset, length) for info, vectors,
+# records and index
+_HEADER = struct.Struct("<8sIIQ8Q")
+HEADER_SIZE = 128
+
+# Rows read from the source store per page during export
+EXPORT_PAGE = 1000
+
+_ALIGN = 64
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def export_snapshot(
+    store: VectorStore,
+    path: str | os.PathLike,
+    info: Optional[Dict[str, Any]] = None,
+) -> int:
+    """Write every record of ``store`` to a snapshot file.
+
+    The file is written next to ``path`` and renamed into place, so a
+    reader never sees a partial snapshot.
+
+    Args:
+        store: Store to export
+        path: Destination file
+        info: Extra JSON-serialisable details kept in the snapshot (such
+            as the embedding model)
+
+    Returns:
+        Number of records written
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+
+    info_bytes = json.dumps(
+        {**(info or {}), "created": time.time()}, separators=(",", ":")
+    ).encode("utf-8")
+    vectors_offset = _align(HEADER_SIZE + len(info_bytes))
+
+    count = 0
+    dim = 0
+    offsets = [0]
+    with open(tmp, "wb") as out, tempfile.TemporaryFile() as records:
+        out.write(b"\0" * HEADER_SIZE)
+        out.write(info_bytes)
+        out.write(b"\0" * (vectors_offset - out.tell()))
+
+        # Vectors stream straight into place; records go to a side file and
+        # are appended once the vector section is complete
+        while True:
+            page = store.get(
+                include=["documents", "metadatas", "embeddings"],
+                limit=EXPORT_PAGE,
+                offset=count,
+            )
+            if not len(page["ids"]):
+                break
+            vectors = np.ascontiguousarray(page["embeddings"], dtype="<f4")
+            if not dim:
+                dim = vectors.shape[1]
+            elif vectors.shape[1] != dim:
+                raise ValueError("Store holds embeddings of mixed dimension")
+            out.write(vectors.tobytes())
+
+            for id, document, metadata in zip(
+                page["ids"], page["documents"], page["metadatas"]
+            ):
+                line = json.dumps(
+                    [id, document, metadata or {}], separators=(",", ":")
+                ).encode("utf-8")
+                records.write(line)
+                offsets.append(offsets[-1] + len(line))
+
+            count += len(page["ids"])
+            if len(page["ids"]) < EXPORT_PAGE:
+                break
+
+        records_offset = out.tell()
+        records.seek(0)
+        while chunk := records.read(1 << 20):
+            out.write(chunk)
+        index_offset = _align(out.tell())
+        out.write(b"\0" * (index_offset - out.tell()))
+        out.write(np.asarray(offsets, dtype="<u8").tobytes())
+
+        out.seek(0)
+        out.write(
+            _HEADER.pack(
+                MAGIC,
+                VERSION,
+                dim,
+                count,
+                HEADER_SIZE,
+                len(info_bytes),
+                vectors_offset,
+                count * dim * 4,
+                records_offset,
+                offsets[-1],
+                index_offset,
+                len(offsets) * 8,
+            )
+        )
+        out.flush()
+        os.fsync(out.fileno())
+
+    os.replace(tmp, path)
+    return count
+
+
+class Snapshot:
+    """Read-only view of a snapshot file."""
+
+    def __init__(self, path: str | os.PathLike):
+        """Open a snapshot and map its vectors.
+
+        Args:
+            path: Snapshot file
+
+        Raises:
+            ValueError: If the file is not a snapshot this version can read
+        """
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < _HEADER.size or header[:8] != MAGIC:
+            raise ValueError(f"Not a knowledge base snapshot: {self.path}")
+
+        (
+            _,
+            version,
+            self.dim,
+            self.count,
+            info_offset,
+            info_length,
+            vectors_offset,
+            _,
+            self._records_offset,
+            _,
+            index_offset,
+            _,
+        ) = _HEADER.unpack(header[: _HEADER.size])
+        if version != VERSION:
+            raise ValueError(f"Unsupported snapshot version: {version}")
+
+        with open(self.path, "rb") as f:
+            f.seek(info_offset)
+            self.info: Dict[str, Any] = json.loads(f.read(info_length))
+
+        if self.count:
+            self.vectors = np.memmap(
+                self.path,
+                dtype="<f4",
+                mode="r",
+                offset=vectors_offset,
+                shape=(self.count, self.dim),
+            )
+        else:
+            self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+        self._index = np.memmap(
+            self.path,
+            dtype="<u8",
+            mode="r",
+            offset=index_offset,
+            shape=(self.count + 1,),
+        )
+
+    def __len__(self) -> int:
+        return self.count
+
+    def batches(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Yield records in Chroma ``get`` shape, ``batch_size`` rows at a time.
+
+        Args:
+            batch_size: Rows per batch
+
+        Yields:
+            Dicts with ids, documents, metadatas and embeddings (a view into
+            the memory map)
+        """
+        with open(self.path, "rb") as f:
+            for start in range(0, self.count, batch_size):
+                stop = min(start + batch_size, self.count)
+                begin, end = int(self._index[start]), int(self._index[stop])
+                f.seek(self._records_offset + begin)
+                blob = f.read(end - begin)
+
+                ids, documents, metadatas = [], [], []
+                for i in range(start, stop):
+                    row = json.loads(
+                        blob[self._index[i] - begin : self._index[i + 1] - begin]
+                    )
+                    ids.append(row[0])
+                    documents.append(row[1])
+                    metadatas.append(row[2])
+                yield {
+                    "ids": ids,
+                    "documents": documents,
+                    "metadatas": metadatas,
+                    "embeddings": self.vectors[start:stop],
+                }
@@ -0,0 +1,164 @@
+"""Aggregated statistics with a short-TTL in-process cache.
+
+Dashboards poll the stats endpoints every few seconds. Each table is counted
+with a single ``GROUP BY status`` query and the result is cached for
+``STATS_CACHE_TTL`` seconds. Any commit that inserts, deletes or changes the
+status of an Agent or Workflow invalidates the cache immediately.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Agent, Workflow
+
+DEFAULT_TTL = 2.0
+
+_TRACKED_MODELS = {Agent: "agents", Workflow: "workflows"}
+
+
+class StatsService:
+    """Status counts per table, cached with a TTL."""
+
+    def __init__(self):
+        """Initialize the stats service."""
+        self._lock = threading.Lock()
+        self._cache: Dict[str, tuple[float, Dict[str, int]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _ttl(self) -> float:
+        if has_app_context():
+            return float(current_app.config.get("STATS_CACHE_TTL", DEFAULT_TTL))
+        return DEFAULT_TTL
+
+    def _status_counts(self, key: str, model: Any) -> Dict[str, int]:
+        """Return ``{status: count}`` for a model, served from cache if fresh."""
+        ttl = self._ttl()
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry and ttl > 0 and now - entry[0] < ttl:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        rows = (
+            db.session.query(model.status, func.count(model.id))
+            .group_by(model.status)
+            .all()
+        )
+        counts = {status: count for status, count in rows}
+
+        if ttl > 0:
+            with self._lock:
+                self._cache[key] = (now, counts)
+
+        return counts
+
+    def agent_stats(self) -> Dict[str, int]:
+        """Get agent totals by status.
+
+        Returns:
+            Dictionary with total, active (working) and idle counts
+        """
+        counts = self._status_counts("agents", Agent)
+        return {
+            "total": sum(counts.values()),
+            "active": counts.get("working", 0),
+            "idle": counts.get("idle", 0),
+        }
+
+    def workflow_stats(self) -> Dict[str, int]:
+        """Get workflow totals by status.
+
+        Returns:
+            Dictionary with total, active, completed and failed counts
+        """
+        counts = self._status_counts("workflows", Workflow)
+        return {
+            "total": sum(counts.values()),
+            "active": counts.get("active", 0),
+            "completed": counts.get("completed", 0),
+            "failed": counts.get("failed", 0),
+        }
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop cached counts.
+
+        Args:
+            key: Table key to drop ("agents" or "workflows"); None drops all
+        """
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get cache hit/miss counters.
+
+        Returns:
+            Dictionary with hits, misses and hit ratio
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+@event.listens_for(Session, "before_flush")
+def _track_status_changes(session: Session, flush_context: Any, instances: Any) -> None:
+    """Remember which stats tables a pending flush touches."""
+    touched = session.info.setdefault("stats_touched", set())
+
+    for obj in session.new | session.deleted:
+        key = _TRACKED_MODELS.get(type(obj))
+        if key:
+            touched.add(key)
+
+    for obj in session.dirty:
+        key = _TRACKED_MODELS.get(type(obj))
+        if key and inspect(obj).attrs.status.history.has_changes():
+            touched.add(key)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    """Invalidate cached counts once status changes are committed."""
+    touched = session.info.pop("stats_touched", None)
+    if touched and _stats_service is not None:
+        for key in touched:
+            _stats_service.invalidate(key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    """Forget tracked changes that were rolled back."""
+    session.info.pop("stats_touched", None)
+
+
+# Global stats service instance
+_stats_service: Optional[StatsService] = None
+
+
+def get_stats_service() -> StatsService:
+    """Get or create the global stats service instance.
+
+    Returns:
+        StatsService instance
+    """
+    global _stats_service
+
+    if _stats_service is None:
+        _stats_service = StatsService()
+
+    return _stats_service
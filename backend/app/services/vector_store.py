@@ -0,0 +1,494 @@
+"""Vector-store interface used by RAGService, and its stock implementations.
+
+RAGService computes embeddings itself and talks to its store only through
+the ``VectorStore`` protocol, which follows the Chroma collection API
+(``add/upsert/update/get/query/delete/count/clear`` with Chroma-shaped
+results). Any backend that honours it can be swapped in:
+
+* ``ChromaVectorStore``: persistent Chroma collection (HNSW); the default
+* ``InMemoryVectorStore``: exact NumPy scan; a reference for correctness
+  and benchmarks
+* ``quantized_store.QuantizedCollection``: int8 memory-mapped scan
+"""
+
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Hashable, Optional, Protocol, Sequence
+
+import numpy as np
+
+COLLECTION_METADATA = {"description": "Knowledge base for virtual startup agents"}
+
+HNSW_SPACES = ("l2", "cosine", "ip")
+
+_COMPARATORS = {
+    "$eq": lambda a, b: a == b,
+    "$ne": lambda a, b: a != b,
+    "$gt": lambda a, b: a is not None and a > b,
+    "$gte": lambda a, b: a is not None and a >= b,
+    "$lt": lambda a, b: a is not None and a < b,
+    "$lte": lambda a, b: a is not None and a <= b,
+    "$in": lambda a, b: a in b,
+    "$nin": lambda a, b: a not in b,
+}
+
+
+class VectorStore(Protocol):
+    """Storage and nearest-neighbour search for embedded documents.
+
+    Results use Chroma's shapes: ``get`` returns flat lists keyed by
+    ``ids/documents/metadatas/embeddings``; ``query`` returns one list per
+    query embedding under ``ids/documents/metadatas/distances/embeddings``.
+    ``add`` ignores ids that already exist and ``update`` ignores unknown
+    ids. ``space`` names the distance ``query`` reports (see
+    ``distances``). ``version`` returns a token that changes with every
+    write, other processes' included, or None if the store cannot tell.
+    """
+
+    space: str
+
+    def add(
+        self,
+        ids: Sequence[str],
+        embeddings: Any,
+        documents: Optional[Sequence[str]] = None,
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> None: ...
+
+    def upsert(
+        self,
+        ids: Sequence[str],
+        embeddings: Any,
+        documents: Optional[Sequence[str]] = None,
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> None: ...
+
+    def update(
+        self,
+        ids: Sequence[str],
+        embeddings: Any = None,
+        documents: Optional[Sequence[str]] = None,
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> None: ...
+
+    def get(
+        self,
+        ids: Optional[Sequence[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        include: Optional[Sequence[str]] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> Dict[str, Any]: ...
+
+    def query(
+        self,
+        query_embeddings: Any,
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None,
+        include: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Any]: ...
+
+    def delete(self, ids: Sequence[str]) -> None: ...
+
+    def count(self) -> int: ...
+
+    def version(self) -> Optional[Hashable]: ...
+
+    def clear(self) -> None: ...
+
+
+def match_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Chroma-style ``where`` filter against one metadata dict.
+
+    Supports equality, ``$eq/$ne/$gt/$gte/$lt/$lte/$in/$nin`` and
+    ``$and/$or``.
+    """
+    if not where:
+        return True
+
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(match_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(match_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                if op not in _COMPARATORS:
+                    raise ValueError(f"Unsupported where operator: {op}")
+                if not _COMPARATORS[op](value, operand):
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+
+    return True
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length as float32 (zero rows stay zero)."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.where(norms == 0, 1.0, norms)).astype(np.float32)
+
+
+def distances(queries: np.ndarray, vectors: np.ndarray, space: str) -> np.ndarray:
+    """Exact query-to-vector distances, as Chroma reports them.
+
+    Args:
+        queries: Query matrix, one per row
+        vectors: Stored vectors, one per row
+        space: ``"l2"`` (squared Euclidean), ``"ip"`` (``1 - dot``) or
+            ``"cosine"`` (``1 - cosine similarity``)
+
+    Returns:
+        ``len(queries) x len(vectors)`` distance matrix
+    """
+    if space == "l2":
+        return (
+            (queries**2).sum(axis=1, keepdims=True)
+            - 2 * queries @ vectors.T
+            + (vectors**2).sum(axis=1)
+        )
+    if space == "ip":
+        return 1.0 - queries @ vectors.T
+    return 1.0 - normalize(queries) @ normalize(vectors).T
+
+
+@dataclass(frozen=True)
+class HNSWParams:
+    """HNSW index settings for a Chroma collection.
+
+    ``space``, ``m`` and ``ef_construction`` shape the graph and are fixed
+    when the collection is created; ``ef_search`` (candidates explored per
+    query) can be changed at any time. Defaults match Chroma's own.
+    """
+
+    space: str = "l2"
+    m: int = 16
+    ef_construction: int = 100
+    ef_search: int = 100
+
+    def __post_init__(self):
+        if self.space not in HNSW_SPACES:
+            raise ValueError(f"Unknown HNSW space: {self.space}")
+        for name in ("m", "ef_construction", "ef_search"):
+            if getattr(self, name) < 1:
+                raise ValueError(f"HNSW {name} must be positive")
+
+    def to_metadata(self) -> Dict[str, Any]:
+        """Collection metadata keys understood by Chroma."""
+        return {
+            "hnsw:space": self.space,
+            "hnsw:M": self.m,
+            "hnsw:construction_ef": self.ef_construction,
+            "hnsw:search_ef": self.ef_search,
+        }
+
+    @classmethod
+    def from_metadata(cls, metadata: Optional[Dict[str, Any]]) -> "HNSWParams":
+        """Read settings from collection metadata, defaulting missing keys."""
+        if not isinstance(metadata, dict):
+            metadata = {}
+        defaults = cls()
+        return cls(
+            space=metadata.get("hnsw:space", defaults.space),
+            m=metadata.get("hnsw:M", defaults.m),
+            ef_construction=metadata.get(
+                "hnsw:construction_ef", defaults.ef_construction
+            ),
+            ef_search=metadata.get("hnsw:search_ef", defaults.ef_search),
+        )
+
+
+class ChromaVectorStore:
+    """``VectorStore`` backed by a persistent Chroma collection."""
+
+    def __init__(
+        self,
+        persist_directory: str,
+        collection_name: str,
+        embedding_function: Any,
+        hnsw: Optional[HNSWParams] = None,
+    ):
+        """Open (or create) a Chroma collection.
+
+        Args:
+            persist_directory: Directory of the Chroma database
+            collection_name: Name of the collection
+            embedding_function: Embedding function registered on the
+                collection
+            hnsw: Index settings for a new collection. An existing
+                collection keeps the graph it was built with and only
+                adopts ``ef_search``; ``clear()`` rebuilds it with these.
+        """
+        import chromadb
+        from chromadb.config import Settings
+
+        self.collection_name = collection_name
+        self.embedding_function = embedding_function
+        self.requested_hnsw = hnsw
+        self.client = chromadb.PersistentClient(
+            path=persist_directory,
+            settings=Settings(
+                anonymized_telemetry=False,
+            ),
+        )
+
+        # Get or create collection
+        try:
+            self.collection = self.client.get_collection(
+                name=collection_name, embedding_function=embedding_function
+            )
+        except Exception:
+            self.collection = self._create()
+
+        self.hnsw = HNSWParams.from_metadata(self.collection.metadata)
+        if hnsw is not None and hnsw.ef_search != self.hnsw.ef_search:
+            self.set_ef_search(hnsw.ef_search)
+
+    def _create(self) -> Any:
+        metadata = dict(COLLECTION_METADATA)
+        if self.requested_hnsw is not None:
+            metadata.update(self.requested_hnsw.to_metadata())
+        return self.client.create_collection(
+            name=self.collection_name,
+            embedding_function=self.embedding_function,
+            metadata=metadata,
+        )
+
+    @property
+    def space(self) -> str:
+        return self.hnsw.space
+
+    def set_ef_search(self, ef_search: int) -> None:
+        """Change the query-time candidate list size without a rebuild.
+
+        Args:
+            ef_search: Candidates explored per query (higher is slower but
+                finds more true neighbours)
+        """
+        params = replace(self.hnsw, ef_search=ef_search)
+        self.collection.modify(configuration={"hnsw": {"ef_search": ef_search}})
+        self.hnsw = params
+
+    def add(self, ids, embeddings, documents=None, metadatas=None) -> None:
+        self.collection.add(
+            ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas
+        )
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None) -> None:
+        self.collection.upsert(
+            ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas
+        )
+
+    def update(self, ids, embeddings=None, documents=None, metadatas=None) -> None:
+        self.collection.update(
+            ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas
+        )
+
+    def get(self, ids=None, where=None, include=None, limit=None, offset=0):
+        kwargs: Dict[str, Any] = {"ids": ids, "where": where, "limit": limit}
+        if offset:
+            kwargs["offset"] = offset
+        if include is not None:
+            kwargs["include"] = list(include)
+        return self.collection.get(**kwargs)
+
+    def query(self, query_embeddings, n_results=10, where=None, include=None):
+        kwargs: Dict[str, Any] = {
+            "query_embeddings": query_embeddings,
+            "n_results": n_results,
+            "where": where,
+        }
+        if include is not None:
+            kwargs["include"] = list(include)
+        return self.collection.query(**kwargs)
+
+    def delete(self, ids) -> None:
+        self.collection.delete(ids=ids)
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def version(self) -> Optional[Hashable]:
+        # Chroma exposes no write counter
+        return None
+
+    def clear(self) -> None:
+        # Delete the collection and recreate it
+        self.client.delete_collection(self.collection_name)
+        self.collection = self._create()
+        self.hnsw = HNSWParams.from_metadata(self.collection.metadata)
+
+
+class InMemoryVectorStore:
+    """Exact ``VectorStore`` over a growable NumPy matrix.
+
+    Cosine distance, brute force, nothing persisted. Serves as the reference
+    implementation other backends are checked and benchmarked against.
+    """
+
+    space = "cosine"
+
+    def __init__(self):
+        """Initialize an empty store."""
+        self._version = 0
+        self.clear()
+
+    def clear(self) -> None:
+        self._version += 1
+        self._ids: list[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._documents: list[Optional[str]] = []
+        self._metadatas: list[Dict[str, Any]] = []
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._unit = np.zeros((0, 0), dtype=np.float32)
+
+    def count(self) -> int:
+        return len(self._ids)
+
+    def version(self) -> Optional[Hashable]:
+        return self._version
+
+    def _ensure_capacity(self, rows: int, dim: int) -> None:
+        if self._vectors.shape[1] == 0:
+            self._vectors = np.zeros((max(rows, 16), dim), dtype=np.float32)
+            self._unit = np.zeros_like(self._vectors)
+        elif self._vectors.shape[1] != dim:
+            raise ValueError(
+                f"Embedding dimension {dim} != store dimension {self._vectors.shape[1]}"
+            )
+        elif rows > len(self._vectors):
+            capacity = max(rows, 2 * len(self._vectors))
+            for name in ("_vectors", "_unit"):
+                grown = np.zeros((capacity, dim), dtype=np.float32)
+                grown[: len(self._ids)] = getattr(self, name)[: len(self._ids)]
+                setattr(self, name, grown)
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None) -> None:
+        self._version += 1
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        new = [doc_id for doc_id in dict.fromkeys(ids) if doc_id not in self._row_of]
+        self._ensure_capacity(len(self._ids) + len(new), vectors.shape[1])
+        for doc_id in new:
+            self._row_of[doc_id] = len(self._ids)
+            self._ids.append(doc_id)
+            self._documents.append(None)
+            self._metadatas.append({})
+
+        # Repeated ids resolve to their last occurrence
+        last = {doc_id: i for i, doc_id in enumerate(ids)}
+        positions = list(last.values())
+        rows = [self._row_of[doc_id] for doc_id in last]
+        self._vectors[rows] = vectors[positions]
+        self._unit[rows] = normalize(vectors[positions])
+        for row, i in zip(rows, positions):
+            self._documents[row] = documents[i] if documents is not None else None
+            self._metadatas[row] = metadatas[i] or {} if metadatas is not None else {}
+
+    def add(self, ids, embeddings, documents=None, metadatas=None) -> None:
+        seen = set()
+        keep = []
+        for i, doc_id in enumerate(ids):
+            if doc_id not in self._row_of and doc_id not in seen:
+                seen.add(doc_id)
+                keep.append(i)
+        if not keep:
+            return
+        self.upsert(
+            [ids[i] for i in keep],
+            np.asarray(embeddings, dtype=np.float32)[keep],
+            [documents[i] for i in keep] if documents is not None else None,
+            [metadatas[i] for i in keep] if metadatas is not None else None,
+        )
+
+    def update(self, ids, embeddings=None, documents=None, metadatas=None) -> None:
+        self._version += 1
+        for i, doc_id in enumerate(ids):
+            row = self._row_of.get(doc_id)
+            if row is None:
+                continue
+            if embeddings is not None:
+                vector = np.asarray(embeddings[i], dtype=np.float32)
+                self._vectors[row] = vector
+                self._unit[row] = normalize(vector[None, :])[0]
+            if documents is not None:
+                self._documents[row] = documents[i]
+            if metadatas is not None:
+                self._metadatas[row] = metadatas[i] or {}
+
+    def delete(self, ids) -> None:
+        self._version += 1
+        for doc_id in ids:
+            row = self._row_of.pop(doc_id, None)
+            if row is None:
+                continue
+            # Swap the last row into the hole to keep the matrix dense
+            last = len(self._ids) - 1
+            if row != last:
+                moved = self._ids[last]
+                self._ids[row] = moved
+                self._documents[row] = self._documents[last]
+                self._metadatas[row] = self._metadatas[last]
+                self._vectors[row] = self._vectors[last]
+                self._unit[row] = self._unit[last]
+                self._row_of[moved] = row
+            self._ids.pop()
+            self._documents.pop()
+            self._metadatas.pop()
+
+    def _select(self, rows: list[int], include: Sequence[str]) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"ids": [self._ids[r] for r in rows]}
+        if "documents" in include:
+            result["documents"] = [self._documents[r] for r in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [self._metadatas[r] for r in rows]
+        if "embeddings" in include:
+            result["embeddings"] = self._vectors[rows]
+        return result
+
+    def get(self, ids=None, where=None, include=None, limit=None, offset=0):
+        include = include if include is not None else ["documents", "metadatas"]
+        if ids is not None:
+            rows = [self._row_of[doc_id] for doc_id in ids if doc_id in self._row_of]
+        else:
+            rows = list(range(len(self._ids)))
+        rows = [r for r in rows if match_where(self._metadatas[r], where)]
+        return self._select(rows[offset : offset + limit if limit else None], include)
+
+    def query(self, query_embeddings, n_results=10, where=None, include=None):
+        include = (
+            include if include is not None else ["documents", "metadatas", "distances"]
+        )
+        queries = normalize(np.atleast_2d(np.asarray(query_embeddings, np.float32)))
+        keys = ["ids"] + [
+            key
+            for key in ("documents", "metadatas", "distances", "embeddings")
+            if key in include
+        ]
+        result: Dict[str, Any] = {key: [] for key in keys}
+
+        count = len(self._ids)
+        allowed = np.array(
+            [match_where(self._metadatas[r], where) for r in range(count)], dtype=bool
+        )
+        if not count or not allowed.any():
+            for key in keys:
+                result[key].extend([] for _ in queries)
+            return result
+
+        similarities = queries @ self._unit[:count].T
+        similarities[:, ~allowed] = -np.inf
+        wanted = min(n_results, int(allowed.sum()))
+        for row_scores in similarities:
+            top = np.argpartition(-row_scores, wanted - 1)[:wanted]
+            top = top[np.argsort(-row_scores[top], kind="stable")]
+            rows = top.tolist()
+            selected = self._select(rows, include)
+            for key in keys:
+                if key == "distances":
+                    result[key].append((1.0 - row_scores[top]).tolist())
+                else:
+                    result[key].append(selected[key])
+
+        return result
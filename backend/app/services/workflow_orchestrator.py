@@ -15,12 +15,22 @@ Manages end-to-end workflows where agents collaborate:
 from datetime import datetime
 from typing import Any, Dict, Optional
 
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
 from app import db
+from app.agents.base_agent import DEFERRED_WRITES
 from app.models import Agent, Message, Task, Workflow
 from app.services.agent_service import get_agent_service
 from app.utils.async_runner import run_async
 
 
+@event.listens_for(Session, "after_commit")
+def _count_commit(session: Session) -> None:
+    """Count commits per session so workflows can report their write cost."""
+    session.info["commit_count"] = session.info.get("commit_count", 0) + 1
+
+
 class WorkflowOrchestrator:
     """Singleton workflow orchestrator"""
 
@@ -38,11 +48,21 @@ class WorkflowOrchestrator:
         self._initialized = True
         self.agent_service = get_agent_service()
         self.active_workflows: Dict[int, Dict[str, Any]] = {}
+        self.metrics: Dict[str, int] = {
+            "workflows": 0,
+            "commits_total": 0,
+            "commits_last": 0,
+            "commits_max": 0,
+        }
 
     def create_workflow(
-        self, name: str, description: str, initial_task: str
+        self, name: str, description: str, initial_task: str, commit: bool = True
     ) -> Workflow:
-        """Create a new workflow"""
+        """Create a new workflow
+
+        With ``commit=False`` the row is only flushed (to assign an ID) and
+        is committed before the first workflow step's agent call.
+        """
         workflow = Workflow(
             name=name,
             description=description,
@@ -51,7 +71,10 @@ class WorkflowOrchestrator:
             meta={"initial_task": initial_task},
         )
         db.session.add(workflow)
-        db.session.commit()
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
 
         return workflow
 
@@ -66,17 +89,18 @@ class WorkflowOrchestrator:
         4. Agents collaborate
         5. Results aggregated and returned
         """
-        workflow = Workflow.query.get(workflow_id)
+        commits_start = self._commit_count()
+
+        workflow = db.session.get(Workflow, workflow_id)
         if not workflow:
             raise ValueError(f"Workflow {workflow_id} not found")
 
         if workflow.status != "pending":
             raise ValueError(f"Workflow {workflow_id} is not pending")
 
-        # Update workflow status
+        # Update workflow status (committed before the first step's agent call)
         workflow.status = "in_progress"
         workflow.started_at = datetime.utcnow()
-        db.session.commit()
 
         # Store workflow context
         self.active_workflows[workflow_id] = {
@@ -85,103 +109,136 @@ class WorkflowOrchestrator:
             "results": {},
         }
 
-        # Create initial task
-        driver_id = self._resolve_agent_id("driver")
-        task = Task(
-            workflow_id=workflow_id,
-            assigned_to=driver_id,
-            status="pending",
-            description=initial_message,
-        )
-        db.session.add(task)
-        db.session.commit()
-
         # Execute workflow
         try:
-            result = self._execute_workflow_step(workflow_id, task.id, initial_message)
+            driver = self._resolve_agents(["driver"])["driver"]
+            task = self._add_task(workflow_id, driver, initial_message)
+            result = self._execute_workflow_step(
+                workflow_id, task, driver, initial_message
+            )
             return {
                 "workflow_id": workflow_id,
                 "status": "in_progress",
                 "message": "Workflow started",
                 "result": result,
+                "commits": self._record_commits(commits_start),
             }
         except Exception as e:
             workflow.status = "failed"
             workflow.completed_at = datetime.utcnow()
             db.session.commit()
+            self._record_commits(commits_start)
             raise e
 
+    def _add_task(
+        self, workflow_id: int, agent: Dict[str, Any], description: str
+    ) -> Task:
+        """Stage a pending task; its workflow step commits it."""
+        task = Task(
+            workflow_id=workflow_id,
+            assigned_to=agent["id"],
+            status="pending",
+            description=description,
+        )
+        db.session.add(task)
+        db.session.flush()
+        return task
+
     def _execute_workflow_step(
-        self, workflow_id: int, task_id: int, message: str
+        self,
+        workflow_id: int,
+        task: Task,
+        agent: Dict[str, Any],
+        message: str,
+        commit: bool = True,
     ) -> Dict[str, Any]:
-        """Execute a single workflow step"""
-        task = Task.query.get(task_id)
-        if not task:
-            raise ValueError(f"Task {task_id} not found")
-
-        # Update task status
+        """Execute a single workflow step
+
+        The task's ``in_progress`` status and the agent's ``busy`` status
+        are committed before the agent call, so no transaction is open
+        while the LLM runs. The agent's own writes are queued during the
+        call and applied afterwards with the step's message rows and task
+        result, all in one transaction. With ``commit=False`` that
+        transaction is left for the caller (e.g. the next step) to commit.
+        """
+        task_id = task.id
         task.status = "in_progress"
+        agent_record = db.session.get(Agent, agent["id"])
+        previous_status = agent_record.status if agent_record else None
+        if agent_record:
+            agent_record.status = "busy"
         db.session.commit()
 
-        # Get agent for this task
-        agent = Agent.query.get(task.assigned_to)
-        if not agent:
-            raise ValueError(f"Agent {task.assigned_to} not found")
-
         # Record step
         if workflow_id in self.active_workflows:
             self.active_workflows[workflow_id]["steps"].append(
                 {
                     "task_id": task_id,
-                    "agent": agent.type,
+                    "agent": agent["type"],
                     "message": message,
                     "timestamp": datetime.utcnow().isoformat(),
                 }
             )
 
-        # Send message to agent (async)
+        # Send message to agent (async); the agent queues its writes
+        writes = db.session.info[DEFERRED_WRITES] = []
         try:
             response = run_async(
-                self.agent_service.send_message_to_agent, agent.id, message
+                self.agent_service.send_message_to_agent,
+                agent["id"],
+                message,
+                workflow_id=workflow_id,
             )
         except RuntimeError as exc:
+            task.status = "failed"
             raise RuntimeError(f"Agent service error: {exc}") from exc
+        finally:
+            db.session.info.pop(DEFERRED_WRITES, None)
+            # The agent's own status writes, if any, replace the restored one
+            if agent_record:
+                agent_record.status = previous_status
+            for write in writes:
+                write()
 
         if not response.get("success"):
+            task.status = "failed"
             error_message = response.get("error", "Unknown agent error")
             raise RuntimeError(f"Agent execution failed: {error_message}")
 
-        # Create message record
-        msg = Message(
-            agent_id=agent.id,
-            sender="system",
-            content=f"Workflow task: {message}",
-            timestamp=datetime.utcnow(),
+        # Create message records
+        now = datetime.utcnow()
+        db.session.add_all(
+            [
+                Message(
+                    agent_id=agent["id"],
+                    sender="system",
+                    content=f"Workflow task: {message}",
+                    timestamp=now,
+                ),
+                Message(
+                    agent_id=agent["id"],
+                    sender=agent["name"],
+                    content=response.get("response", "No response"),
+                    timestamp=now,
+                ),
+            ]
         )
-        db.session.add(msg)
-
-        response_msg = Message(
-            agent_id=agent.id,
-            sender=agent.name,
-            content=response.get("response", "No response"),
-            timestamp=datetime.utcnow(),
-        )
-        db.session.add(response_msg)
 
         # Update task
         task.status = "completed"
-        task.completed_at = datetime.utcnow()
-        db.session.commit()
+        task.completed_at = now
+        if commit:
+            db.session.commit()
 
         return {
             "task_id": task_id,
-            "agent": agent.type,
+            "agent": agent["type"],
             "response": response.get("response"),
         }
 
     def complete_workflow(self, workflow_id: int) -> None:
         """Mark workflow as completed"""
-        workflow = Workflow.query.get(workflow_id)
+        workflow = db.session.get(Workflow, workflow_id)
         if not workflow:
             raise ValueError(f"Workflow {workflow_id} not found")
 
@@ -195,7 +252,7 @@ class WorkflowOrchestrator:
 
     def fail_workflow(self, workflow_id: int, error: str) -> None:
         """Mark workflow as failed"""
-        workflow = Workflow.query.get(workflow_id)
+        workflow = db.session.get(Workflow, workflow_id)
         if not workflow:
             raise ValueError(f"Workflow {workflow_id} not found")
 
@@ -210,25 +267,62 @@ class WorkflowOrchestrator:
 
     def get_workflow_status(self, workflow_id: int) -> Dict[str, Any]:
         """Get current workflow status"""
-        workflow = Workflow.query.get(workflow_id)
+        workflow = Workflow.get_with_tasks(workflow_id)
         if not workflow:
             raise ValueError(f"Workflow {workflow_id} not found")
 
-        tasks = Task.query.filter_by(workflow_id=workflow_id).all()
-
         return {
-            "workflow": workflow.to_dict(),
-            "tasks": [task.to_dict() for task in tasks],
+            **workflow.to_status_dict(),
             "active": workflow_id in self.active_workflows,
             "context": self.active_workflows.get(workflow_id, {}),
         }
 
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get database commit metrics for executed workflows."""
+        runs = self.metrics["workflows"]
+        return {
+            **self.metrics,
+            "commits_avg": self.metrics["commits_total"] / runs if runs else 0.0,
+        }
+
+    def _commit_count(self) -> int:
+        """Number of commits made so far on the current session."""
+        return db.session.info.get("commit_count", 0)
+
+    def _record_commits(self, commits_start: int) -> int:
+        """Record the commits made by one workflow run."""
+        commits = self._commit_count() - commits_start
+        self.metrics["workflows"] += 1
+        self.metrics["commits_total"] += commits
+        self.metrics["commits_last"] = commits
+        self.metrics["commits_max"] = max(self.metrics["commits_max"], commits)
+        return commits
+
+    def _resolve_agents(self, agent_types: list[str]) -> Dict[str, Dict[str, Any]]:
+        """Resolve agent types to plain ``id``/``name``/``type`` records.
+
+        One query covers all types, and the returned snapshots stay usable
+        after commits expire the ORM instances.
+        """
+        rows = (
+            Agent.query.filter(Agent.type.in_(agent_types))
+            .order_by(Agent.id)
+            .all()
+        )
+        agents: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            agents.setdefault(
+                row.type, {"id": row.id, "name": row.name, "type": row.type}
+            )
+
+        for agent_type in agent_types:
+            if agent_type not in agents:
+                raise ValueError(f"Agent type {agent_type} not found")
+        return agents
+
     def _resolve_agent_id(self, agent_type: str) -> int:
         """Resolve an agent type to its database identifier."""
-        agent = Agent.query.filter_by(type=agent_type).first()
-        if not agent:
-            raise ValueError(f"Agent type {agent_type} not found")
-        return agent.id
+        return self._resolve_agents([agent_type])[agent_type]["id"]
 
     def execute_complete_workflow(
         self, task_description: str
@@ -244,76 +338,60 @@ class WorkflowOrchestrator:
         5. Creator requests specialist from Generator (HR)
         6. Generator designs new agent
         7. Results aggregated
+
+        Each step commits once before its agent call; a step's results
+        ride on the next step's commit, and the last step's on completion.
         """
+        commits_start = self._commit_count()
+
         # Create workflow
         workflow = self.create_workflow(
             name=f"Workflow: {task_description[:50]}",
             description=task_description,
             initial_task=task_description,
+            commit=False,
         )
+        workflow_id = workflow.id
 
-        try:
-            # Step 1: Send to Driver
-            driver_task = Task(
-                workflow_id=workflow.id,
-                assigned_to=self._resolve_agent_id("driver"),
-                status="pending",
-                description=f"Coordinate: {task_description}",
-            )
-            db.session.add(driver_task)
-            db.session.commit()
-
-            driver_result = self._execute_workflow_step(
-                workflow.id, driver_task.id, task_description
-            )
-
-            # Step 2: Driver delegates to Creator for research
-            creator_task = Task(
-                workflow_id=workflow.id,
-                assigned_to=self._resolve_agent_id("creator"),
-                status="pending",
-                description=f"Research: {task_description}",
-            )
-            db.session.add(creator_task)
-            db.session.commit()
-
-            creator_result = self._execute_workflow_step(
-                workflow.id,
-                creator_task.id,
+        plan = [
+            ("driver", f"Coordinate: {task_description}", task_description),
+            (
+                "creator",
+                f"Research: {task_description}",
                 f"Research the following topic: {task_description}",
-            )
+            ),
+            (
+                "generator",
+                f"Create specialist for: {task_description}",
+                f"Design a specialist agent for: {task_description}",
+            ),
+        ]
 
-            # Step 3: Request specialist from Generator
-            generator_task = Task(
-                workflow_id=workflow.id,
-                assigned_to=self._resolve_agent_id("generator"),
-                status="pending",
-                description=f"Create specialist for: {task_description}",
-            )
-            db.session.add(generator_task)
-            db.session.commit()
+        try:
+            agents = self._resolve_agents([agent_type for agent_type, _, _ in plan])
 
-            generator_result = self._execute_workflow_step(
-                workflow.id,
-                generator_task.id,
-                f"Design a specialist agent for: {task_description}",
-            )
+            steps = []
+            for number, (agent_type, description, message) in enumerate(plan, 1):
+                agent = agents[agent_type]
+                task = self._add_task(workflow_id, agent, description)
+                result = self._execute_workflow_step(
+                    workflow_id, task, agent, message, commit=False
+                )
+                steps.append({"step": number, "agent": agent_type, "result": result})
 
-            # Complete workflow
-            self.complete_workflow(workflow.id)
+            # Complete workflow (commits the final step as well)
+            self.complete_workflow(workflow_id)
 
             return {
-                "workflow_id": workflow.id,
+                "workflow_id": workflow_id,
                 "status": "completed",
-                "steps": [
-                    {"step": 1, "agent": "driver", "result": driver_result},
-                    {"step": 2, "agent": "creator", "result": creator_result},
-                    {"step": 3, "agent": "generator", "result": generator_result},
-                ],
+                "steps": steps,
+                "commits": self._record_commits(commits_start),
             }
 
         except Exception as e:
-            self.fail_workflow(workflow.id, str(e))
+            self.fail_workflow(workflow_id, str(e))
+            self._record_commits(commits_start)
             raise e
 
 
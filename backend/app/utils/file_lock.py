@@ -0,0 +1,37 @@
+"""Advisory file locks for data files shared between processes.
+
+The server and the maintenance scripts (ingestion, archiving) open the same
+cache and index files. Appends and rewrites take an exclusive lock on a
+sidecar ``.lock`` file; readers that must see a consistent file take a
+shared one. On platforms without ``fcntl`` the locks are no-ops.
+"""
+
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: str | os.PathLike, shared: bool = False) -> Iterator[None]:
+    """Hold an advisory lock on ``path`` for the duration of the block.
+
+    Args:
+        path: Lock file (created if missing)
+        shared: Take a shared (read) lock instead of an exclusive one
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,129 @@
+"""Keyset (cursor) pagination helpers for list endpoints.
+
+Cursors are opaque, URL-safe tokens that encode the sort key of the row at
+the edge of a page. Fetching the next page is a range scan starting at that
+key, so the cost per page stays constant no matter how deep the client walks.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode a row's sort key as an opaque cursor token.
+
+    Args:
+        values: Sort key values (datetimes are stored as ISO strings)
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, types: Sequence[type]) -> tuple[Any, ...]:
+    """Decode a cursor token back into typed sort key values.
+
+    Args:
+        token: Cursor produced by :func:`encode_cursor`
+        types: Expected type of each key component (``datetime`` or ``int``)
+
+    Returns:
+        Tuple of sort key values
+
+    Raises:
+        ValueError: If the token is malformed or does not match ``types``
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+    if not isinstance(payload, list) or len(payload) != len(types):
+        raise ValueError("Invalid cursor")
+
+    values: list[Any] = []
+    for value, expected in zip(payload, types):
+        if value is None:
+            values.append(None)
+        elif expected is datetime and isinstance(value, str):
+            values.append(datetime.fromisoformat(value))
+        elif expected is int and isinstance(value, int):
+            values.append(value)
+        else:
+            raise ValueError("Invalid cursor")
+
+    return tuple(values)
+
+
+def clamp_page_size(
+    requested: Optional[int],
+    default: int = DEFAULT_PAGE_SIZE,
+    maximum: int = MAX_PAGE_SIZE,
+) -> int:
+    """Clamp a client-supplied page size into ``[1, maximum]``.
+
+    Args:
+        requested: Requested page size (None uses the default)
+        default: Page size when none was requested
+        maximum: Hard upper bound
+
+    Returns:
+        Effective page size
+    """
+    if requested is None:
+        requested = default
+    return max(1, min(requested, maximum))
+
+
+def keyset_filter(columns: Sequence[Any], values: Sequence[Any], direction: str):
+    """Build a row-value comparison for keyset pagination.
+
+    Expands ``(c1, c2) < (v1, v2)`` into portable boolean SQL, since SQLite
+    does not index tuple comparisons.
+
+    Args:
+        columns: Sort key columns, most significant first
+        values: Cursor values for those columns
+        direction: ``"lt"`` for rows before the cursor, ``"gt"`` for after
+
+    Returns:
+        SQLAlchemy boolean expression
+    """
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        prefix = [c == v for c, v in zip(columns[:i], values[:i])]
+        edge = column < value if direction == "lt" else column > value
+        clauses.append(and_(*prefix, edge))
+    return or_(*clauses)
+
+
+def set_cursor_headers(
+    response: Any, next_cursor: Optional[str], prev_cursor: Optional[str]
+) -> None:
+    """Attach page cursors to a Flask response.
+
+    Bodies stay plain JSON lists so existing clients keep working; cursors
+    travel in ``X-Next-Cursor`` / ``X-Prev-Cursor`` headers.
+
+    Args:
+        response: Flask response object
+        next_cursor: Cursor for the following page, if any
+        prev_cursor: Cursor for the preceding page, if any
+    """
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if prev_cursor:
+        response.headers["X-Prev-Cursor"] = prev_cursor
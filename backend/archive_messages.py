@@ -0,0 +1,38 @@
+"""Archive old agent messages into compressed cold-storage segments."""
+
+import argparse
+from datetime import datetime, timedelta
+
+from app import create_app
+from app.services import get_message_archive
+
+
+def archive_old_messages(days: int, batch_size: int) -> None:
+    """Move messages older than ``days`` out of the messages table."""
+    app = create_app()
+
+    with app.app_context():
+        archive = get_message_archive()
+        if archive is None:
+            print("Message archive is disabled (MESSAGE_ARCHIVE_DIR not set).")
+            return
+
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        result = archive.archive_messages(cutoff, batch_size=batch_size)
+
+        print(
+            f"✅ Archived {result['archived']} messages older than "
+            f"{cutoff:%Y-%m-%d} into {result['segments']} segment(s)"
+        )
+        print(f"   Archive: {archive.directory}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=90, help="Age cutoff in days")
+    parser.add_argument(
+        "--batch-size", type=int, default=5000, help="Messages per segment"
+    )
+    args = parser.parse_args()
+
+    archive_old_messages(args.days, args.batch_size)
@@ -0,0 +1,88 @@
+"""Compare vector-only and hybrid (BM25 + vector) retrieval.
+
+Builds a throwaway knowledge base from a synthetic corpus in which every
+document carries a unique package-style identifier. Each query names one
+identifier plus a few words from its document, as an operator would. The
+document it came from is the single relevant result, which gives recall@k
+and latency for each search mode.
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+from app.services.rag_service import RAGService
+
+WORDS = (
+    "agent workflow task message queue worker schedule retry timeout cache "
+    "index vector search embedding model prompt context budget token chunk "
+    "database session commit rollback migration schema query filter page "
+    "cursor stream batch buffer socket event handler route service config"
+).split()
+
+
+def build_corpus(size: int, seed: int) -> tuple[list[str], list[str]]:
+    """Generate documents and their ids."""
+    rng = random.Random(seed)
+    ids = [f"pkg-{i:05d}" for i in range(size)]
+    documents = [
+        f"{doc_id} " + " ".join(rng.choice(WORDS) for _ in range(40)) for doc_id in ids
+    ]
+    return ids, documents
+
+
+def run(size: int, queries: int, k: int, seed: int, backend: str) -> None:
+    ids, documents = build_corpus(size, seed)
+    rng = random.Random(seed + 1)
+    targets = rng.sample(range(size), min(queries, size))
+    workload = [
+        (f"{ids[i]} " + " ".join(rng.sample(documents[i].split()[1:], 3)), ids[i])
+        for i in targets
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = RAGService(persist_directory=tmp, query_cache_size=0, backend=backend)
+
+        started = time.perf_counter()
+        for start in range(0, size, 256):
+            service.add_documents(
+                documents[start : start + 256], ids=ids[start : start + 256]
+            )
+        print(f"Ingested {size} documents in {time.perf_counter() - started:.1f}s\n")
+
+        print(f"{'mode':<8} {'recall@' + str(k):>10} {'p50 ms':>8} {'p95 ms':>8}")
+        for mode in ("vector", "hybrid"):
+            # Warm up the model and (for hybrid) the lexical index
+            service.search(workload[0][0], k=k, mode=mode)
+
+            hits = 0
+            latencies = []
+            for query, expected in workload:
+                started = time.perf_counter()
+                results = service.search(query, k=k, mode=mode)
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits += any(r["id"] == expected for r in results)
+
+            p95 = statistics.quantiles(latencies, n=20)[-1]
+            print(
+                f"{mode:<8} {hits / len(workload):>10.3f} "
+                f"{statistics.median(latencies):>8.2f} {p95:>8.2f}"
+            )
+
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=5000, help="Corpus size")
+    parser.add_argument("--queries", type=int, default=200, help="Queries to run")
+    parser.add_argument("-k", type=int, default=5, help="Results per query")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+    parser.add_argument(
+        "--backend", choices=["chroma", "quantized", "memory"], default="chroma"
+    )
+    args = parser.parse_args()
+
+    run(args.docs, args.queries, args.k, args.seed, args.backend)
@@ -0,0 +1,160 @@
+"""Benchmark every vector-store backend on the same workload.
+
+Embeds a synthetic corpus once, then for each backend measures the ingest
+rate, query latency (p50/p95), recall@k against an exact brute-force
+search, and the resident memory the loaded store added. Embeddings are
+random unit vectors by default, which isolates the stores from the model;
+``--embeddings model`` uses the real embedding function instead.
+"""
+
+import argparse
+import gc
+import os
+import resource
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.vector_store import normalize
+from benchmark_retrieval import build_corpus
+
+BACKENDS = ("chroma", "quantized", "memory")
+
+
+def rss_bytes() -> int:
+    """Current resident set size (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def open_store(backend: str, directory: str):
+    """Create an empty store for a backend."""
+    if backend == "quantized":
+        from app.services.quantized_store import QuantizedCollection
+
+        return QuantizedCollection(directory)
+    if backend == "memory":
+        from app.services.vector_store import InMemoryVectorStore
+
+        return InMemoryVectorStore()
+
+    from app.services.vector_store import ChromaVectorStore
+
+    return ChromaVectorStore(directory, "benchmark", embedding_function=None)
+
+
+def embed_corpus(documents: list[str], mode: str, dim: int, seed: int) -> np.ndarray:
+    if mode == "random":
+        rng = np.random.default_rng(seed)
+        return normalize(rng.normal(size=(len(documents), dim)))
+
+    from chromadb.utils import embedding_functions
+
+    embed = embedding_functions.DefaultEmbeddingFunction()
+    return np.asarray(
+        [
+            v
+            for i in range(0, len(documents), 256)
+            for v in embed(documents[i : i + 256])
+        ],
+        dtype=np.float32,
+    )
+
+
+def run(
+    size: int,
+    queries: int,
+    k: int,
+    batch_size: int,
+    embeddings: str,
+    dim: int,
+    seed: int,
+    backends: list[str],
+) -> None:
+    ids, documents = build_corpus(size, seed)
+    print(f"Embedding {size} documents ({embeddings})...")
+    vectors = embed_corpus(documents, embeddings, dim, seed)
+
+    # Queries are perturbed corpus vectors; ground truth is the exact top-k
+    rng = np.random.default_rng(seed + 1)
+    picked = rng.choice(size, size=min(queries, size), replace=False)
+    query_vectors = normalize(
+        vectors[picked] + rng.normal(scale=0.05, size=(len(picked), vectors.shape[1]))
+    )
+    exact = np.argsort(-(query_vectors @ vectors.T), axis=1)[:, :k]
+    truth = [{ids[i] for i in row} for row in exact]
+
+    print(
+        f"\n{'backend':<10} {'docs/s':>9} {'recall@' + str(k):>10} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'mem MiB':>8}"
+    )
+    for backend in backends:
+        with tempfile.TemporaryDirectory() as tmp:
+            gc.collect()
+            baseline = rss_bytes()
+            try:
+                store = open_store(backend, tmp)
+            except ImportError as e:
+                print(f"{backend:<10} skipped ({e})")
+                continue
+
+            started = time.perf_counter()
+            for start in range(0, size, batch_size):
+                end = start + batch_size
+                store.add(
+                    ids=ids[start:end],
+                    embeddings=vectors[start:end],
+                    documents=documents[start:end],
+                    metadatas=[{"n": i} for i in range(start, min(end, size))],
+                )
+            ingest_rate = size / (time.perf_counter() - started)
+            memory = (rss_bytes() - baseline) / 2**20
+
+            # Warm up before timing
+            store.query(query_embeddings=query_vectors[:1], n_results=k)
+
+            hits = 0
+            latencies = []
+            for query, expected in zip(query_vectors, truth):
+                started = time.perf_counter()
+                result = store.query(query_embeddings=[query], n_results=k)
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits += len(expected & set(result["ids"][0]))
+
+            p95 = statistics.quantiles(latencies, n=20)[-1]
+            print(
+                f"{backend:<10} {ingest_rate:>9.0f} {hits / (k * len(truth)):>10.3f} "
+                f"{statistics.median(latencies):>8.2f} {p95:>8.2f} {memory:>8.1f}"
+            )
+            del store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=20000, help="Corpus size")
+    parser.add_argument("--queries", type=int, default=200, help="Queries to run")
+    parser.add_argument("-k", type=int, default=10, help="Results per query")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Add batch size")
+    parser.add_argument("--embeddings", choices=["random", "model"], default="random")
+    parser.add_argument("--dim", type=int, default=384, help="Random vector size")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+    parser.add_argument(
+        "--backend", choices=BACKENDS, action="append", help="Repeatable (default: all)"
+    )
+    args = parser.parse_args()
+
+    run(
+        args.docs,
+        args.queries,
+        args.k,
+        args.batch_size,
+        args.embeddings,
+        args.dim,
+        args.seed,
+        args.backend or list(BACKENDS),
+    )
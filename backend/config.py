@@ -22,6 +22,67 @@ class Config:
     # WebSocket settings
     SOCKETIO_CORS_ALLOWED_ORIGINS = "*"
 
+    # Hard cap on page size for paginated list endpoints
+    API_MAX_PAGE_SIZE = int(os.environ.get("API_MAX_PAGE_SIZE", "200"))
+
+    # Seconds to cache /api/stats aggregates (0 disables caching)
+    STATS_CACHE_TTL = float(os.environ.get("STATS_CACHE_TTL", "2.0"))
+
+    # Persistent embedding cache for the RAG service (empty disables it)
+    EMBEDDING_CACHE_DIR = os.environ.get(
+        "EMBEDDING_CACHE_DIR", str(basedir / "data" / "embedding_cache")
+    )
+
+    # Threads reserved for async RAG retrieval
+    RAG_SEARCH_WORKERS = int(os.environ.get("RAG_SEARCH_WORKERS", "2"))
+
+    # Load the embedding model in the background as soon as the RAG service
+    # is created; /api/status reports not ready until it finishes
+    RAG_WARMUP = os.environ.get("RAG_WARMUP", "true").lower() == "true"
+
+    # Vector store behind the RAG service: "chroma" (HNSW), "quantized"
+    # (int8 brute-force scan, suited to collections under ~1M vectors) or
+    # "memory" (exact NumPy scan, not persisted)
+    RAG_VECTOR_BACKEND = os.environ.get("RAG_VECTOR_BACKEND", "chroma")
+
+    # HNSW index of the Chroma backend (Chroma's defaults). Space, M and
+    # ef_construction apply when the collection is created; ef_search is
+    # applied on every start. Tune with sweep_hnsw.py.
+    RAG_HNSW_SPACE = os.environ.get("RAG_HNSW_SPACE", "l2")
+    RAG_HNSW_M = int(os.environ.get("RAG_HNSW_M", "16"))
+    RAG_HNSW_EF_CONSTRUCTION = int(os.environ.get("RAG_HNSW_EF_CONSTRUCTION", "100"))
+    RAG_HNSW_EF_SEARCH = int(os.environ.get("RAG_HNSW_EF_SEARCH", "100"))
+
+    # Persisted BM25 index for hybrid search (empty keeps it in memory only)
+    RAG_LEXICAL_INDEX_DIR = os.environ.get(
+        "RAG_LEXICAL_INDEX_DIR", str(basedir / "data" / "bm25")
+    )
+
+    # Filtered searches narrowed by the metadata index to at most this many
+    # documents are scored exactly instead of through the ANN index
+    RAG_PREFILTER_MAX_CANDIDATES = int(
+        os.environ.get("RAG_PREFILTER_MAX_CANDIDATES", "2048")
+    )
+
+    # Token window and overlap used when chunking documents for ingestion
+    RAG_CHUNK_TOKENS = int(os.environ.get("RAG_CHUNK_TOKENS", "256"))
+    RAG_CHUNK_OVERLAP = int(os.environ.get("RAG_CHUNK_OVERLAP", "32"))
+
+    # Dynamic agents kept in memory; least recently used idle agents beyond
+    # this are hibernated to the database (0 disables the cap)
+    AGENT_MAX_RESIDENT = int(os.environ.get("AGENT_MAX_RESIDENT", "100"))
+
+    # Seconds between background checkpoints of changed agent conversations
+    # (0 disables checkpointing)
+    AGENT_CHECKPOINT_INTERVAL = float(
+        os.environ.get("AGENT_CHECKPOINT_INTERVAL", "5.0")
+    )
+
+    # Cold storage for archived messages (empty string disables the archive)
+    MESSAGE_ARCHIVE_DIR = os.environ.get(
+        "MESSAGE_ARCHIVE_DIR", str(basedir / "data" / "message_archive")
+    )
+
 
 class DevelopmentConfig(Config):
     """Development configuration."""
@@ -39,6 +100,13 @@ class TestingConfig(Config):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
     SECRET_KEY = "test-secret-key"
+    # Each test gets a fresh database, so a process-wide cache would go stale
+    STATS_CACHE_TTL = 0.0
+    MESSAGE_ARCHIVE_DIR = None
+    EMBEDDING_CACHE_DIR = None
+    RAG_LEXICAL_INDEX_DIR = None
+    RAG_WARMUP = False
+    AGENT_CHECKPOINT_INTERVAL = 0.0
 
 
 class ProductionConfig(Config):
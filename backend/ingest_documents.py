@@ -0,0 +1,79 @@
+"""Bulk-load documents into the RAG knowledge base."""
+
+import argparse
+
+from app import create_app
+from app.services import IngestionPipeline, TokenChunker, get_rag_service
+
+
+def ingest(
+    source: str, batch_size: int, checkpoint: str, restart: bool, chunk: bool
+) -> None:
+    """Stream documents from ``source`` into the knowledge base."""
+    app = create_app()
+
+    with app.app_context():
+        chunker = None
+        if chunk:
+            chunker = TokenChunker(
+                chunk_tokens=app.config["RAG_CHUNK_TOKENS"],
+                overlap=app.config["RAG_CHUNK_OVERLAP"],
+            )
+        pipeline = IngestionPipeline(
+            get_rag_service(),
+            batch_size=batch_size,
+            checkpoint_path=checkpoint,
+            chunker=chunker,
+        )
+        if restart:
+            pipeline.clear_checkpoint()
+
+        def report(stats):
+            print(
+                f"   {stats.documents} documents ({stats.chunks} chunks) in "
+                f"{stats.batches} batch(es), "
+                f"{stats.docs_per_second:.1f} docs/sec",
+                flush=True,
+            )
+
+        stats = pipeline.run(source, progress=report)
+
+        if stats.resumed_from:
+            print(
+                f"Resumed after {stats.resumed_from['documents']} documents "
+                f"({stats.resumed_from['path']})"
+            )
+        print(
+            f"✅ Ingested {stats.documents} documents in {stats.seconds:.1f}s "
+            f"({stats.docs_per_second:.1f} docs/sec)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("source", help="Directory, JSONL file or text file")
+    parser.add_argument(
+        "--batch-size", type=int, default=64, help="Documents per embedding batch"
+    )
+    parser.add_argument(
+        "--checkpoint",
+        default="./data/ingest_checkpoint.json",
+        help="File recording progress for resuming",
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="Ignore any saved checkpoint"
+    )
+    parser.add_argument(
+        "--no-chunking",
+        action="store_true",
+        help="Store whole documents instead of token chunks",
+    )
+    args = parser.parse_args()
+
+    ingest(
+        args.source,
+        args.batch_size,
+        args.checkpoint,
+        args.restart,
+        not args.no_chunking,
+    )
@@ -0,0 +1,31 @@
+"""Indexes for keyset pagination
+
+Revision ID: 3a1f9c2d8e47
+Revises: 17cec04275e6
+Create Date: 2026-10-19 09:12:41.118204
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "3a1f9c2d8e47"
+down_revision = "17cec04275e6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_messages_agent_timestamp_id",
+        "messages",
+        ["agent_id", "timestamp", "id"],
+        unique=False,
+    )
+    op.create_index(op.f("ix_workflows_status"), "workflows", ["status"], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f("ix_workflows_status"), table_name="workflows")
+    op.drop_index("ix_messages_agent_timestamp_id", table_name="messages")
@@ -0,0 +1,32 @@
+"""Serialized agent state for hibernated agents
+
+Revision ID: 8c2e5d7a91b3
+Revises: 3a1f9c2d8e47
+Create Date: 2026-10-19 14:03:27.551902
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8c2e5d7a91b3"
+down_revision = "3a1f9c2d8e47"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "agent_states",
+        sa.Column("agent_id", sa.Integer(), nullable=False),
+        sa.Column("state", sa.LargeBinary(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["agent_id"], ["agents.id"]),
+        sa.PrimaryKeyConstraint("agent_id"),
+    )
+
+
+def downgrade():
+    op.drop_table("agent_states")
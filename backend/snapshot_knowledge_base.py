@@ -0,0 +1,60 @@
+"""Export the RAG knowledge base to a snapshot file, or restore one.
+
+Snapshots carry the stored embeddings, so a restore is a bulk insert with
+no calls to the embedding model.
+"""
+
+import argparse
+import time
+
+from app import create_app
+from app.services import get_rag_service
+
+
+def export(path: str) -> None:
+    """Write the knowledge base to ``path``."""
+    app = create_app()
+
+    with app.app_context():
+        started = time.perf_counter()
+        count = get_rag_service().export_snapshot(path)
+        print(
+            f"✅ Exported {count} documents to {path} in "
+            f"{time.perf_counter() - started:.1f}s"
+        )
+
+
+def restore(path: str, batch_size: int, replace: bool) -> None:
+    """Load the snapshot at ``path`` into the knowledge base."""
+    app = create_app()
+
+    with app.app_context():
+        stats = get_rag_service().import_snapshot(
+            path, batch_size=batch_size, replace=replace
+        )
+        print(f"✅ Imported {stats['documents']} documents in {stats['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Write a snapshot")
+    export_parser.add_argument("path", help="Snapshot file to write")
+
+    import_parser = commands.add_parser("import", help="Restore a snapshot")
+    import_parser.add_argument("path", help="Snapshot file to read")
+    import_parser.add_argument(
+        "--batch-size", type=int, default=1000, help="Documents per insert"
+    )
+    import_parser.add_argument(
+        "--replace",
+        action="store_true",
+        help="Clear the knowledge base before importing",
+    )
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export(args.path)
+    else:
+        restore(args.path, args.batch_size, args.replace)
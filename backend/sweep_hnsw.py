@@ -0,0 +1,168 @@
+"""Sweep HNSW settings for recall@k and query latency.
+
+Loads the stored embeddings of the knowledge base (or a synthetic set with
+``--synthetic``), builds a throwaway Chroma collection for every
+``M x ef_construction`` pair and queries it at every ``ef_search``. Recall
+is measured against exact brute-force search in the same space. Queries
+are a sample of the corpus vectors, or lines of ``--query-file`` embedded
+with the service's model.
+
+Pick the cheapest row that meets the recall target, then set
+``RAG_HNSW_M``, ``RAG_HNSW_EF_CONSTRUCTION`` and ``RAG_HNSW_EF_SEARCH``.
+"""
+
+import argparse
+import itertools
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from app import create_app
+from app.services import get_rag_service
+from app.services.vector_store import (
+    ChromaVectorStore,
+    HNSWParams,
+    distances,
+    normalize,
+)
+
+PAGE_SIZE = 1000
+
+
+def load_corpus() -> tuple[list[str], np.ndarray]:
+    """Read every id and embedding from the knowledge base."""
+    store = get_rag_service().collection
+    ids: list[str] = []
+    vectors = []
+    offset = 0
+    while True:
+        page = store.get(include=["embeddings"], limit=PAGE_SIZE, offset=offset)
+        if not len(page["ids"]):
+            break
+        ids.extend(page["ids"])
+        vectors.append(np.asarray(page["embeddings"], dtype=np.float32))
+        offset += len(page["ids"])
+    if not ids:
+        raise SystemExit("Knowledge base is empty; ingest documents or use --synthetic")
+    return ids, np.concatenate(vectors)
+
+
+def exact_top_k(
+    vectors: np.ndarray, queries: np.ndarray, k: int, space: str
+) -> np.ndarray:
+    """Indices of the true k nearest neighbours of each query."""
+    return np.argsort(distances(queries, vectors, space), axis=1)[:, :k]
+
+
+def run(
+    ids: list[str],
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    space: str,
+    ms: list[int],
+    ef_constructions: list[int],
+    ef_searches: list[int],
+) -> None:
+    truth = [{ids[i] for i in row} for row in exact_top_k(vectors, queries, k, space)]
+    print(f"{len(ids)} vectors, {len(queries)} queries, space={space}\n")
+    print(
+        f"{'M':>4} {'ef_c':>6} {'ef_s':>6} {'build s':>8} "
+        f"{'recall@' + str(k):>10} {'p50 ms':>8} {'p95 ms':>8}"
+    )
+
+    for m, ef_construction in itertools.product(ms, ef_constructions):
+        with tempfile.TemporaryDirectory() as tmp:
+            params = HNSWParams(
+                space=space, m=m, ef_construction=ef_construction, ef_search=10
+            )
+            store = ChromaVectorStore(tmp, "sweep", None, hnsw=params)
+
+            started = time.perf_counter()
+            for start in range(0, len(ids), PAGE_SIZE):
+                store.add(
+                    ids=ids[start : start + PAGE_SIZE],
+                    embeddings=vectors[start : start + PAGE_SIZE],
+                )
+            build_seconds = time.perf_counter() - started
+
+            for ef_search in ef_searches:
+                store.set_ef_search(ef_search)
+                store.query(query_embeddings=queries[:1], n_results=k)
+
+                hits = 0
+                latencies = []
+                for query, expected in zip(queries, truth):
+                    started = time.perf_counter()
+                    result = store.query(
+                        query_embeddings=[query], n_results=k, include=[]
+                    )
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    hits += len(expected & set(result["ids"][0]))
+
+                p95 = statistics.quantiles(latencies, n=20)[-1]
+                print(
+                    f"{m:>4} {ef_construction:>6} {ef_search:>6} "
+                    f"{build_seconds:>8.1f} {hits / (k * len(truth)):>10.3f} "
+                    f"{statistics.median(latencies):>8.2f} {p95:>8.2f}"
+                )
+
+
+def int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--m", type=int_list, default=[8, 16, 32], help="M values")
+    parser.add_argument(
+        "--ef-construction", type=int_list, default=[100, 200], help="Build ef values"
+    )
+    parser.add_argument(
+        "--ef-search", type=int_list, default=[10, 50, 100, 200], help="Query ef values"
+    )
+    parser.add_argument(
+        "--space", choices=["l2", "cosine", "ip"], help="Default: RAG_HNSW_SPACE"
+    )
+    parser.add_argument("-k", type=int, default=10, help="Results per query")
+    parser.add_argument("--queries", type=int, default=200, help="Queries to sample")
+    parser.add_argument("--query-file", help="Text queries, one per line")
+    parser.add_argument(
+        "--synthetic", type=int, metavar="N", help="Use N random 384-d vectors"
+    )
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    app = create_app()
+    with app.app_context():
+        space = args.space or app.config["RAG_HNSW_SPACE"]
+        if args.synthetic:
+            vectors = normalize(rng.normal(size=(args.synthetic, 384)))
+            ids = [str(i) for i in range(args.synthetic)]
+        else:
+            ids, vectors = load_corpus()
+
+        if args.query_file:
+            with open(args.query_file, encoding="utf-8") as f:
+                texts = [line.strip() for line in f if line.strip()]
+            embed = get_rag_service().embedding_function
+            queries = np.asarray(embed(texts), dtype=np.float32)
+        else:
+            picked = rng.choice(
+                len(ids), size=min(args.queries, len(ids)), replace=False
+            )
+            queries = vectors[picked]
+
+    run(
+        ids,
+        vectors,
+        queries,
+        min(args.k, len(ids)),
+        space,
+        args.m,
+        args.ef_construction,
+        args.ef_search,
+    )
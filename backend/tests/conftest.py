@@ -3,6 +3,7 @@ Pytest configuration and fixtures for testing.
 """
 
 import pytest
+import re
 import sys
 from unittest.mock import MagicMock
 
@@ -113,3 +114,116 @@ def sample_message(db_session, sample_agent):
     db_session.add(message)
     db_session.commit()
     return message
+
+
+@pytest.fixture(scope="function")
+def query_counter(app):
+    """Collect SQL statements executed inside a ``with query_counter:`` block."""
+    from sqlalchemy import event
+
+    class QueryCounter(list):
+        def _record(self, conn, cursor, statement, *args):
+            self.append(statement)
+
+        def __enter__(self):
+            self.clear()
+            event.listen(db.engine, "before_cursor_execute", self._record)
+            return self
+
+        def __exit__(self, *exc):
+            event.remove(db.engine, "before_cursor_execute", self._record)
+
+    return QueryCounter()
+
+
+class FakeEmbeddingFunction:
+    """Deterministic bag-of-words embedder standing in for the ONNX model."""
+
+    def __init__(self, dim: int = 64):
+        self.dim = dim
+        self.calls: list[list[str]] = []
+
+    def __call__(self, input):
+        import zlib
+        import numpy as np
+
+        self.calls.append(list(input))
+        vectors = np.zeros((len(input), self.dim), dtype=np.float32)
+        for row, text in enumerate(input):
+            for token in text.lower().split():
+                vectors[row, zlib.crc32(token.encode("utf-8")) % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    @property
+    def embedded_texts(self) -> list[str]:
+        return [text for call in self.calls for text in call]
+
+
+@pytest.fixture(scope="function")
+def embedding_function():
+    """Fake embedding function that records every text it embeds."""
+    return FakeEmbeddingFunction()
+
+
+class WordTokenizer:
+    """Offline stand-in for a tiktoken encoding.
+
+    Each token is one word with its leading whitespace, so decoding any
+    slice reproduces the exact text, as with BPE.
+    """
+
+    def __init__(self):
+        self.vocab: list[str] = []
+        self.ids: dict[str, int] = {}
+
+    def encode(self, text):
+        tokens = []
+        for piece in re.findall(r"\s*\S+|\s+$", text):
+            if piece not in self.ids:
+                self.ids[piece] = len(self.vocab)
+                self.vocab.append(piece)
+            tokens.append(self.ids[piece])
+        return tokens
+
+    def decode(self, tokens):
+        return "".join(self.vocab[t] for t in tokens)
+
+    def decode_single_token_bytes(self, token):
+        return self.vocab[token].encode("utf-8")
+
+
+@pytest.fixture(scope="function")
+def tokenizer():
+    """Offline word-level tokenizer with a tiktoken-style interface."""
+    return WordTokenizer()
+
+
+@pytest.fixture(scope="function")
+def memory_rag_service(tmp_path, embedding_function):
+    """Fresh RAGService backed by the in-memory vector store."""
+    from app.services import RAGService
+
+    service = RAGService(persist_directory=str(tmp_path / "chroma"), backend="memory")
+    service.embedding_function = embedding_function
+    return service
+
+
+@pytest.fixture(scope="function")
+def rag_service(tmp_path, embedding_function):
+    """Fresh RAGService with a fake embedder and a mocked Chroma collection."""
+    from app.services import RAGService
+
+    service = RAGService(persist_directory=str(tmp_path / "chroma"))
+    service.embedding_function = embedding_function
+    service.collection = MagicMock()
+    # Like Chroma, the mock has no write counter
+    service.collection.version.return_value = None
+    service.collection.query.return_value = {
+        "documents": [["Flask is a web framework"]],
+        "metadatas": [[{"topic": "web"}]],
+        "distances": [[0.1]],
+        "ids": [["doc-1"]],
+    }
+    return service
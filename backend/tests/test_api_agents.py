@@ -57,6 +57,62 @@ class TestAgentAPI:
         assert data[0]["content"] == "Test message"
         assert data[0]["sender"] == "user"
 
+    def test_get_agent_messages_keyset_pagination(self, client, db_session, sample_agent):
+        """Test paging backwards and forwards through message history."""
+        from app.models import Message
+        from datetime import datetime, timedelta
+
+        base_time = datetime(2025, 1, 1)
+        for i in range(5):
+            db_session.add(
+                Message(
+                    agent_id=sample_agent.id,
+                    sender="user",
+                    content=f"Message {i}",
+                    timestamp=base_time + timedelta(seconds=i),
+                )
+            )
+        db_session.commit()
+
+        url = f"/api/agents/{sample_agent.id}/messages"
+        response = client.get(f"{url}?limit=2")
+        latest = json.loads(response.data)
+        assert [m["content"] for m in latest] == ["Message 3", "Message 4"]
+        assert "X-Prev-Cursor" not in response.headers
+
+        older = response.headers["X-Next-Cursor"]
+        response = client.get(f"{url}?limit=2&before={older}")
+        assert [m["content"] for m in json.loads(response.data)] == [
+            "Message 1",
+            "Message 2",
+        ]
+
+        newer = response.headers["X-Prev-Cursor"]
+        response = client.get(f"{url}?limit=2&after={newer}")
+        assert json.loads(response.data) == latest
+        assert "X-Prev-Cursor" not in response.headers
+
+    def test_get_agent_messages_sender_filter(self, client, db_session, sample_agent):
+        """Test filtering message history by sender."""
+        from app.models import Message
+
+        db_session.add(Message(agent_id=sample_agent.id, sender="user", content="Hi"))
+        db_session.add(
+            Message(agent_id=sample_agent.id, sender="system", content="Boot")
+        )
+        db_session.commit()
+
+        response = client.get(f"/api/agents/{sample_agent.id}/messages?sender=system")
+        data = json.loads(response.data)
+        assert [m["content"] for m in data] == ["Boot"]
+
+    def test_get_agent_messages_conflicting_cursors(self, client, sample_agent):
+        """Test that before and after cannot be combined."""
+        response = client.get(
+            f"/api/agents/{sample_agent.id}/messages?before=a&after=b"
+        )
+        assert response.status_code == 400
+
     def test_get_agent_status(self, client, sample_agent):
         """Test getting agent status."""
         response = client.get(f"/api/agents/{sample_agent.id}/status")
@@ -84,6 +140,16 @@ class TestAgentAPI:
         )
         assert response.status_code == 404
 
+    def test_send_message_unknown_workflow(self, client, sample_agent):
+        """Test that only existing workflow ids are accepted."""
+        url = f"/api/agents/{sample_agent.id}/message"
+        for workflow_id in (9999, "1", True):
+            response = client.post(
+                url, json={"message": "Hello", "workflow_id": workflow_id}
+            )
+            assert response.status_code == 400
+            assert "workflow_id" in json.loads(response.data)["error"]
+
 
 class TestAgentTaskAPI:
     """Tests for agent task API endpoints."""
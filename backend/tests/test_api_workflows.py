@@ -25,6 +25,68 @@ class TestWorkflowAPI:
         assert len(data) == 1
         assert data[0]["name"] == "Test Workflow"
 
+    def test_get_workflows_keyset_pagination(self, client, db_session):
+        """Test walking workflows page by page with cursors."""
+        from app.models import Workflow
+
+        for i in range(5):
+            db_session.add(Workflow(name=f"Workflow {i}", status="pending"))
+        db_session.commit()
+
+        response = client.get("/api/workflows?limit=2")
+        first = json.loads(response.data)
+        assert [wf["name"] for wf in first] == ["Workflow 0", "Workflow 1"]
+        assert "X-Prev-Cursor" not in response.headers
+
+        cursor = response.headers["X-Next-Cursor"]
+        response = client.get(f"/api/workflows?limit=2&after={cursor}")
+        second = json.loads(response.data)
+        assert [wf["name"] for wf in second] == ["Workflow 2", "Workflow 3"]
+
+        back = response.headers["X-Prev-Cursor"]
+        response = client.get(f"/api/workflows?limit=2&before={back}")
+        assert json.loads(response.data) == first
+
+        cursor = client.get(f"/api/workflows?limit=2&after={cursor}").headers[
+            "X-Next-Cursor"
+        ]
+        response = client.get(f"/api/workflows?limit=2&after={cursor}")
+        assert [wf["name"] for wf in json.loads(response.data)] == ["Workflow 4"]
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_get_workflows_status_filter(self, client, db_session):
+        """Test filtering workflows by status."""
+        from app.models import Workflow
+
+        db_session.add(Workflow(name="Done", status="completed"))
+        db_session.add(Workflow(name="Broken", status="failed"))
+        db_session.add(Workflow(name="Running", status="active"))
+        db_session.commit()
+
+        response = client.get("/api/workflows?status=completed,failed")
+        data = json.loads(response.data)
+        assert sorted(wf["name"] for wf in data) == ["Broken", "Done"]
+
+    def test_get_workflows_page_size_capped(self, client, app, sample_workflow):
+        """Test that oversized limits are clamped to the configured cap."""
+        from app.models import Workflow
+        from app import db
+
+        app.config["API_MAX_PAGE_SIZE"] = 2
+        for i in range(3):
+            db.session.add(Workflow(name=f"Extra {i}"))
+        db.session.commit()
+
+        response = client.get("/api/workflows?limit=1000")
+        assert len(json.loads(response.data)) == 2
+        assert "X-Next-Cursor" in response.headers
+
+    def test_get_workflows_invalid_cursor(self, client):
+        """Test that a malformed cursor is rejected."""
+        response = client.get("/api/workflows?after=not-a-cursor")
+        assert response.status_code == 400
+        assert "error" in json.loads(response.data)
+
     def test_get_workflow_by_id(self, client, sample_workflow):
         """Test getting a specific workflow by ID."""
         response = client.get(f"/api/workflows/{sample_workflow.id}")
@@ -71,6 +133,42 @@ class TestWorkflowAPI:
         assert "tasks" in data
         assert len(data["tasks"]) == 1
 
+    def test_get_workflow_status_query_count(
+        self, client, db_session, sample_agent, query_counter
+    ):
+        """Test that status reads use a fixed number of queries."""
+        from app.models import Task, Workflow
+
+        counts = []
+        for task_count in (1, 10):
+            workflow = Workflow(name=f"{task_count} tasks", status="active")
+            db_session.add(workflow)
+            db_session.flush()
+            for i in range(task_count):
+                db_session.add(
+                    Task(
+                        workflow_id=workflow.id,
+                        assigned_to=sample_agent.id,
+                        description=f"Task {i}",
+                    )
+                )
+            db_session.commit()
+            url = f"/api/workflows/{workflow.id}/status"
+            db_session.expire_all()
+
+            with query_counter:
+                response = client.get(url)
+            counts.append(len(query_counter))
+
+            data = json.loads(response.data)
+            assert len(data["tasks"]) == task_count
+            assert all(
+                t["assigned_agent_name"] == "Test Agent" for t in data["tasks"]
+            )
+            assert all(t["created_at"] for t in data["tasks"])
+
+        assert counts[0] == counts[1] == 2
+
     def test_execute_workflow_missing_task(self, client):
         """Test executing workflow without task description."""
         response = client.post("/api/workflows/execute", json={})
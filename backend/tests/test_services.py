@@ -36,6 +36,31 @@ class TestWorkflowOrchestrator:
             assert "tasks" in status
             assert len(status["tasks"]) >= 1
 
+    def test_get_workflow_status_eager_loads_tasks(
+        self, app, db_session, sample_workflow, sample_agent, query_counter
+    ):
+        """Test that status reads do not lazy-load tasks or agents."""
+        for i in range(5):
+            db_session.add(
+                Task(
+                    workflow_id=sample_workflow.id,
+                    assigned_to=sample_agent.id,
+                    description=f"Task {i}",
+                )
+            )
+        db_session.commit()
+        workflow_id = sample_workflow.id
+        db_session.expire_all()
+
+        orchestrator = get_workflow_orchestrator()
+        with query_counter:
+            status = orchestrator.get_workflow_status(workflow_id)
+
+        assert len(query_counter) == 2
+        assert [t["assigned_agent_name"] for t in status["tasks"]] == [
+            "Test Agent"
+        ] * 5
+
     def test_get_workflow_status_not_found(self, app, db_session):
         """Test getting status of non-existent workflow."""
         with app.app_context():
@@ -64,6 +89,98 @@ class TestWorkflowOrchestrator:
             assert workflow.completed_at is not None
             assert workflow.meta.get("error") == "Test error"
 
+    def _core_agents(self, db_session):
+        for agent_type in ("driver", "creator", "generator"):
+            db_session.add(
+                Agent(name=agent_type.title(), type=agent_type, role=agent_type)
+            )
+        db_session.commit()
+
+    def test_execute_complete_workflow_batches_commits(
+        self, app, db_session, monkeypatch
+    ):
+        """Test that no transaction spans an LLM call and results are batched."""
+        import sys
+        from unittest.mock import AsyncMock, MagicMock, patch
+        from app.agents import agent_manager
+        from app.agents.base_agent import BaseVirtualAgent
+        from app.models import Message
+
+        during_calls = []
+
+        class ObservedAssistant(FakeAssistant):
+            async def on_messages(self, messages, cancellation_token):
+                open_transaction = db_session().in_transaction()
+                task = Task.query.order_by(Task.id.desc()).first()
+                during_calls.append(
+                    (
+                        open_transaction,
+                        task.status,
+                        db_session.get(Agent, task.assigned_to).status,
+                    )
+                )
+                db_session.commit()
+                return await super().on_messages(messages, cancellation_token)
+
+        monkeypatch.setitem(sys.modules, "autogen_agentchat.messages", MagicMock())
+        self._core_agents(db_session)
+        agents = {}
+        with patch("app.agents.base_agent.AssistantAgent", ObservedAssistant):
+            for record in Agent.query.all():
+                agent = BaseVirtualAgent(
+                    name=record.name,
+                    role=record.role,
+                    agent_type=record.type,
+                    system_message="",
+                    description="",
+                    model_client=MagicMock(),
+                    db_session=db_session,
+                )
+                agent.set_db_id(record.id)
+                agents[record.id] = agent
+
+        orchestrator = get_workflow_orchestrator()
+        with (
+            patch.object(orchestrator.agent_service, "ensure_initialized"),
+            patch.object(
+                agent_manager, "load_agent", AsyncMock(side_effect=agents.get)
+            ),
+        ):
+            result = orchestrator.execute_complete_workflow("Build a landing page")
+
+        assert during_calls == [(False, "in_progress", "busy")] * 3
+        assert result["status"] == "completed"
+        # One commit before each agent call, plus completion; the commits
+        # made while observing the calls above add three more
+        assert result["commits"] == 7
+        assert orchestrator.get_metrics()["commits_last"] == 7
+
+        workflow = Workflow.query.get(result["workflow_id"])
+        assert workflow.status == "completed"
+        assert [t.status for t in workflow.tasks] == ["completed"] * 3
+        # Orchestrator rows plus each agent's own incoming/outgoing log
+        assert Message.query.count() == 12
+        assert {a.status for a in Agent.query.all()} == {"idle"}
+
+    def test_execute_complete_workflow_failure(self, app, db_session):
+        """Test that a failing step fails the task and the workflow."""
+        from unittest.mock import AsyncMock, patch
+
+        self._core_agents(db_session)
+        orchestrator = get_workflow_orchestrator()
+
+        with patch.object(
+            orchestrator.agent_service,
+            "send_message_to_agent",
+            AsyncMock(return_value={"success": False, "error": "LLM unavailable"}),
+        ):
+            with pytest.raises(RuntimeError, match="LLM unavailable"):
+                orchestrator.execute_complete_workflow("Build a landing page")
+
+        workflow = Workflow.query.one()
+        assert workflow.status == "failed"
+        assert [t.status for t in workflow.tasks] == ["failed"]
+
 
 class TestRAGService:
     """Tests for RAG service."""
@@ -210,6 +327,1728 @@ class TestRAGService:
             assert call_args.kwargs["documents"] == ["Updated document"]
 
 
+class TestEmbeddingWarmUp:
+    """Tests for background embedding model warm-up."""
+
+    def test_background_warm_up_runs_dummy_batch(self, rag_service):
+        """Test that warm-up embeds once, off-thread, and reports ready."""
+        from app.services.rag_service import WARMUP_TEXTS
+
+        assert rag_service.start_warm_up()
+        rag_service._warmup_thread.join(timeout=5)
+
+        assert rag_service.embedding_function.calls == [list(WARMUP_TEXTS)]
+        status = rag_service.get_warmup_status()
+        assert status["state"] == "ready"
+        assert status["seconds"] is not None
+        assert not rag_service.start_warm_up()
+
+    def test_failed_warm_up_is_reported(self, rag_service):
+        """Test that a model load error leaves the service not ready."""
+        from unittest.mock import MagicMock
+
+        rag_service.embedding_function = MagicMock(side_effect=OSError("no model"))
+
+        assert not rag_service.warm_up()
+        assert rag_service.get_warmup_status()["state"] == "failed"
+        assert rag_service.get_warmup_status()["error"] == "no model"
+
+    def test_status_endpoint_reports_readiness(self, client):
+        """Test that the readiness probe is 503 until the system is ready."""
+        from unittest.mock import patch
+
+        from app.services import get_agent_service
+
+        response = client.get("/api/status?readiness=1")
+        assert response.status_code == 503
+        assert response.get_json()["ready"] is False
+
+        with patch.object(get_agent_service(), "initialized", True):
+            response = client.get("/api/status?readiness=1")
+        assert response.status_code == 200
+        assert response.get_json()["embeddings"]["state"] in ("cold", "ready")
+
+
+class TestQueryResultCache:
+    """Tests for the versioned search result cache."""
+
+    def test_repeated_search_hits_cache(self, rag_service):
+        """Test that identical searches run the collection query once."""
+        first = rag_service.search("web framework", k=3)
+        first[0]["document"] = "mutated by caller"
+        second = rag_service.search("web framework", k=3)
+
+        assert second[0]["document"] == "Flask is a web framework"
+        assert rag_service.collection.query.call_count == 1
+        metrics = rag_service.get_metrics()["query_cache"]
+        assert metrics["hits"] == 1
+        assert metrics["hit_ratio"] == 0.5
+
+    def test_cache_key_includes_k_and_filter(self, rag_service):
+        """Test that k and metadata filters are part of the cache key."""
+        rag_service.search("web", k=3)
+        rag_service.search("web", k=4)
+        rag_service.search("web", k=3, filter_metadata={"topic": "web"})
+        rag_service.search("web", k=3, filter_metadata={"topic": "web"})
+
+        assert rag_service.collection.query.call_count == 3
+
+    @pytest.mark.parametrize(
+        "write",
+        [
+            lambda s: s.add_documents(["New doc"], ids=["new"]),
+            lambda s: s.update_document("doc-1", document="Changed"),
+            lambda s: s.delete_documents(["doc-1"]),
+            lambda s: s.clear(),
+        ],
+    )
+    def test_writes_invalidate_cache(self, rag_service, write):
+        """Test that every write bumps the version and drops cached results."""
+        rag_service.search("web")
+        version = rag_service.version
+        write(rag_service)
+        rag_service.search("web")
+
+        assert rag_service.version == version + 1
+        assert rag_service.get_metrics()["query_cache"]["hits"] == 0
+
+    def test_lru_eviction(self, rag_service):
+        """Test that the least recently used entry is evicted first."""
+        rag_service.query_cache_size = 2
+        rag_service.search("a")
+        rag_service.search("b")
+        rag_service.search("a")
+        rag_service.search("c")  # evicts "b"
+        rag_service.search("a")
+        rag_service.search("b")
+
+        assert rag_service.collection.query.call_count == 4
+
+
+class TestSearchMany:
+    """Tests for batched multi-query search."""
+
+    def test_search_many_single_round_trip(self, rag_service, embedding_function):
+        """Test that all queries share one embedding batch and one query."""
+        rag_service.collection.query.return_value = {
+            "documents": [["Doc A"], ["Doc B"]],
+            "metadatas": [[{"n": 1}], [{"n": 2}]],
+            "distances": [[0.1], [0.2]],
+            "ids": [["a"], ["b"]],
+        }
+
+        results = rag_service.search_many(["first", "second", "first"], k=1)
+
+        assert [r[0]["id"] for r in results] == ["a", "b", "a"]
+        assert results[1][0] == {
+            "document": "Doc B",
+            "metadata": {"n": 2},
+            "distance": 0.2,
+            "id": "b",
+        }
+        assert rag_service.collection.query.call_count == 1
+        assert embedding_function.calls == [["first", "second"]]
+
+    def test_search_many_reuses_cached_queries(self, rag_service, embedding_function):
+        """Test that only uncached queries reach the collection."""
+        rag_service.search("first", k=1)
+        rag_service.search_many(["first", "second"], k=1)
+
+        last_call = rag_service.collection.query.call_args
+        assert last_call.kwargs["query_embeddings"].shape[0] == 1
+        assert embedding_function.calls[-1] == ["second"]
+
+
+class TestAsyncSearch:
+    """Tests for the async RAG interface."""
+
+    def test_asearch_runs_on_dedicated_executor(self, rag_service):
+        """Test that async searches run on the retrieval executor threads."""
+        import asyncio
+        import threading
+
+        threads = []
+        original = rag_service.search_many
+
+        def recording_search_many(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return original(*args, **kwargs)
+
+        rag_service.search_many = recording_search_many
+
+        async def burst():
+            return await asyncio.gather(
+                *(rag_service.asearch(f"query {i}") for i in range(5))
+            )
+
+        results = asyncio.run(burst())
+        rag_service.shutdown()
+
+        assert all(r[0]["id"] == "doc-1" for r in results)
+        assert all(name.startswith("rag-search") for name in threads)
+        metrics = rag_service.get_metrics()["executor"]
+        assert metrics["completed"] == 5
+        assert metrics["queued"] == 0
+        assert 1 <= metrics["max_queued"] <= 5
+
+    def test_asearch_cached_skips_executor(self, rag_service):
+        """Test that fully cached lookups return without a thread hop."""
+        import asyncio
+
+        rag_service.search_many(["a", "b"])
+        results = asyncio.run(rag_service.asearch_many(["a", "b"]))
+
+        assert len(results) == 2
+        assert rag_service.get_metrics()["executor"]["completed"] == 0
+        assert rag_service.get_metrics()["query_cache"]["hits"] == 2
+
+
+class TestEmbeddingCache:
+    """Tests for the persistent embedding cache."""
+
+    def test_cache_round_trip_and_reopen(self, tmp_path, embedding_function):
+        """Test that cached vectors survive reopening the cache."""
+        import numpy as np
+        from app.services.embedding_cache import EmbeddingCache
+
+        cache = EmbeddingCache(tmp_path, model="fake")
+        texts = ["alpha beta", "gamma", "alpha beta"]
+        first = cache.get_or_compute(texts, embedding_function)
+
+        assert first.shape == (3, embedding_function.dim)
+        assert embedding_function.embedded_texts == ["alpha beta", "gamma"]
+        assert len(cache) == 2
+
+        reopened = EmbeddingCache(tmp_path, model="fake")
+        second = reopened.get_or_compute(texts, embedding_function)
+        np.testing.assert_array_equal(first, second)
+        assert len(embedding_function.calls) == 1
+        assert reopened.get_metrics()["hits"] == 3
+
+    def test_cache_rejects_other_model(self, tmp_path, embedding_function):
+        """Test that a cache directory is bound to one model."""
+        from app.services.embedding_cache import EmbeddingCache
+
+        EmbeddingCache(tmp_path, model="fake").get_or_compute(
+            ["text"], embedding_function
+        )
+        with pytest.raises(ValueError, match="belongs to model"):
+            EmbeddingCache(tmp_path, model="other")
+
+    def test_concurrent_writers_keep_rows_aligned(self, tmp_path, embedding_function):
+        """Test that two caches appending to one directory stay consistent."""
+        import numpy as np
+        from app.services.embedding_cache import VECTORS_FILE, EmbeddingCache
+
+        first = EmbeddingCache(tmp_path, model="fake")
+        second = EmbeddingCache(tmp_path, model="fake")
+        first.get_or_compute(["alpha"], embedding_function)
+        second.get_or_compute(["beta", "gamma"], embedding_function)
+        first.get_or_compute(["delta"], embedding_function)
+
+        # A torn append from a crashed writer leaves half a row behind
+        with open(tmp_path / VECTORS_FILE, "ab") as f:
+            f.write(b"\0" * 10)
+        third = EmbeddingCache(tmp_path, model="fake")
+        third.get_or_compute(["epsilon"], embedding_function)
+
+        texts = ["alpha", "beta", "gamma", "delta", "epsilon"]
+        expected = embedding_function(texts)
+        for cache in (first, second, EmbeddingCache(tmp_path, model="fake")):
+            found, missing = cache.get_many(texts)
+            assert missing == []
+            np.testing.assert_array_equal(np.stack(found), expected)
+
+    def test_rag_service_skips_model_for_cached_text(
+        self, tmp_path, embedding_function
+    ):
+        """Test that re-ingestion and repeated queries reuse cached vectors."""
+        from unittest.mock import MagicMock
+        from app.services import RAGService
+
+        service = RAGService(
+            persist_directory=str(tmp_path / "chroma"),
+            embedding_cache_dir=str(tmp_path / "cache"),
+        )
+        service.embedding_function = embedding_function
+        service.collection = MagicMock()
+        service.collection.query.return_value = {
+            "documents": [[]],
+            "metadatas": [[]],
+            "distances": [[]],
+            "ids": [[]],
+        }
+
+        docs = ["Flask is a web framework", "React builds user interfaces"]
+        service.add_documents(docs, ids=["a", "b"])
+        service.add_documents(docs, ids=["a", "b"])
+        service.search("web framework")
+        service.search("web framework")
+
+        assert embedding_function.embedded_texts == docs + ["web framework"]
+        call = service.collection.query.call_args
+        assert call.kwargs["query_embeddings"].shape == (1, embedding_function.dim)
+        # Queries are not written to the persistent cache
+        assert len(service.embedding_cache) == 2
+
+    def test_query_embeddings_are_bounded_in_memory(
+        self, memory_rag_service, embedding_function
+    ):
+        """Test that query embeddings live in a capped LRU."""
+        service = memory_rag_service
+        service.query_cache_size = 0
+        service.query_embedding_cache_size = 2
+
+        for query in ["alpha", "beta", "alpha", "gamma", "beta"]:
+            service.search(query)
+
+        assert embedding_function.embedded_texts == [
+            "alpha",
+            "beta",
+            "gamma",
+            "beta",
+        ]
+        assert list(service._query_embeddings) == ["gamma", "beta"]
+        metrics = service.get_metrics()["query_embeddings"]
+        assert metrics == {"entries": 2, "hits": 1, "misses": 4}
+
+
+class TestIngestionPipeline:
+    """Tests for streaming bulk ingestion."""
+
+    @staticmethod
+    def _write_corpus(root):
+        import json
+
+        (root / "notes").mkdir()
+        (root / "notes" / "flask.md").write_text("Flask is a web framework")
+        with open(root / "docs.jsonl", "w") as f:
+            for i in range(5):
+                row = {"text": f"document {i}", "metadata": {"n": i}}
+                f.write(json.dumps(row) + "\n")
+
+    def test_streams_in_bounded_batches(self, tmp_path, rag_service):
+        """Test that documents are inserted in batches with stable ids."""
+        from app.services import IngestionPipeline
+
+        self._write_corpus(tmp_path)
+        pipeline = IngestionPipeline(rag_service, batch_size=2)
+        stats = pipeline.run(tmp_path)
+
+        assert stats.documents == 6
+        assert stats.batches == 3
+        calls = rag_service.collection.add.call_args_list
+        assert [len(c.kwargs["ids"]) for c in calls] == [2, 2, 2]
+        metadata = calls[0].kwargs["metadatas"][0]
+        assert metadata["n"] == 0 and metadata["source"] == "docs.jsonl"
+        assert calls[-1].kwargs["ids"][-1] == "notes/flask.md"
+
+    def test_resumes_from_checkpoint(self, tmp_path, rag_service):
+        """Test that an interrupted run continues where it stopped."""
+        from app.services import IngestionPipeline
+
+        corpus = tmp_path / "corpus"
+        corpus.mkdir()
+        self._write_corpus(corpus)
+        checkpoint = tmp_path / "checkpoint.json"
+
+        original_add = rag_service.add_documents
+        calls = []
+
+        def failing_add(**kwargs):
+            if len(calls) == 2:
+                raise RuntimeError("interrupted")
+            calls.append(kwargs["ids"])
+            return original_add(**kwargs)
+
+        rag_service.add_documents = failing_add
+        pipeline = IngestionPipeline(
+            rag_service, batch_size=2, checkpoint_path=checkpoint
+        )
+        with pytest.raises(RuntimeError):
+            pipeline.run(corpus)
+
+        rag_service.add_documents = original_add
+        stats = pipeline.run(corpus)
+
+        assert stats.resumed_from["documents"] == 4
+        assert stats.documents == 2
+        ids = [i for batch in calls for i in batch]
+        ids += rag_service.collection.add.call_args.kwargs["ids"]
+        assert len(ids) == len(set(ids)) == 6
+
+    def test_finished_run_starts_over(self, tmp_path, rag_service):
+        """Test that a completed run leaves no checkpoint behind."""
+        from app.services import IngestionPipeline
+
+        corpus = tmp_path / "corpus"
+        corpus.mkdir()
+        self._write_corpus(corpus)
+        pipeline = IngestionPipeline(
+            rag_service, batch_size=2, checkpoint_path=tmp_path / "checkpoint.json"
+        )
+        pipeline.run(corpus)
+
+        (corpus / "notes" / "flask.md").write_text("Flask is a micro framework")
+        stats = pipeline.run(corpus)
+
+        assert stats.resumed_from is None
+        assert stats.documents == 6
+        last_add = rag_service.collection.add.call_args.kwargs
+        assert last_add["documents"][-1] == "Flask is a micro framework"
+
+    def test_resume_order_with_mixed_separators(self, tmp_path, rag_service):
+        """Test that resume skips files in the same order they are listed."""
+        from app.services import IngestionPipeline
+
+        corpus = tmp_path / "corpus"
+        (corpus / "a").mkdir(parents=True)
+        for name in ("a/b.txt", "a/d.txt", "a-c.txt"):
+            (corpus / name).write_text(f"text of {name}")
+        checkpoint = tmp_path / "checkpoint.json"
+
+        original_add = rag_service.add_documents
+        calls = []
+
+        def failing_add(**kwargs):
+            if len(calls) == 2:
+                raise RuntimeError("interrupted")
+            calls.append(kwargs["ids"])
+            return original_add(**kwargs)
+
+        rag_service.add_documents = failing_add
+        pipeline = IngestionPipeline(
+            rag_service, batch_size=1, checkpoint_path=checkpoint
+        )
+        with pytest.raises(RuntimeError):
+            pipeline.run(corpus)
+
+        rag_service.add_documents = original_add
+        pipeline.run(corpus)
+
+        assert calls == [["a/b.txt"], ["a/d.txt"]]
+        assert rag_service.collection.add.call_args.kwargs["ids"] == ["a-c.txt"]
+
+
+class TestTokenChunker:
+    """Tests for token-aware chunking and chunk reassembly."""
+
+    TEXT = " ".join(f"word{i}" for i in range(25))
+
+    def test_split_overlaps_and_reassembles(self, tokenizer):
+        """Test that overlapping chunks merge back into the original text."""
+        from app.services import TokenChunker
+        from app.services.chunking import merge_chunks
+
+        chunker = TokenChunker(chunk_tokens=10, overlap=3, tokenizer=tokenizer)
+        chunks = chunker.split(self.TEXT)
+
+        assert [c.tokens for c in chunks] == [10, 10, 10, 4]
+        assert chunks[1].text.split()[:3] == chunks[0].text.split()[-3:]
+        assert all(self.TEXT[c.start :].startswith(c.text) for c in chunks)
+        assert merge_chunks([(c.start, c.text) for c in chunks]) == self.TEXT
+
+    def test_offsets_follow_multibyte_characters(self):
+        """Test offsets when tokens split UTF-8 characters, as BPE does."""
+        from app.services import TokenChunker
+        from app.services.chunking import merge_chunks
+
+        class ByteTokenizer:
+            def encode(self, text):
+                return list(text.encode("utf-8"))
+
+            def decode(self, tokens):
+                return bytes(tokens).decode("utf-8", errors="replace")
+
+            def decode_single_token_bytes(self, token):
+                return bytes([token])
+
+        text = "naïve café — 日本語のテキスト, emoji 🙂 and more ünïcödé text " * 3
+        chunker = TokenChunker(chunk_tokens=16, overlap=5, tokenizer=ByteTokenizer())
+        chunks = chunker.split(text)
+
+        assert len(chunks) > 1
+        assert all(text[c.start : c.start + len(c.text)] == c.text for c in chunks)
+        assert all("\ufffd" not in c.text for c in chunks)
+        assert merge_chunks([(c.start, c.text) for c in chunks]) == text
+
+    def test_short_document_is_one_chunk(self, tokenizer):
+        """Test that documents within the budget are not split."""
+        from app.services import TokenChunker
+
+        chunker = TokenChunker(chunk_tokens=10, overlap=3, tokenizer=tokenizer)
+        texts, metadatas, ids = chunker.chunk_documents(
+            ["short text"], [{"topic": "x"}], ["doc"]
+        )
+
+        assert texts == ["short text"]
+        assert ids == ["doc#0"]
+        assert metadatas[0] == {
+            "topic": "x",
+            "parent_id": "doc",
+            "chunk_index": 0,
+            "chunk_count": 1,
+            "chunk_start": 0,
+        }
+
+    def test_pipeline_chunks_before_embedding(self, tmp_path, rag_service, tokenizer):
+        """Test that ingestion stores chunks carrying parent metadata."""
+        from app.services import IngestionPipeline, TokenChunker
+
+        (tmp_path / "long.txt").write_text(self.TEXT)
+        chunker = TokenChunker(chunk_tokens=10, overlap=3, tokenizer=tokenizer)
+        stats = IngestionPipeline(rag_service, chunker=chunker).run(tmp_path)
+
+        assert stats.documents == 1
+        assert stats.chunks == 4
+        call = rag_service.collection.add.call_args.kwargs
+        assert call["ids"] == [f"long.txt#{i}" for i in range(4)]
+        assert {m["source"] for m in call["metadatas"]} == {"long.txt"}
+
+    def test_expand_chunks_merges_neighbours(self, rag_service, tokenizer):
+        """Test that a chunk hit is widened with its neighbours in one get."""
+        from app.services import TokenChunker
+
+        chunker = TokenChunker(chunk_tokens=10, overlap=3, tokenizer=tokenizer)
+        texts, metadatas, ids = chunker.chunk_documents([self.TEXT], [{}], ["doc"])
+        stored = dict(zip(ids, zip(texts, metadatas)))
+
+        def get(ids, include):
+            return {
+                "ids": ids,
+                "documents": [stored[i][0] for i in ids],
+                "metadatas": [stored[i][1] for i in ids],
+            }
+
+        rag_service.collection.get.side_effect = get
+        hits = [
+            {"document": texts[i], "metadata": metadatas[i], "id": ids[i]}
+            for i in (1, 2)
+        ]
+        hits.append({"document": "plain", "metadata": {}, "id": "other"})
+
+        expanded = rag_service.expand_chunks(hits, window=1)
+
+        assert rag_service.collection.get.call_count == 1
+        assert len(expanded) == 2
+        assert expanded[0]["chunk_range"] == [0, 2]
+        assert expanded[0]["document"] == " ".join(f"word{i}" for i in range(24))
+        assert expanded[1]["document"] == "plain"
+
+
+class TestIdempotentIngestion:
+    """Tests for content-hash ids and upsert semantics."""
+
+    def test_readding_unchanged_documents_skips_embedding(
+        self, memory_rag_service, embedding_function
+    ):
+        """Test that re-ingestion neither duplicates nor re-embeds."""
+        docs = ["Flask is a web framework", "React builds user interfaces"]
+
+        first = memory_rag_service.add_documents(docs)
+        version = memory_rag_service.version
+        second = memory_rag_service.add_documents(docs)
+
+        assert first == {"added": 2, "updated": 0, "skipped": 0}
+        assert second == {"added": 0, "updated": 0, "skipped": 2}
+        assert memory_rag_service.count_documents() == 2
+        assert embedding_function.embedded_texts == docs
+        assert memory_rag_service.version == version
+
+    def test_changed_documents_are_upserted(
+        self, memory_rag_service, embedding_function
+    ):
+        """Test that only changed text is re-embedded; metadata is patched."""
+        service = memory_rag_service
+        service.add_documents(["one", "two"], [{"v": 1}, {"v": 1}], ids=["a", "b"])
+
+        counts = service.add_documents(
+            ["one", "two (edited)"], [{"v": 2}, {"v": 1}], ids=["a", "b"]
+        )
+
+        assert counts == {"added": 0, "updated": 2, "skipped": 0}
+        assert embedding_function.calls[-1] == ["two (edited)"]
+        stored = service.collection.get(ids=["a", "b"])
+        assert stored["metadatas"][0]["v"] == 2
+        assert stored["documents"][1] == "two (edited)"
+
+    def test_shrunk_chunked_document_drops_stale_chunks(
+        self, memory_rag_service, tokenizer
+    ):
+        """Test that trailing chunks of a shortened document are deleted."""
+        from app.services import TokenChunker
+
+        chunker = TokenChunker(chunk_tokens=4, overlap=1, tokenizer=tokenizer)
+        long_text = " ".join(f"w{i}" for i in range(12))
+        memory_rag_service.add_documents(
+            *chunker.chunk_documents([long_text], [{}], ["doc"])
+        )
+        assert memory_rag_service.count_documents() == 4
+
+        memory_rag_service.add_documents(
+            *chunker.chunk_documents(["w0 w1 w2"], [{}], ["doc"])
+        )
+
+        assert memory_rag_service.collection.get()["ids"] == ["doc#0"]
+
+    def test_update_document_refreshes_content_hash(self, memory_rag_service):
+        """Test that an edited document is not mistaken for unchanged."""
+        service = memory_rag_service
+        service.add_documents(["original"], [{"topic": "x"}], ids=["a"])
+        service.update_document("a", document="edited")
+
+        counts = service.add_documents(["original"], [{"topic": "x"}], ids=["a"])
+
+        assert counts["updated"] == 1
+        assert service.collection.get(ids=["a"])["documents"] == ["original"]
+
+    def test_sample_data_seeding_is_idempotent(self, memory_rag_service):
+        """Test that seeding twice (e.g. concurrent initialize) adds nothing."""
+        memory_rag_service.initialize_sample_data()
+        count = memory_rag_service.count_documents()
+        memory_rag_service.initialize_sample_data()
+
+        assert memory_rag_service.count_documents() == count == 10
+
+
+class TestMetadataPrefilter:
+    """Tests for the metadata index and filtered-search planner."""
+
+    def test_index_bounds_where_filters(self):
+        """Test candidate sets for equality, $in, $and, $or and other ops."""
+        from app.services.metadata_index import MetadataIndex
+
+        index = MetadataIndex()
+        index.add(
+            ["a", "b", "c", "d"],
+            [
+                {"topic": "web", "n": 1},
+                {"topic": "web", "n": True},
+                {"topic": "db", "n": 2},
+                {"topic": "ai"},
+            ],
+        )
+
+        assert index.candidates({"topic": "web"}) == {"a", "b"}
+        assert index.candidates({"n": 1}) == {"a"}
+        assert index.candidates({"topic": {"$in": ["db", "ai"]}}) == {"c", "d"}
+        assert index.candidates(
+            {"$and": [{"topic": "web"}, {"n": {"$gt": 0}}]}
+        ) == {"a", "b"}
+        assert index.candidates({"$or": [{"topic": "db"}, {"n": {"$gt": 0}}]}) is None
+        assert index.candidates({"n": {"$gte": 1}}) is None
+
+        index.update(["a", "zzz"], [{"topic": "db"}, {"topic": "web"}])
+        index.delete(["c"])
+        assert index.candidates({"topic": "web"}) == {"b"}
+        assert index.candidates({"topic": "db"}) == {"a"}
+
+    def test_planner_scores_selective_filters_exactly(self, memory_rag_service):
+        """Test exact scoring for narrow filters and ANN for broad ones."""
+        service = memory_rag_service
+        service.prefilter_max_candidates = 3
+        topics = ["rare"] * 2 + ["common"] * 8
+        service.add_documents(
+            [f"document {i} about {topic}" for i, topic in enumerate(topics)],
+            [{"topic": topic} for topic in topics],
+            ids=[str(i) for i in range(10)],
+        )
+        # Rebuilt lazily from the store on the first filtered search
+        service.metadata_index.clear()
+
+        rare = service.search("about rare", k=5, filter_metadata={"topic": "rare"})
+        common = service.search("about common", k=3, filter_metadata={"topic": "common"})
+
+        assert sorted(r["id"] for r in rare) == ["0", "1"]
+        expected = service.collection.query(
+            query_embeddings=service._embed(["about rare"]),
+            n_results=5,
+            where={"topic": "rare"},
+        )
+        assert [r["id"] for r in rare] == expected["ids"][0]
+        assert [r["distance"] for r in rare] == pytest.approx(
+            expected["distances"][0]
+        )
+        assert len(common) == 3
+
+        metrics = service.get_metrics()["prefilter"]
+        assert metrics["exact"] == 1
+        assert metrics["ann"] == 1
+        assert metrics["candidates_scored"] == 2
+        assert metrics["indexed_documents"] == 10
+
+    def test_planner_resyncs_after_writes_elsewhere(self, tmp_path, embedding_function):
+        """Test that a store written by another instance is re-indexed."""
+        from app.services import RAGService
+        from app.services.vector_store import InMemoryVectorStore
+
+        store = InMemoryVectorStore()
+        server, script = (
+            RAGService(persist_directory=str(tmp_path / name), vector_store=store)
+            for name in ("server", "script")
+        )
+        for service in (server, script):
+            service.embedding_function = embedding_function
+
+        script.add_documents(["rare one"], [{"topic": "rare"}], ids=["1"])
+        first = server.search("rare one", filter_metadata={"topic": "rare"})
+        assert [r["id"] for r in first] == ["1"]
+
+        script.add_documents(["rare two"], [{"topic": "rare"}], ids=["2"])
+        rare = server.search("rare two", filter_metadata={"topic": "rare"})
+
+        assert sorted(r["id"] for r in rare) == ["1", "2"]
+        assert server.get_metrics()["prefilter"]["exact"] == 2
+
+    def test_planner_sees_same_size_writes_elsewhere(
+        self, tmp_path, embedding_function
+    ):
+        """Test that relabels and delete-plus-add elsewhere are re-indexed."""
+        from app.services import RAGService
+        from app.services.quantized_store import QuantizedCollection
+
+        server, script = (
+            RAGService(
+                persist_directory=str(tmp_path / name),
+                vector_store=QuantizedCollection(tmp_path / "store"),
+            )
+            for name in ("server", "script")
+        )
+        for service in (server, script):
+            service.embedding_function = embedding_function
+
+        script.add_documents(
+            ["rare one", "common two"],
+            [{"topic": "rare"}, {"topic": "common"}],
+            ids=["1", "2"],
+        )
+        first = server.search("one", filter_metadata={"topic": "rare"})
+        assert [r["id"] for r in first] == ["1"]
+
+        script.update_document("1", metadata={"topic": "common"})
+        assert server.search("rare one", filter_metadata={"topic": "rare"}) == []
+
+        script.delete_documents(["2"])
+        script.add_documents(["rare three"], [{"topic": "rare"}], ids=["3"])
+        rare = server.search("three", filter_metadata={"topic": "rare"})
+
+        assert [r["id"] for r in rare] == ["3"]
+        assert server.get_metrics()["prefilter"]["exact"] == 3
+
+    def test_planner_uses_ann_without_store_version(self, memory_rag_service):
+        """Test that a store that cannot report writes is never planned."""
+        from unittest.mock import patch
+
+        service = memory_rag_service
+        service.add_documents(["one", "two"], [{"t": "x"}, {"t": "y"}], ids=["a", "b"])
+
+        with patch.object(service.collection, "version", return_value=None):
+            hits = service.search("one", filter_metadata={"t": "x"})
+
+        assert [r["id"] for r in hits] == ["a"]
+        assert service.get_metrics()["prefilter"]["exact"] == 0
+
+    def test_planner_uses_ann_while_index_rebuilds(self, memory_rag_service):
+        """Test that a query does not wait for another thread's rebuild."""
+        service = memory_rag_service
+        service.add_documents(["one", "two"], [{"t": "x"}, {"t": "y"}], ids=["a", "b"])
+        service.metadata_index.clear()
+
+        with service._metadata_sync_lock:
+            hits = service.search("one", filter_metadata={"t": "x"})
+
+        assert [r["id"] for r in hits] == ["a"]
+        assert service.get_metrics()["prefilter"]["ann"] == 1
+        assert service.get_metrics()["prefilter"]["exact"] == 0
+
+    def test_writes_keep_metadata_index_in_sync(self, memory_rag_service):
+        """Test that relabels, updates and deletes reach the metadata index."""
+        service = memory_rag_service
+        service.add_documents(["one", "two"], [{"t": "x"}, {"t": "x"}], ids=["a", "b"])
+        service.add_documents(["one"], [{"t": "y"}], ids=["a"])
+        service.update_document("b", metadata={"t": "z"})
+
+        assert service.metadata_index.candidates({"t": "y"}) == {"a"}
+        assert service.metadata_index.candidates({"t": "z"}) == {"b"}
+
+        service.delete_documents(["a"])
+        assert service.search("one", filter_metadata={"t": "y"}) == []
+
+
+class TestHybridSearch:
+    """Tests for the BM25 index and hybrid retrieval."""
+
+    def test_bm25_ranks_exact_identifiers(self):
+        """Test that rare identifiers dominate and compounds split."""
+        from app.services.bm25_index import BM25Index
+
+        index = BM25Index()
+        index.add(
+            ["a", "b", "c"],
+            [
+                "Use flask-sqlalchemy for the database layer",
+                "Use the database layer for everything",
+                "Run blocking work with asyncio.to_thread",
+            ],
+        )
+
+        assert index.search("flask-sqlalchemy", k=1)[0][0] == "a"
+        assert index.search("to_thread", k=1)[0][0] == "c"
+        assert index.search("nothing matches", k=3) == []
+
+    def test_bm25_persists_through_journal_and_snapshot(self, tmp_path):
+        """Test that adds and deletes survive reopening and compaction."""
+        from app.services.bm25_index import BM25Index, JOURNAL_FILE
+
+        index = BM25Index(tmp_path)
+        index.add(["a", "b"], ["alpha release notes", "beta release notes"])
+        index.delete(["a"])
+        index.add(["b"], ["beta replaced"])
+
+        reopened = BM25Index(tmp_path)
+        assert len(reopened) == 1
+        assert reopened.search("replaced")[0][0] == "b"
+        assert reopened.search("alpha") == []
+
+        reopened.compact()
+        assert not (tmp_path / JOURNAL_FILE).exists()
+        assert BM25Index(tmp_path).search("beta")[0][0] == "b"
+
+    def test_bm25_shared_between_processes(self, tmp_path):
+        """Test that instances on one directory replay each other's writes."""
+        from app.services.bm25_index import BM25Index, JOURNAL_FILE
+
+        server = BM25Index(tmp_path)
+        script = BM25Index(tmp_path)
+        script.add(["a"], ["alpha release notes"])
+        server.add(["b"], ["beta release notes"])
+
+        # A writer that died mid-line leaves a torn journal tail
+        with open(tmp_path / JOURNAL_FILE, "ab") as f:
+            f.write(b'{"op":"add","id":"x"')
+        script.add(["c"], ["gamma release notes"])
+
+        server.refresh()
+        assert {doc_id for doc_id, _ in server.search("release")} == {"a", "b", "c"}
+
+        script.compact()
+        script.delete(["a"])
+        server.refresh()
+        assert {doc_id for doc_id, _ in server.search("release")} == {"b", "c"}
+        assert len(BM25Index(tmp_path)) == 2
+
+    def test_writes_keep_lexical_index_in_sync(self, memory_rag_service):
+        """Test that add, update, delete and clear reach the BM25 index."""
+        service = memory_rag_service
+        service.add_documents(["alpha doc", "beta doc"], ids=["a", "b"])
+        service.update_document("a", document="gamma doc")
+        service.delete_documents(["b"])
+
+        assert service.lexical_index.search("gamma")[0][0] == "a"
+        assert service.lexical_index.search("alpha") == []
+        assert len(service.lexical_index) == 1
+
+        service.clear()
+        assert len(service.lexical_index) == 0
+
+    def test_hybrid_search_fuses_keyword_hits(self, memory_rag_service):
+        """Test that RRF surfaces a keyword match the vector ranking misses."""
+        service = memory_rag_service
+        service.hybrid_candidates = 2
+        docs = {f"a{i}": f"configure the framework option {i}" for i in range(5)}
+        docs["b"] = "zx9000 release notes"
+        service.add_documents(
+            list(docs.values()),
+            [{"kind": "guide"}] * 5 + [{"kind": "notes"}],
+            ids=list(docs),
+        )
+
+        query = "configure the framework zx9000"
+        vector = service.search(query, k=2)
+        hybrid = service.search(query, k=2, mode="hybrid")
+        filtered = service.search(
+            query, k=2, filter_metadata={"kind": "guide"}, mode="hybrid"
+        )
+
+        assert "b" not in [r["id"] for r in vector]
+        keyword_hit = next(r for r in hybrid if r["id"] == "b")
+        assert keyword_hit["document"] == "zx9000 release notes"
+        assert keyword_hit["distance"] is None
+        assert keyword_hit["score"] > 0
+        assert "b" not in [r["id"] for r in filtered]
+
+    def test_hybrid_search_rebuilds_missing_index(self, memory_rag_service):
+        """Test that a collection filled elsewhere is indexed on first use."""
+        service = memory_rag_service
+        service.add_documents(["zx9000 release notes"], ids=["b"])
+        service.lexical_index.clear()
+
+        results = service.search("zx9000", k=1, mode="hybrid")
+
+        assert results[0]["id"] == "b"
+        assert len(service.lexical_index) == 1
+
+    def test_unknown_mode_is_rejected(self, rag_service):
+        """Test that an invalid search mode raises ValueError."""
+        with pytest.raises(ValueError, match="Unknown search mode"):
+            rag_service.search("anything", mode="fuzzy")
+
+
+class TestContextPacking:
+    """Tests for token-budgeted, MMR-diversified context packing."""
+
+    @pytest.fixture
+    def service(self, memory_rag_service, tokenizer):
+        memory_rag_service.tokenizer = tokenizer
+        return memory_rag_service
+
+    def test_packing_respects_token_budget(self, service, tokenizer):
+        """Test that passages that do not fit are skipped for smaller ones."""
+        service.add_documents(
+            [
+                "flask routes handle web requests",
+                "flask blueprints group web routes together nicely",
+                "react renders components",
+            ],
+            ids=["short", "long", "other"],
+        )
+
+        passages = service.select_passages("flask web routes", max_tokens=12, k=3)
+        context = service.get_relevant_context("flask web routes", max_tokens=12)
+
+        assert [p["id"] for p in passages] == ["short", "other"]
+        assert [p["tokens"] for p in passages] == [5, 3]
+        assert len(tokenizer.encode(context)) <= 12
+
+    def test_near_duplicates_are_skipped(self, service):
+        """Test that MMR drops a passage identical to one already chosen."""
+        service.add_documents(
+            [
+                "vector databases store embeddings",
+                "vector databases store embeddings",
+                "embeddings power semantic search",
+            ],
+            ids=["a", "a-copy", "b"],
+        )
+
+        passages = service.select_passages(
+            "vector databases embeddings", max_tokens=100, k=3
+        )
+
+        ids = [p["id"] for p in passages]
+        assert len(ids) == 2
+        assert "b" in ids and not {"a", "a-copy"} <= set(ids)
+
+    def test_oversized_first_passage_is_truncated(self, service, tokenizer):
+        """Test that the best passage is cut to fit rather than dropped."""
+        long_text = " ".join(["token"] * 50)
+        service.add_documents([long_text], ids=["long"])
+
+        context = service.get_relevant_context("token", max_tokens=8)
+
+        assert len(tokenizer.encode(context)) == 8
+
+    def test_character_mode_unchanged_without_budget(self, service):
+        """Test that max_chars behaviour is kept when no budget is given."""
+        service.add_documents(["alpha", "beta"], ids=["a", "b"])
+
+        context = service.get_relevant_context("alpha beta", k=2)
+
+        assert context.count("---") == 1
+
+
+class TestQuantizedCollection:
+    """Tests for the int8-quantized vector backend."""
+
+    @staticmethod
+    def _vectors(count, dim=32, seed=0):
+        import numpy as np
+
+        return np.random.default_rng(seed).normal(size=(count, dim)).astype("float32")
+
+    def _exact_top(self, vectors, query, k):
+        import numpy as np
+
+        unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        return list(np.argsort(-(unit @ (query / np.linalg.norm(query))))[:k])
+
+    def test_quantized_scan_matches_exact_ranking(self, tmp_path):
+        """Test recall of the int8 scan, with and without float re-scoring."""
+        from app.services.quantized_store import QuantizedCollection
+
+        vectors = self._vectors(500)
+        queries = self._vectors(20, seed=1)
+        ids = [str(i) for i in range(500)]
+        recalls = {}
+        for rescore in (True, False):
+            store = QuantizedCollection(tmp_path / str(rescore), rescore=rescore)
+            store.add(ids=ids, embeddings=vectors, documents=ids)
+
+            hits = 0
+            for query in queries:
+                got = store.query(query_embeddings=[query], n_results=10)["ids"][0]
+                expected = {str(i) for i in self._exact_top(vectors, query, 10)}
+                hits += len(expected & set(got))
+            recalls[rescore] = hits / (10 * len(queries))
+
+        assert recalls[True] == 1.0
+        assert recalls[False] >= 0.9
+        assert (tmp_path / "True" / "codes.i8").stat().st_size == 500 * 32
+
+    def test_appends_updates_and_deletes_survive_reopen(self, tmp_path):
+        """Test incremental append and tombstones across reopening."""
+        import numpy as np
+        from app.services.quantized_store import QuantizedCollection
+
+        vectors = self._vectors(4)
+        store = QuantizedCollection(tmp_path)
+        store.add(
+            ids=["a", "b"],
+            embeddings=vectors[:2],
+            documents=["doc a", "doc b"],
+            metadatas=[{"kind": "x"}, {"kind": "y"}],
+        )
+        store.add(ids=["c", "a"], embeddings=vectors[2:], documents=["doc c", "dup"])
+        store.update(ids=["b"], metadatas=[{"kind": "z"}])
+        store.upsert(ids=["c"], embeddings=vectors[3:], documents=["doc c2"])
+        store.delete(ids=["a"])
+
+        reopened = QuantizedCollection(tmp_path)
+        assert reopened.count() == 2
+        assert reopened.get(ids=["b"])["metadatas"] == [{"kind": "z"}]
+        assert reopened.get(ids=["c"])["documents"] == ["doc c2"]
+        top = reopened.query(query_embeddings=[vectors[3]], n_results=1)
+        assert top["ids"] == [["c"]]
+        assert np.isclose(top["distances"][0][0], 0.0, atol=1e-5)
+
+    def test_where_filter_and_compaction(self, tmp_path, monkeypatch):
+        """Test metadata filters and rewriting once dead rows dominate."""
+        from app.services import quantized_store
+        from app.services.quantized_store import QuantizedCollection
+
+        monkeypatch.setattr(quantized_store, "MIN_COMPACT_ROWS", 2)
+        vectors = self._vectors(6)
+        store = QuantizedCollection(tmp_path)
+        store.add(
+            ids=[str(i) for i in range(6)],
+            embeddings=vectors,
+            documents=[f"doc {i}" for i in range(6)],
+            metadatas=[{"n": i, "even": i % 2 == 0} for i in range(6)],
+        )
+
+        result = store.query(
+            query_embeddings=[vectors[1]],
+            n_results=6,
+            where={"$and": [{"even": True}, {"n": {"$gte": 2}}]},
+        )
+        assert sorted(result["ids"][0]) == ["2", "4"]
+
+        store.delete(ids=["0", "1", "2", "3"])
+        assert store.get_metrics()["rows"] == 2
+        assert sorted(QuantizedCollection(tmp_path).get()["ids"]) == ["4", "5"]
+
+    def test_shared_directory_keeps_rows_aligned(self, tmp_path):
+        """Test two writers on one directory plus a torn trailing row."""
+        import numpy as np
+        from app.services.quantized_store import QuantizedCollection
+
+        vectors = self._vectors(6)
+        first = QuantizedCollection(tmp_path)
+        second = QuantizedCollection(tmp_path)
+        for i in range(6):
+            writer = first if i % 2 == 0 else second
+            writer.add(ids=[str(i)], embeddings=vectors[i : i + 1], documents=[str(i)])
+
+        # A writer that died mid-append leaves a partial code row behind
+        with open(tmp_path / "codes.i8", "ab") as f:
+            f.write(b"\x01" * 5)
+
+        for store in (first, second, QuantizedCollection(tmp_path)):
+            assert store.count() == 6
+            got = store.get(ids=["3"], include=["embeddings"])
+            unit = vectors[3] / np.linalg.norm(vectors[3])
+            assert np.allclose(got["embeddings"][0], unit, atol=1e-5)
+            top = store.query(query_embeddings=[vectors[4]], n_results=1)
+            assert top["ids"] == [["4"]]
+
+        second.add(ids=["6"], embeddings=self._vectors(1, seed=2), documents=["6"])
+        assert (tmp_path / "codes.i8").stat().st_size == 7 * 32
+        assert first.get(ids=["6"])["documents"] == ["6"]
+
+    def test_rag_service_quantized_backend(self, tmp_path, embedding_function):
+        """Test that RAGService runs end to end on the quantized backend."""
+        from app.services import RAGService
+
+        service = RAGService(persist_directory=str(tmp_path), backend="quantized")
+        service.embedding_function = embedding_function
+        service.add_documents(
+            ["Flask is a web framework", "React builds user interfaces"],
+            ids=["flask", "react"],
+        )
+
+        assert service.search("web framework", k=1)[0]["id"] == "flask"
+        assert service.search("react", k=1, mode="hybrid")[0]["id"] == "react"
+        assert service.get_metrics()["backend"] == "quantized"
+
+        service.clear()
+        assert service.count_documents() == 0
+
+    def test_unknown_backend_is_rejected(self, tmp_path):
+        """Test that an invalid backend name raises ValueError."""
+        from app.services import RAGService
+
+        with pytest.raises(ValueError, match="Unknown vector backend"):
+            RAGService(persist_directory=str(tmp_path), backend="faiss")
+
+
+class TestVectorStores:
+    """Tests for the VectorStore implementations."""
+
+    @pytest.fixture(params=["memory", "quantized"])
+    def store(self, request, tmp_path):
+        from app.services import InMemoryVectorStore
+        from app.services.quantized_store import QuantizedCollection
+
+        if request.param == "memory":
+            return InMemoryVectorStore()
+        return QuantizedCollection(tmp_path)
+
+    def test_store_contract(self, store):
+        """Test add/update/delete/query semantics shared by every store."""
+        import numpy as np
+
+        vectors = np.eye(4, dtype="float32")
+        store.add(
+            ids=["a", "b", "c"],
+            embeddings=vectors[:3],
+            documents=["doc a", "doc b", "doc c"],
+            metadatas=[{"n": 0}, {"n": 1}, {"n": 2}],
+        )
+        # Existing ids are ignored by add, unknown ids by update
+        store.add(ids=["a"], embeddings=vectors[3:], documents=["dup"])
+        store.update(ids=["b", "zzz"], metadatas=[{"n": 5}, {"n": 9}])
+        store.delete(ids=["a"])
+
+        assert store.count() == 2
+        assert store.get(ids=["b"])["metadatas"] == [{"n": 5}]
+        result = store.query(
+            query_embeddings=[vectors[2]], n_results=5, where={"n": {"$gt": 1}}
+        )
+        assert result["ids"] == [["c", "b"]]
+        assert np.allclose(result["distances"][0], [0.0, 1.0], atol=1e-5)
+
+        store.clear()
+        assert store.count() == 0
+        assert store.query(query_embeddings=[vectors[0]], n_results=1)["ids"] == [[]]
+
+    def test_memory_store_matches_exact_ranking(self):
+        """Test that the reference store returns the exact cosine top-k."""
+        import numpy as np
+        from app.services import InMemoryVectorStore
+
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(300, 16)).astype("float32")
+        query = rng.normal(size=16).astype("float32")
+        store = InMemoryVectorStore()
+        store.add(ids=[str(i) for i in range(300)], embeddings=vectors)
+        store.delete(ids=["0", "1"])
+
+        unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        order = [i for i in np.argsort(-(unit @ query)) if i > 1][:10]
+        got = store.query(query_embeddings=[query], n_results=10)["ids"][0]
+        assert got == [str(i) for i in order]
+
+    def test_hnsw_params_round_trip_collection_metadata(self):
+        """Test HNSW settings validation and their metadata encoding."""
+        from app.services.vector_store import HNSWParams
+
+        params = HNSWParams(space="cosine", m=32, ef_construction=200, ef_search=64)
+        assert params.to_metadata()["hnsw:M"] == 32
+        assert HNSWParams.from_metadata(params.to_metadata()) == params
+        assert HNSWParams.from_metadata(None) == HNSWParams()
+
+        with pytest.raises(ValueError, match="Unknown HNSW space"):
+            HNSWParams(space="hamming")
+        with pytest.raises(ValueError, match="ef_search must be positive"):
+            HNSWParams(ef_search=0)
+
+    def test_chroma_store_applies_hnsw_settings(self, tmp_path):
+        """Test creation metadata for new collections and ef_search updates."""
+        from unittest.mock import MagicMock, patch
+
+        import chromadb
+        from app.services.vector_store import ChromaVectorStore, HNSWParams
+
+        def create_collection(name, embedding_function, metadata):
+            return MagicMock(metadata=metadata)
+
+        client = MagicMock()
+        client.get_collection.side_effect = ValueError("does not exist")
+        client.create_collection.side_effect = create_collection
+        params = HNSWParams(space="cosine", m=8, ef_search=40)
+        with patch.object(chromadb, "PersistentClient", return_value=client):
+            store = ChromaVectorStore(str(tmp_path), "kb", None, hnsw=params)
+        assert store.hnsw == params
+        assert client.create_collection.call_args.kwargs["metadata"]["hnsw:M"] == 8
+
+        # An existing collection keeps its graph but adopts ef_search
+        existing = MagicMock(metadata={"hnsw:space": "l2", "hnsw:search_ef": 100})
+        client.get_collection.side_effect = None
+        client.get_collection.return_value = existing
+        with patch.object(chromadb, "PersistentClient", return_value=client):
+            store = ChromaVectorStore(str(tmp_path), "kb", None, hnsw=params)
+        existing.modify.assert_called_once_with(
+            configuration={"hnsw": {"ef_search": 40}}
+        )
+        assert store.hnsw == HNSWParams(space="l2", ef_search=40)
+
+    def test_rag_service_accepts_injected_store(self, tmp_path, embedding_function):
+        """Test that a VectorStore instance replaces the configured backend."""
+        from app.services import InMemoryVectorStore, RAGService
+
+        store = InMemoryVectorStore()
+        service = RAGService(persist_directory=str(tmp_path), vector_store=store)
+        service.embedding_function = embedding_function
+        service.add_documents(["Flask is a web framework"], ids=["flask"])
+
+        assert store.count() == 1
+        assert service.search("web framework", k=1)[0]["id"] == "flask"
+
+
+class TestSnapshots:
+    """Tests for knowledge base snapshot export and import."""
+
+    def test_round_trip_restores_without_embedding(
+        self, tmp_path, memory_rag_service, embedding_function, monkeypatch
+    ):
+        """Test that an import reproduces the source with no model calls."""
+        from unittest.mock import MagicMock
+
+        import numpy as np
+        from app.services import RAGService, snapshot
+        from app.services.snapshot import Snapshot
+
+        monkeypatch.setattr(snapshot, "EXPORT_PAGE", 2)
+        docs = ["Flask is a web framework", "React builds UIs", "Ünïcode text"]
+        memory_rag_service.add_documents(
+            docs, [{"n": i} for i in range(3)], ids=["a", "b", "c"]
+        )
+        path = tmp_path / "kb.snap"
+        assert memory_rag_service.export_snapshot(str(path)) == 3
+
+        loaded = Snapshot(path)
+        source = memory_rag_service.collection.get(include=["embeddings"])
+        assert np.array_equal(loaded.vectors, source["embeddings"])
+
+        target = RAGService(persist_directory=str(tmp_path), backend="memory")
+        target.embedding_function = MagicMock()
+        stats = target.import_snapshot(str(path), batch_size=2)
+
+        assert stats["documents"] == 3
+        target.embedding_function.assert_not_called()
+        restored = target.collection.get(ids=["c"])
+        assert restored["documents"] == ["Ünïcode text"]
+        assert restored["metadatas"][0]["n"] == 2
+        assert target.lexical_index.search("react")[0][0] == "b"
+
+    def test_rejects_foreign_files_and_models(self, tmp_path, memory_rag_service):
+        """Test that non-snapshots and other embedding models are refused."""
+        from app.services.snapshot import export_snapshot
+
+        bogus = tmp_path / "bogus.snap"
+        bogus.write_bytes(b"not a snapshot")
+        with pytest.raises(ValueError, match="Not a knowledge base snapshot"):
+            memory_rag_service.import_snapshot(str(bogus))
+
+        other = tmp_path / "other.snap"
+        export_snapshot(memory_rag_service.collection, other, info={"model": "x"})
+        with pytest.raises(ValueError, match="embedded with x"):
+            memory_rag_service.import_snapshot(str(other))
+
+
+class TestCreatorResearch:
+    """Tests for retrieved context in the Creator's research prompts."""
+
+    @pytest.fixture
+    def creator(self, memory_rag_service, tokenizer):
+        from unittest.mock import AsyncMock, MagicMock
+        from app.agents.creator import CreatorAgent
+
+        memory_rag_service.tokenizer = tokenizer
+        memory_rag_service.add_documents(
+            [
+                "flask routes handle web requests",
+                "react renders components in the browser",
+                " ".join(["padding"] * 40),
+            ],
+            ids=["flask", "react", "padding"],
+        )
+        creator = CreatorAgent(
+            model_client=MagicMock(),
+            rag_service=memory_rag_service,
+            context_tokens=12,
+        )
+        creator.send_message = AsyncMock(return_value="Summary")
+        return creator
+
+    def test_passages_are_injected_within_budget(self, creator, tokenizer):
+        """Test that passage text, not just a count, reaches the prompt."""
+        import asyncio
+
+        results = asyncio.run(creator.research_topic("flask web routes"))
+
+        prompt = creator.send_message.await_args.args[0]
+        assert "flask routes handle web requests" in prompt
+        assert "padding padding" not in prompt
+        assert sum(s["content"]["tokens"] for s in results["sources"]) <= 12
+        assert results["summary"] == "Summary"
+
+    def test_follow_up_turns_reuse_workflow_passages(self, creator):
+        """Test that later turns of a workflow do not search again."""
+        import asyncio
+        from unittest.mock import patch
+
+        async def conversation():
+            await creator.handle_workflow_message("flask web routes", 7)
+            await creator.handle_workflow_message("How do routes scale?", 7)
+            await creator.research_topic("flask web routes", workflow_id=7)
+
+        with patch.object(
+            creator.rag_service,
+            "select_passages",
+            wraps=creator.rag_service.select_passages,
+        ) as select:
+            asyncio.run(conversation())
+
+        assert select.call_count == 1
+        follow_up = creator.send_message.await_args_list[1].args[0]
+        assert "flask routes handle web requests" in follow_up
+
+        metrics = creator.get_metrics()
+        assert metrics["retrievals"] == 1
+        assert metrics["retrievals_reused"] == 2
+        assert metrics["research_tasks"] == 2
+        assert metrics["llm_turns_per_task"] == 1.5
+
+    def test_failed_search_is_not_cached(self, creator):
+        """Test that a RAG error is retried instead of cached as empty."""
+        import asyncio
+        from unittest.mock import patch
+
+        real_select = creator.rag_service.select_passages
+        with patch.object(
+            creator.rag_service,
+            "select_passages",
+            side_effect=RuntimeError("store offline"),
+        ) as select:
+            asyncio.run(creator.handle_workflow_message("flask web routes", 7))
+            select.side_effect = real_select
+            asyncio.run(creator.handle_workflow_message("flask web routes", 7))
+
+        assert select.call_count == 2
+        retry = creator.send_message.await_args_list[1].args[0]
+        assert "flask routes handle web requests" in retry
+
+    def test_cache_keys_are_normalized_and_per_workflow(self, creator):
+        """Test that spelling variants share a cache entry, workflows do not."""
+        import asyncio
+        from unittest.mock import patch
+
+        with patch.object(
+            creator.rag_service,
+            "select_passages",
+            wraps=creator.rag_service.select_passages,
+        ) as select:
+            asyncio.run(creator.research_topic("flask web routes", workflow_id=7))
+            asyncio.run(creator.research_topic("Flask  Web Routes ", workflow_id=7))
+            assert select.call_count == 1
+            assert creator.get_metrics()["research_tasks"] == 1
+
+            asyncio.run(creator.research_topic("flask web routes", workflow_id=8))
+            assert select.call_count == 2
+            assert creator.get_metrics()["research_tasks"] == 2
+
+
+class TestAgentManagerIndexes:
+    """Tests for AgentManager's id and name lookup indexes."""
+
+    @pytest.fixture
+    def manager(self):
+        from app.agents import agent_manager
+
+        yield agent_manager
+        agent_manager.shutdown()
+
+    @staticmethod
+    def _agent(name, db_id, agent_type="dynamic"):
+        from unittest.mock import MagicMock
+        from app.agents import BaseVirtualAgent
+
+        agent = BaseVirtualAgent(
+            name=name,
+            role=name,
+            agent_type=agent_type,
+            system_message="",
+            description="",
+            model_client=MagicMock(),
+        )
+        agent.set_db_id(db_id)
+        return agent
+
+    def test_lookup_create_and_terminate(self, manager):
+        """Test that both indexes follow creation and termination."""
+        agents = [self._agent(f"Specialist{i}", 100 + i) for i in range(50)]
+        for agent in agents:
+            manager.add_dynamic_agent(agent)
+
+        assert manager.get_agent(142) is agents[42]
+        assert manager.get_agent_by_name("Specialist7") is agents[7]
+
+        assert manager.terminate_agent(142) is True
+        assert manager.get_agent(142) is None
+        assert manager.get_agent_by_name("Specialist42") is None
+        assert manager.terminate_agent(142) is False
+
+    def test_core_agents_cannot_be_terminated(self, manager):
+        """Test that an indexed core agent is not removed by terminate."""
+        driver = self._agent("CEO", 1, agent_type="driver")
+        manager.driver = driver
+        manager._register(driver)
+
+        assert manager.terminate_agent(1) is False
+        assert manager.get_agent(1) is driver
+
+        manager.shutdown()
+        assert manager.get_agent(1) is None
+        assert manager.get_agent_by_name("CEO") is None
+
+    def test_message_route_skips_lookup_for_loaded_agent(
+        self, app, client, manager, query_counter
+    ):
+        """Test that messaging a loaded agent does not query the agents table."""
+        from unittest.mock import AsyncMock
+        from app.services import get_agent_service
+
+        agent = self._agent("Specialist", 4242)
+        agent.send_message = AsyncMock(return_value="On it")
+        manager.add_dynamic_agent(agent)
+        service = get_agent_service()
+        service.initialized = True
+        try:
+            with query_counter:
+                response = client.post(
+                    "/api/agents/4242/message", json={"message": "Hello"}
+                )
+        finally:
+            service.initialized = False
+
+        assert response.status_code == 200
+        assert response.get_json()["response"] == "On it"
+        assert len(query_counter) == 0
+
+
+class TestAgentRehydration:
+    """Tests for rebuilding dynamic agents from their stored spec."""
+
+    @pytest.fixture
+    def manager(self, db_session):
+        from unittest.mock import MagicMock, patch
+        from app.agents import agent_manager
+
+        agent_manager.set_db_session(db_session)
+        with patch("app.agents.generator.get_model_client", MagicMock()):
+            yield agent_manager
+        agent_manager.shutdown()
+        agent_manager.db_session = None
+
+    @staticmethod
+    def _record(db_session, name, status="active"):
+        spec = {
+            "name": name,
+            "role": f"{name} role",
+            "type": "dynamic",
+            "capabilities": ["coding"],
+            "system_message": f"You are {name}.",
+            "description": f"Specialized agent for {name.lower()}",
+            "model": "gpt-4o-mini",
+            "tools": [],
+        }
+        record = Agent(
+            name=name, type="dynamic", role=spec["role"], status=status, config=spec
+        )
+        db_session.add(record)
+        db_session.commit()
+        return record
+
+    def test_agent_rebuilt_on_first_access(self, manager, db_session):
+        """Test that a stored agent is rebuilt once, without an LLM call."""
+        record = self._record(db_session, "DataAnalyst")
+        rehydrated = manager.metrics["rehydrated"]
+
+        agent = manager.get_agent(record.id)
+
+        assert agent.name == "DataAnalyst"
+        assert agent.db_id == record.id
+        assert agent.description == "Specialized agent for dataanalyst"
+        assert manager.get_agent(record.id) is agent
+        assert manager.get_agent_by_name("DataAnalyst") is agent
+        assert manager.metrics["rehydrated"] == rehydrated + 1
+
+    def test_terminated_agents_stay_gone(self, manager, db_session):
+        """Test that terminated records are neither rebuilt nor listed."""
+        gone = self._record(db_session, "Retired", status="terminated")
+        dormant = self._record(db_session, "Sleeper")
+
+        assert manager.get_agent(gone.id) is None
+        assert [a["name"] for a in manager.get_all_agents()] == ["Sleeper"]
+
+        assert manager.terminate_agent(dormant.id) is True
+        assert db_session.get(Agent, dormant.id).status == "terminated"
+        assert manager.get_agent(dormant.id) is None
+
+
+class FakeAssistant:
+    """AssistantAgent stand-in whose state is its list of messages."""
+
+    llm_calls = 0
+
+    def __init__(self, **kwargs):
+        self.messages: list[str] = []
+
+    async def on_messages(self, messages, cancellation_token):
+        from types import SimpleNamespace
+
+        FakeAssistant.llm_calls += 1
+        self.messages.append("turn")
+        return SimpleNamespace(chat_message=SimpleNamespace(content="ok"))
+
+    async def save_state(self):
+        return {"messages": list(self.messages)}
+
+    async def load_state(self, state):
+        self.messages = list(state["messages"])
+
+
+class TestAgentHibernation:
+    """Tests for the LRU cap on resident dynamic agents."""
+
+    @pytest.fixture
+    def manager(self, db_session):
+        from unittest.mock import MagicMock, patch
+        from app.agents import agent_manager
+
+        agent_manager.set_db_session(db_session)
+        agent_manager.max_resident_agents = 2
+        with patch("app.agents.generator.get_model_client", MagicMock()), patch(
+            "app.agents.base_agent.AssistantAgent", FakeAssistant
+        ):
+            yield agent_manager
+        agent_manager.shutdown()
+        agent_manager.db_session = None
+        agent_manager.max_resident_agents = None
+
+    def test_idle_agents_hibernate_and_restore(self, manager, db_session):
+        """Test that the LRU agent is saved, dropped and restored on use."""
+        import asyncio
+        from app.models import AgentState
+
+        ids = [
+            TestAgentRehydration._record(db_session, name).id
+            for name in ("Alpha", "Beta", "Gamma")
+        ]
+        start = dict(manager.metrics)
+
+        async def converse():
+            for agent_id in ids:
+                agent = await manager.load_agent(agent_id)
+                agent.agent.messages.append(f"hello {agent.name}")
+                agent.state_version += 1
+            await manager.enforce_resident_limit()
+
+        asyncio.run(converse())
+
+        assert list(manager.dynamic_agents) == ["Beta", "Gamma"]
+        assert db_session.get(Agent, ids[0]).status == "hibernated"
+        saved = db_session.get(AgentState, ids[0])
+        assert AgentState.decode(saved.state) == {"messages": ["hello Alpha"]}
+
+        alpha = asyncio.run(manager.load_agent(ids[0]))
+
+        assert alpha.agent.messages == ["hello Alpha"]
+        assert list(manager.dynamic_agents) == ["Gamma", "Alpha"]
+        assert manager.metrics["evictions"] - start["evictions"] == 2
+        assert manager.metrics["restores"] - start["restores"] == 1
+        assert manager.get_metrics()["resident"] == 2
+
+    def test_busy_agents_are_not_evicted(self, manager, db_session):
+        """Test that only idle agents are hibernated."""
+        import asyncio
+
+        ids = [
+            TestAgentRehydration._record(db_session, name).id
+            for name in ("Alpha", "Beta", "Gamma")
+        ]
+        manager.get_agent(ids[0]).status = "busy"
+        manager.get_agent(ids[1])
+
+        asyncio.run(manager.load_agent(ids[2]))
+
+        assert list(manager.dynamic_agents) == ["Alpha", "Gamma"]
+
+    def test_every_lookup_respects_the_cap(self, manager, db_session, monkeypatch):
+        """Test that sync lookups, routing and status reads stay under the cap."""
+        import asyncio
+        import sys
+        from unittest.mock import MagicMock
+
+        monkeypatch.setitem(sys.modules, "autogen_agentchat.messages", MagicMock())
+        ids = [
+            TestAgentRehydration._record(db_session, name).id
+            for name in ("Alpha", "Beta", "Gamma", "Delta")
+        ]
+
+        manager.get_agent(ids[0])
+        manager.get_agent_by_name("Beta")
+        manager.get_agent(ids[2])
+        assert list(manager.dynamic_agents) == ["Beta", "Gamma"]
+
+        rehydrated = manager.metrics["rehydrated"]
+        status = manager.get_agent_status(ids[3])
+        assert status["name"] == "Delta"
+        assert manager.metrics["rehydrated"] == rehydrated
+
+        asyncio.run(manager.route_message(ids[1], "Delta", "hello"))
+        assert list(manager.dynamic_agents) == ["Beta", "Delta"]
+
+
+class TestAgentCheckpoints:
+    """Tests for incremental checkpoints of agent conversation state."""
+
+    @pytest.fixture
+    def manager(self, db_session, monkeypatch):
+        import sys
+        from unittest.mock import MagicMock, patch
+        from app.agents import agent_manager
+
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.setitem(sys.modules, "autogen_agentchat.messages", MagicMock())
+        agent_manager.set_db_session(db_session)
+        with patch("app.agents.generator.get_model_client", MagicMock()), patch(
+            "app.agents.base_agent.AssistantAgent", FakeAssistant
+        ):
+            yield agent_manager
+        agent_manager.shutdown()
+        agent_manager.db_session = None
+
+    def test_only_changed_agents_are_written(self, manager, db_session):
+        """Test that a checkpoint skips agents with no new turns."""
+        import asyncio
+        from app.models import AgentState
+
+        ids = [
+            TestAgentRehydration._record(db_session, name).id
+            for name in ("Alpha", "Beta")
+        ]
+
+        async def run():
+            alpha = await manager.load_agent(ids[0])
+            await manager.load_agent(ids[1])
+            await alpha.send_message("hello")
+            first = await manager.checkpoint()
+            second = await manager.checkpoint()
+            await alpha.send_message("again")
+            third = await manager.checkpoint()
+            return first, second, third
+
+        assert asyncio.run(run()) == (1, 0, 1)
+        assert db_session.get(AgentState, ids[1]) is None
+        saved = db_session.get(AgentState, ids[0])
+        assert AgentState.decode(saved.state) == {"messages": ["turn", "turn"]}
+
+    def test_agents_mid_turn_are_not_captured(self, manager, db_session):
+        """Test that checkpoint and hibernation wait for a turn to finish."""
+        import asyncio
+        import threading
+        from app.models import AgentState
+
+        agent_id = TestAgentRehydration._record(db_session, "Alpha").id
+
+        async def converse():
+            alpha = await manager.load_agent(agent_id)
+            await alpha.send_message("hello")
+            return alpha
+
+        alpha = asyncio.run(converse())
+
+        # Another thread starts a turn; its status still reads "idle"
+        started, finish = threading.Event(), threading.Event()
+
+        def turn():
+            with alpha.turn_lock:
+                started.set()
+                finish.wait(5)
+
+        worker = threading.Thread(target=turn)
+        worker.start()
+        started.wait(5)
+        try:
+            assert alpha.status == "idle"
+            assert asyncio.run(manager.checkpoint()) == 0
+            assert asyncio.run(manager.hibernate_agent(alpha)) is False
+        finally:
+            finish.set()
+            worker.join()
+
+        assert asyncio.run(manager.checkpoint()) == 1
+        assert db_session.get(AgentState, agent_id) is not None
+
+    def test_warm_restart_restores_conversations(self, manager, db_session):
+        """Test that core and dynamic agents come back without LLM calls."""
+        import asyncio
+
+        agent_id = TestAgentRehydration._record(db_session, "Alpha").id
+
+        async def before_restart():
+            await manager.initialize_core_agents(db_session)
+            await manager.driver.send_message("plan")
+            await (await manager.load_agent(agent_id)).send_message("build")
+            await manager.checkpoint()
+
+        async def after_restart():
+            await manager.initialize_core_agents(db_session)
+            return await manager.load_agent(agent_id)
+
+        asyncio.run(before_restart())
+        manager.shutdown()
+        calls = FakeAssistant.llm_calls
+
+        alpha = asyncio.run(after_restart())
+
+        assert FakeAssistant.llm_calls == calls
+        assert manager.driver.agent.messages == ["turn"]
+        assert manager.creator.agent.messages == []
+        assert alpha.agent.messages == ["turn"]
+        assert asyncio.run(manager.checkpoint()) == 0
+
+    def test_flusher_writes_from_background_context(self, app, manager, db_session):
+        """Test that the checkpointer flushes through its own app context."""
+        import asyncio
+        from app.models import AgentState
+        from app.services import AgentCheckpointer
+
+        agent_id = TestAgentRehydration._record(db_session, "Alpha").id
+
+        async def converse():
+            await (await manager.load_agent(agent_id)).send_message("hello")
+
+        asyncio.run(converse())
+        checkpointer = AgentCheckpointer(app, interval=60)
+
+        assert checkpointer.flush() == 1
+        assert checkpointer.last_error is None
+        assert db_session.get(AgentState, agent_id) is not None
+
+
 class TestAgentService:
     """Tests for AgentService."""
 
@@ -264,6 +2103,218 @@ class TestAgentService:
             assert history[0]["sender"] == "user"
 
 
+class TestMessageArchive:
+    """Tests for cold-storage message archival."""
+
+    def _seed(self, db_session, agent, count):
+        from app.models import Message
+        from datetime import timedelta
+
+        base_time = datetime(2024, 1, 1)
+        for i in range(count):
+            db_session.add(
+                Message(
+                    agent_id=agent.id,
+                    sender="user" if i % 2 else "system",
+                    content=f"Message {i}",
+                    timestamp=base_time + timedelta(days=i),
+                )
+            )
+        db_session.commit()
+
+    def test_archive_moves_old_messages(self, app, db_session, sample_agent, tmp_path):
+        """Test that old messages leave the hot table and land in segments."""
+        from app.models import Message
+        from app.services import get_message_archive
+
+        app.config["MESSAGE_ARCHIVE_DIR"] = str(tmp_path)
+        self._seed(db_session, sample_agent, 10)
+
+        archive = get_message_archive()
+        result = archive.archive_messages(datetime(2024, 1, 8), batch_size=3)
+
+        assert result == {"archived": 7, "segments": 3}
+        assert Message.query.count() == 3
+        assert len(list(tmp_path.glob("segment-*.jsonl.gz"))) == 3
+        assert archive.has_messages(sample_agent.id)
+
+    def test_rows_awaiting_delete_are_not_duplicated(
+        self, app, db_session, sample_agent, tmp_path
+    ):
+        """Test paging while archived rows are still in the hot table."""
+        from app.models import Message
+        from app.services import get_agent_service, get_message_archive
+
+        app.config["MESSAGE_ARCHIVE_DIR"] = str(tmp_path)
+        self._seed(db_session, sample_agent, 10)
+        # Write a segment but stop before deleting its rows, as a crash would
+        archive = get_message_archive()
+        archive.directory.mkdir(parents=True, exist_ok=True)
+        archive._write_segment(
+            Message.query.filter(Message.timestamp < datetime(2024, 1, 6))
+            .order_by(Message.timestamp)
+            .all()
+        )
+        assert Message.query.count() == 10
+        assert archive.has_messages(sample_agent.id)
+
+        service = get_agent_service()
+        expected = [f"Message {i}" for i in range(10)]
+        whole = service.get_agent_conversation_page(sample_agent.id, limit=20)
+        assert [m["content"] for m in whole["messages"]] == expected
+
+        contents = []
+        cursor = None
+        while True:
+            page = service.get_agent_conversation_page(
+                sample_agent.id, limit=3, before=cursor
+            )
+            contents = [m["content"] for m in page["messages"]] + contents
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        assert contents == expected
+
+    def test_history_continues_into_archive(
+        self, app, db_session, sample_agent, tmp_path
+    ):
+        """Test that paging walks seamlessly from hot rows into the archive."""
+        from app.services import get_agent_service, get_message_archive
+
+        app.config["MESSAGE_ARCHIVE_DIR"] = str(tmp_path)
+        self._seed(db_session, sample_agent, 10)
+        get_message_archive().archive_messages(datetime(2024, 1, 6), batch_size=2)
+
+        service = get_agent_service()
+        contents = []
+        cursor = None
+        while True:
+            page = service.get_agent_conversation_page(
+                sample_agent.id, limit=3, before=cursor
+            )
+            contents = [m["content"] for m in page["messages"]] + contents
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+        assert contents == [f"Message {i}" for i in range(10)]
+
+        history = service.get_agent_conversation_history(sample_agent.id, limit=4)
+        assert [m["content"] for m in history] == [
+            f"Message {i}" for i in range(6, 10)
+        ]
+
+        older = service.get_agent_conversation_page(
+            sample_agent.id, limit=20, sender="system"
+        )
+        assert [m["content"] for m in older["messages"]] == [
+            f"Message {i}" for i in range(0, 10, 2)
+        ]
+
+    def test_server_sees_runs_from_another_process(
+        self, app, db_session, sample_agent, tmp_path
+    ):
+        """Test that a loaded archive picks up runs of the archive script."""
+        from app.models import Message
+        from app.services import MessageArchive, get_agent_service, get_message_archive
+
+        app.config["MESSAGE_ARCHIVE_DIR"] = str(tmp_path)
+        self._seed(db_session, sample_agent, 6)
+        undated = Message(agent_id=sample_agent.id, sender="user", content="Undated")
+        db_session.add(undated)
+        db_session.commit()
+        Message.query.filter_by(id=undated.id).update({"timestamp": None})
+        db_session.commit()
+
+        server = get_message_archive()
+        assert not server.has_messages(sample_agent.id)
+
+        # archive_messages.py opens its own instance
+        MessageArchive(tmp_path).archive_messages(datetime(2024, 1, 4))
+
+        assert server.has_messages(sample_agent.id)
+        page = get_agent_service().get_agent_conversation_page(sample_agent.id, limit=10)
+        assert [m["content"] for m in page["messages"]] == ["Undated"] + [
+            f"Message {i}" for i in range(6)
+        ]
+
+    def test_interrupted_run_is_completed(
+        self, app, db_session, sample_agent, tmp_path
+    ):
+        """Test that rows archived before a crash are deleted on the next run."""
+        from app.models import Message
+        from app.services import MessageArchive
+
+        app.config["MESSAGE_ARCHIVE_DIR"] = str(tmp_path)
+        self._seed(db_session, sample_agent, 5)
+
+        archive = MessageArchive(tmp_path)
+        rows = Message.query.order_by(Message.id).limit(2).all()
+        archive._write_segment(rows)  # crash before the delete step
+
+        reopened = MessageArchive(tmp_path)
+        reopened.archive_messages(datetime(2023, 1, 1))
+
+        assert Message.query.count() == 3
+        found = reopened.read(sample_agent.id, limit=10)
+        assert [m["content"] for _, m in found] == ["Message 0", "Message 1"]
+
+
+class TestStatsService:
+    """Tests for StatsService."""
+
+    def test_counts_grouped_by_status(self, app, db_session):
+        """Test that each table is counted with a single query."""
+        from sqlalchemy import event
+        from app import db
+        from app.services import get_stats_service
+
+        db_session.add_all(
+            [
+                Workflow(name="A", status="active"),
+                Workflow(name="B", status="completed"),
+                Workflow(name="C", status="completed"),
+                Workflow(name="D", status="failed"),
+            ]
+        )
+        db_session.commit()
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])  # noqa: E731
+        event.listen(db.engine, "before_cursor_execute", listener)
+        try:
+            stats = get_stats_service().workflow_stats()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", listener)
+
+        assert stats == {"total": 4, "active": 1, "completed": 2, "failed": 1}
+        assert len(statements) == 1
+        assert "GROUP BY" in statements[0]
+
+    def test_cache_hit_and_invalidation(self, app, db_session, sample_workflow):
+        """Test TTL caching and invalidation on status change."""
+        from app.services import get_stats_service
+
+        app.config["STATS_CACHE_TTL"] = 60
+        service = get_stats_service()
+        service.invalidate()
+
+        assert service.workflow_stats()["completed"] == 0
+        hits = service.hits
+        service.workflow_stats()
+        assert service.hits == hits + 1
+
+        # Changing an unrelated column keeps the cache warm
+        sample_workflow.name = "Renamed"
+        db_session.commit()
+        service.workflow_stats()
+        assert service.hits == hits + 2
+
+        sample_workflow.status = "completed"
+        db_session.commit()
+        assert service.workflow_stats()["completed"] == 1
+
+
 class TestTaskProcessor:
     """Tests for TaskProcessor service."""
 